@@ -45,10 +45,10 @@ Provides:
 
 """
 
-import bz2
 import itertools
 import src.lib.i18n as i18n
 import os
+import threading
 
 import wx
 
@@ -57,7 +57,12 @@ from src.config import config
 from src.gui._grid_table import GridTable
 from src.lib.parsers import get_font_from_data
 from src.lib.gpg import sign, verify
+from src.lib.compression import open_pys_file
+from src.lib.binary_format import BinaryPysFile, write_binary_pys_file, \
+    is_binary_pys_file, is_binary_pys_filepath
+from src.lib.journal import Journal
 from src.lib.selection import Selection
+from src.model.sqlite_store import SQLiteKeyValueStore
 
 from src.actions._main_window_actions import Actions
 from src.actions._grid_cell_actions import CellActions
@@ -76,6 +81,13 @@ class FileActions(Actions):
 
         self.saving = False
 
+        # Journal of the open file, None if saves are not journaled
+        self.journal = None
+
+        # (thread, snapshot, filepath, errors) of the running background
+        # save, None if there is none
+        self.background_save = None
+
         self.main_window.Bind(self.EVT_CMD_GRID_ACTION_OPEN, self.open)
         self.main_window.Bind(self.EVT_CMD_GRID_ACTION_SAVE, self.save)
 
@@ -157,9 +169,17 @@ class FileActions(Actions):
         post_command_event(self.main_window, self.SafeModeExitMsg)
 
     def approve(self, filepath):
-        """Sets safe mode if signature missing of invalid"""
+        """Sets safe mode if signature missing of invalid
+
+        If a journal is present, it has to be signed as well.
+
+        """
 
-        if self.validate_signature(filepath):
+        journal_filepath = Journal(filepath).journal_filepath
+
+        if self.validate_signature(filepath) and \
+           (not os.path.exists(journal_filepath) or
+                self.validate_signature(journal_filepath)):
             self.leave_safe_mode()
             post_command_event(self.main_window, self.SafeModeExitMsg)
 
@@ -224,6 +244,10 @@ class FileActions(Actions):
 
         """
 
+        # Stop background evaluation of old cells
+        if self.grid.evaluator is not None:
+            self.grid.evaluator.clear()
+
         # Clear cells
         self.code_array.dict_grid.clear()
 
@@ -241,6 +265,7 @@ class FileActions(Actions):
         # Clear caches
         self.code_array.unredo.reset()
         self.code_array.result_cache.clear()
+        self.code_array.dependency_graph.clear()
 
         # Clear globals
         self.code_array.clear_globals()
@@ -258,21 +283,31 @@ class FileActions(Actions):
 
         filepath = event.attr["filepath"]
 
+        # The file may be the one that is saved in the background
+        self.finish_background_save()
+
         # Set states for file open
 
         self.opening = True
         self.need_abort = False
 
         try:
-            infile = bz2.BZ2File(filepath, "r")
+            if is_binary_pys_file(filepath):
+                infile = BinaryPysFile(filepath)
+            else:
+                # The codec is detected from the file
+                infile = open_pys_file(filepath, "r")
 
-        except IOError:
+        except (IOError, ValueError):
             statustext = _("Error opening file {}.").format(filepath)
             post_command_event(self.main_window, self.StatusBarMsg,
                                text=statustext)
 
             return False
 
+        if isinstance(infile, BinaryPysFile):
+            return self._open_binary(filepath, infile)
+
         # Make loading safe
         self.approve(filepath)
 
@@ -345,6 +380,72 @@ class FileActions(Actions):
             pass
 
         infile.close()
+
+        self._finish_open(filepath)
+
+    def _open_binary(self, filepath, infile):
+        """Loads the content of the open BinaryPysFile infile, see open"""
+
+        dict_grid = self.code_array.dict_grid
+
+        # Make loading safe
+        self.approve(filepath)
+
+        # Disable undo
+        self.grid.code_array.unredo.active = True
+
+        # Empty grid
+        self.clear(infile.shape)
+
+        self.grid.GetTable().ResetView()
+
+        def abort(no_cells):
+            """Enables abort during long loads"""
+
+            return self._is_aborted(no_cells, "Loading file... ",
+                                    infile.cell_count, 1)
+
+        if not infile.load(dict_grid, abort):
+            self._abort_open(filepath, infile)
+            return False
+
+        infile.close()
+
+        self._finish_open(filepath)
+
+    def _replay_journal(self, filepath):
+        """Applies the journal of filepath and starts journaling"""
+
+        dict_grid = self.code_array.dict_grid
+
+        journal = Journal(filepath)
+
+        try:
+            is_replayed = journal.replay(dict_grid)
+
+        except (IOError, ValueError):
+            is_replayed = False
+
+        if not is_replayed:
+            statustext = _("Journal of file {} ignored.").format(filepath)
+            post_command_event(self.main_window, self.StatusBarMsg,
+                               text=statustext)
+
+            # The next save is a full save, which removes the journal
+            self.journal = None
+
+        elif config["save_journal"]:
+            journal.start(dict_grid)
+            self.journal = journal
+
+        else:
+            self.journal = None
+
+    def _finish_open(self, filepath):
+        """Executes macros and updates the grid after file loading"""
+
+        self._replay_journal(filepath)
+
         self.opening = False
 
         # Execute macros
@@ -410,6 +511,29 @@ class FileActions(Actions):
         self.saving = False
         self.need_abort = False
 
+    def _get_output_generators(self, dict_grid):
+        """Returns list of generators that yield the lines of a pys file
+
+        Parameters
+        ----------
+        dict_grid: DictGrid or GridSnapshot
+        \tContent that is saved
+
+        """
+
+        return [
+            # Grid content
+            dict_grid.grid_to_strings(),
+            # Cell attributes
+            dict_grid.attributes_to_strings(),
+            # Row heights
+            dict_grid.heights_to_strings(),
+            # Column widths
+            dict_grid.widths_to_strings(),
+            # Macros
+            dict_grid.macros_to_strings(),
+        ]
+
     def save(self, event):
         """Saves a file that is specified in event.attr
 
@@ -417,6 +541,7 @@ class FileActions(Actions):
         ----------
         event.attr: Dict
         \tkey filepath contains file path of file to be saved
+        \tkey background, if True, saves in a background thread
 
         """
 
@@ -424,16 +549,31 @@ class FileActions(Actions):
 
         dict_grid = self.code_array.dict_grid
 
+        # A running background save is completed before the next save
+        self.finish_background_save()
+
         self.saving = True
         self.need_abort = False
 
         io_error_text = _("Error writing to file {}.").format(filepath)
 
-        # Save file is compressed
+        if self._can_append_journal(filepath):
+            return self._save_journal(io_error_text)
+
+        if event.attr.get("background", False) and \
+           self._can_save_in_background(filepath):
+            return self._save_in_background(filepath)
+
+        if is_binary_pys_filepath(filepath):
+            return self._save_binary(filepath, io_error_text)
+
+        # Save file is compressed, the header is written on opening
         try:
-            outfile = bz2.BZ2File(filepath, "wb")
+            outfile = open_pys_file(
+                filepath, "wb", codec=config["save_codec"],
+                workers=config["compression_workers"] or None)
 
-        except IOError:
+        except (IOError, ValueError):
             statustext = _("Error opening file {}.").format(filepath)
             try:
                 post_command_event(self.main_window, self.StatusBarMsg,
@@ -443,34 +583,11 @@ class FileActions(Actions):
                 pass
             return False
 
-        # Header
-        try:
-            outfile.write("[Pyspread save file version]\n")
-            outfile.write("0.1\n")
-
-        except IOError:
-            try:
-                post_command_event(self.main_window, self.StatusBarMsg,
-                                   text=io_error_text)
-            except TypeError:
-                # The main window does not exist any more
-                pass
-
-            return False
+        # Leave out cell attributes that are overridden by later ones
+        dict_grid.cell_attributes.compact()
 
         # The output generators yield the lines for the outfile
-        output_generators = [
-            # Grid content
-            dict_grid.grid_to_strings(),
-            # Cell attributes
-            dict_grid.attributes_to_strings(),
-            # Row heights
-            dict_grid.heights_to_strings(),
-            # Column widths
-            dict_grid.widths_to_strings(),
-            # Macros
-            dict_grid.macros_to_strings(),
-        ]
+        output_generators = self._get_output_generators(dict_grid)
 
         # Options for self._is_aborted
         abort_options_list = [
@@ -506,6 +623,69 @@ class FileActions(Actions):
 
         outfile.close()
 
+        self._finish_save(filepath)
+
+    def _save_binary(self, filepath, io_error_text):
+        """Saves grid to a binary pys file, see save"""
+
+        dict_grid = self.code_array.dict_grid
+
+        # Leave out cell attributes that are overridden by later ones
+        dict_grid.cell_attributes.compact()
+
+        try:
+            write_binary_pys_file(filepath, dict_grid)
+
+        except IOError:
+            self.saving = False
+
+            try:
+                post_command_event(self.main_window, self.StatusBarMsg,
+                                   text=io_error_text)
+            except TypeError:
+                # The main window does not exist any more
+                pass
+            return False
+
+        self._finish_save(filepath)
+
+    def _can_append_journal(self, filepath):
+        """Returns True if a save to filepath can append to the journal"""
+
+        journal = self.journal
+
+        if not config["save_journal"] or journal is None or \
+           journal.filepath != filepath:
+            return False
+
+        # Larger journals are compacted into a full save
+        try:
+            max_size = os.path.getsize(filepath) * \
+                config["journal_compaction_ratio"]
+
+        except OSError:
+            # The pys file has been removed
+            return False
+
+        return journal.can_append(self.code_array.dict_grid, max_size)
+
+    def _save_journal(self, io_error_text):
+        """Appends the changes since the last save to the journal"""
+
+        try:
+            self.journal.append(self.code_array.dict_grid)
+
+        except IOError:
+            self.saving = False
+
+            try:
+                post_command_event(self.main_window, self.StatusBarMsg,
+                                   text=io_error_text)
+            except TypeError:
+                # The main window does not exist any more
+                pass
+            return False
+
         self.saving = False
 
         # Mark content as unchanged
@@ -516,6 +696,194 @@ class FileActions(Actions):
             # The main window does not exist any more
             pass
 
+        # The journal is signed because it is replayed on opening
+
+        self.sign_file(self.journal.journal_filepath)
+
+    def _can_save_in_background(self, filepath):
+        """Returns True if the grid can be saved in a background thread"""
+
+        # Snapshots copy all keys into memory, which the SQLite store
+        # avoids for grids that are larger than memory
+        key_value_store = self.code_array.dict_grid.key_value_store
+
+        return not isinstance(key_value_store, SQLiteKeyValueStore)
+
+    def _save_in_background(self, filepath):
+        """Saves a snapshot of the grid in a background thread
+
+        Editing continues while the snapshot is written. The save is
+        completed in the main thread by _finish_background_save.
+
+        """
+
+        dict_grid = self.code_array.dict_grid
+
+        # Leave out cell attributes that are overridden by later ones
+        dict_grid.cell_attributes.compact()
+
+        snapshot = dict_grid.get_snapshot()
+
+        # Changes during the save mark the content as changed again
+        try:
+            post_command_event(self.main_window, self.ContentChangedMsg,
+                               changed=False)
+        except TypeError:
+            # The main window does not exist any more
+            pass
+
+        errors = []
+
+        thread = threading.Thread(
+            target=self._write_snapshot,
+            args=(snapshot, filepath, config["save_codec"],
+                  config["compression_workers"] or None, errors))
+
+        self.background_save = thread, snapshot, filepath, errors
+
+        thread.start()
+
+        # Background saves cannot be aborted
+        self.saving = False
+
+        statustext = _("Saving {} in background...").format(filepath)
+        try:
+            post_command_event(self.main_window, self.StatusBarMsg,
+                               text=statustext)
+        except TypeError:
+            # The main window does not exist any more
+            pass
+
+    def _write_snapshot(self, snapshot, filepath, codec, workers, errors):
+        """Writes snapshot to filepath, runs in the background save thread
+
+        Errors are appended to errors. No wx calls except for wx.CallAfter
+        are allowed here. The save is always completed in the main thread,
+        also if writing fails.
+
+        """
+
+        try:
+            if is_binary_pys_filepath(filepath):
+                write_binary_pys_file(filepath, snapshot)
+
+            else:
+                # The header is written on opening
+                outfile = open_pys_file(filepath, "wb", codec=codec,
+                                        workers=workers)
+                try:
+                    for generator in self._get_output_generators(snapshot):
+                        for line in generator:
+                            outfile.write(line.encode("utf-8"))
+
+                finally:
+                    outfile.close()
+
+        except Exception, err:
+            # Any error leaves a partial file that must not be signed
+            errors.append(err)
+
+        finally:
+            wx.CallAfter(self._finish_background_save,
+                         threading.current_thread())
+
+    def finish_background_save(self):
+        """Waits for a running background save and completes it"""
+
+        if self.background_save is None:
+            return
+
+        thread = self.background_save[0]
+        thread.join()
+
+        self._finish_background_save(thread)
+
+    def _finish_background_save(self, thread):
+        """Completes the background save of thread in the main thread
+
+        Parameters
+        ----------
+        thread: threading.Thread
+        \tThread that has written the snapshot
+
+        """
+
+        if self.background_save is None or \
+           self.background_save[0] is not thread:
+            # Completed by finish_background_save before. A later save may
+            # already be running.
+            return
+
+        __, snapshot, filepath, errors = self.background_save
+        self.background_save = None
+
+        snapshot.release()
+
+        if errors:
+            self.saving = False
+
+            statustext = _("Error writing to file {}.").format(filepath)
+            try:
+                post_command_event(self.main_window, self.StatusBarMsg,
+                                   text=statustext)
+                post_command_event(self.main_window, self.ContentChangedMsg,
+                                   changed=True)
+            except TypeError:
+                # The main window does not exist any more
+                pass
+            return
+
+        statustext = _("{} saved.").format(filepath)
+        try:
+            post_command_event(self.main_window, self.StatusBarMsg,
+                               text=statustext)
+        except TypeError:
+            # The main window does not exist any more
+            pass
+
+        self._finish_save(filepath, snapshot)
+
+    def _finish_save(self, filepath, snapshot=None):
+        """Marks content as unchanged and signs file after saving
+
+        Parameters
+        ----------
+        filepath: String
+        \tPath of the saved file
+        snapshot: GridSnapshot, defaults to None
+        \tSnapshot that has been saved in the background. The content has
+        \tbeen marked as unchanged when the snapshot was taken.
+
+        """
+
+        dict_grid = self.code_array.dict_grid
+
+        # The full file contains all journaled changes
+        journal = Journal(filepath)
+        journal.remove()
+
+        if snapshot is not None and snapshot.is_cleared:
+            # Another grid has been opened or created during the save
+            pass
+
+        elif config["save_journal"]:
+            journal.start(dict_grid, snapshot)
+            self.journal = journal
+
+        else:
+            self.journal = None
+
+        self.saving = False
+
+        # Mark content as unchanged
+        if snapshot is None:
+            try:
+                post_command_event(self.main_window, self.ContentChangedMsg,
+                                   changed=False)
+            except TypeError:
+                # The main window does not exist any more
+                pass
+
         # Sign so that the new file may be retrieved without safe mode
 
         self.sign_file(filepath)
@@ -738,7 +1106,8 @@ class TableActions(TableRowActionsMixin, TableColumnActionsMixin,
         row_overflow = False
         col_overflow = False
 
-        no_pasted_cells = 0
+        # Pasted cells are set together as one undo operation
+        cells = {}
 
         for src_row, row_data in enumerate(data):
             target_row = tl_row + src_row
@@ -761,17 +1130,11 @@ class TableActions(TableRowActionsMixin, TableColumnActionsMixin,
 
                 if cell_data is not None:
                     # Is only None if pasting into selection
-                    key = target_row, target_col, tl_tab
+                    cells[target_row, target_col, tl_tab] = cell_data
 
-                    try:
-                        # Set cell but do not mark unredo
-                        # before pasting is finished
+        self.grid.code_array.replace_cells(cells)
 
-                        self.grid.code_array.__setitem__(key, cell_data,
-                                                         mark_unredo=False)
-                        no_pasted_cells += 1
-                    except KeyError:
-                        pass
+        no_pasted_cells = len(cells)
 
         if row_overflow or col_overflow:
             self._show_final_overflow_message(row_overflow, col_overflow)
@@ -779,10 +1142,6 @@ class TableActions(TableRowActionsMixin, TableColumnActionsMixin,
         else:
             self._show_final_paste_message(tl_key, no_pasted_cells)
 
-        if no_pasted_cells:
-            # If cells have been pasted mark unredo operation
-            self.grid.code_array.unredo.mark()
-
         self.pasting = False
 
     def selection_paste_data_gen(self, selection, data):
@@ -907,6 +1266,63 @@ class GridActions(Actions):
         _grid_table = GridTable(self.grid, self.grid.code_array)
         self.grid.SetTable(_grid_table, True)
 
+    def recalculate(self):
+        """Recalculates all cells
+
+        The GUI process is not forked so that cells are evaluated serially.
+
+        """
+
+        processes = config["recalc_processes"]
+        if processes < 1:
+            # Use all CPUs
+            processes = None
+
+        wx.BeginBusyCursor()
+
+        try:
+            self.code_array.recalculate(processes=processes)
+
+        finally:
+            wx.EndBusyCursor()
+
+    def toggle_profiling(self):
+        """Starts or stops profiling of cell evaluations
+
+        Results are recalculated so that their costs are recorded.
+        While profiling, the renderer tints cells by cost.
+
+        """
+
+        profiling = self.code_array.profiler is None
+
+        self.code_array.set_profiling(profiling)
+        self.grid.grid_renderer.profile_overlay = profiling
+
+        if profiling:
+            self.code_array.result_cache.clear()
+
+    def export_profile(self, filepath):
+        """Exports evaluation costs of all profiled cells as CSV"""
+
+        profiler = self.code_array.profiler
+
+        if profiler is None:
+            statustext = _("Profiling is off. Nothing exported.")
+            post_command_event(self.main_window, self.StatusBarMsg,
+                               text=statustext)
+            return
+
+        try:
+            with open(filepath, "wb") as outfile:
+                profiler.to_csv(outfile)
+
+        except IOError, err:
+            msg = _("The file {} could not be fully written\n \n"
+                    "Error message:\n{}").format(filepath, err)
+            short_msg = _('Error writing CSV file')
+            self.main_window.interfaces.display_warning(msg, short_msg)
+
     # Zoom actions
 
     def _zoom_rows(self, zoom):
@@ -1098,6 +1514,31 @@ class GridActions(Actions):
 
     cursor = property(get_cursor, set_cursor)
 
+    def move_to_next_cell(self, axis, reverse=False):
+        """Moves the cursor to the next cell with content along axis
+
+        The cursor moves to the grid border if there is no such cell.
+
+        Parameters
+        ----------
+
+        axis: Integer in [0, 1]
+        \tThe cursor moves down the column for 0 and right in the row for 1
+        reverse: Bool, defaults to False
+        \tThe cursor moves up or left if True
+
+        """
+
+        key = self.cursor
+
+        next_key = self.code_array.dict_grid.get_next_key(key, axis, reverse)
+
+        if next_key is None:
+            next_key = list(key)
+            next_key[axis] = 0 if reverse else self.code_array.shape[axis] - 1
+
+        self.cursor = tuple(next_key[:2])
+
 
 class SelectionActions(Actions):
     """Actions that affect the grid selection"""
@@ -1165,13 +1606,11 @@ class SelectionActions(Actions):
 
         selection = self.get_selection()
 
-        del_keys = [key for key in self.grid.code_array
-                        if key[:2] in selection]
-
-        for key in del_keys:
-            self.grid.actions.delete_cell(key)
+        # Deleted cells are one undo operation
+        del_cells = dict((key, None) for key in self.grid.code_array
+                         if key[:2] in selection)
 
-        self.grid.code_array.result_cache.clear()
+        self.grid.code_array.replace_cells(del_cells)
 
 
 class FindActions(Actions):
@@ -1278,4 +1717,32 @@ class AllGridActions(FileActions, TableActions, UnRedoActions,
         if bb_right is None:
             bb_right = self.code_array.shape[1] - 1
 
+        return (bb_top, bb_left), (bb_bottom, bb_right)
+
+    def get_used_bbox(self, bbox):
+        """Returns bbox, in which None is replaced by the used area
+
+        Missing top and left boundaries become 0. Missing bottom and right
+        boundaries become the last row and col with content in the current
+        table but not less than top and left.
+
+        """
+
+        (bb_top, bb_left), (bb_bottom, bb_right) = bbox
+
+        dict_grid = self.code_array.dict_grid
+        tab = self.grid.current_table
+
+        if bb_top is None:
+            bb_top = 0
+
+        if bb_left is None:
+            bb_left = 0
+
+        if bb_bottom is None:
+            bb_bottom = max(bb_top, dict_grid.get_max_position(0, tab))
+
+        if bb_right is None:
+            bb_right = max(bb_left, dict_grid.get_max_position(1, tab))
+
         return (bb_top, bb_left), (bb_bottom, bb_right)
\ No newline at end of file
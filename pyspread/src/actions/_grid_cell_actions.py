@@ -460,11 +460,24 @@ class CellActions(Actions):
             if tab == self.grid.actions.cursor[2] and \
                "frozen" in attr_dict and attr_dict["frozen"]:
                 # Only single cells are allowed for freezing
-                skey = attr_selection.cells[0]
-                if skey in selection:
-                    key = tuple(list(skey) + [tab])
-                    code = self.grid.code_array(key)
-                    result = self.grid.code_array._eval_cell(key, code)
-                    self.grid.code_array.frozen_cache[repr(key)] = result
-
-        cell_attributes._attr_cache.clear()
\ No newline at end of file
+                # Several cells are frozen together after compaction
+                for skey in attr_selection.cells:
+                    if skey in selection:
+                        key = tuple(list(skey) + [tab])
+                        code = self.grid.code_array(key)
+                        result = self.grid.code_array._eval_cell(key, code)
+                        self.grid.code_array.frozen_cache[repr(key)] = result
+
+        cell_attributes.clear_cache()
+
+    def compact_attributes(self):
+        """Removes overridden cell attribute entries and shows their number"""
+
+        cell_attributes = self.grid.code_array.cell_attributes
+
+        no_removed = cell_attributes.compact()
+
+        statustext = _("{} of {} cell attribute entries removed.").format(
+            no_removed, no_removed + len(cell_attributes))
+        post_command_event(self.main_window, self.StatusBarMsg,
+                           text=statustext)
@@ -259,9 +259,6 @@ class ClipboardActions(Actions):
 
         """
 
-        if getter is None:
-            getter = self._get_code
-
         tab = self.grid.current_table
 
         selection_bbox = selection.get_bbox()
@@ -275,37 +272,45 @@ class ClipboardActions(Actions):
             (bb_top, bb_left), (bb_bottom, bb_right) = \
                             replace_none(selection.get_bbox())
 
-        data = []
+        if getter is None:
+            # Only cells with code are visited
+            getter = self._get_code
+            keys = self.grid.code_array.dict_grid.get_block_keys(
+                bb_top, bb_left, bb_bottom, bb_right, tab)
+
+        else:
+            keys = ((__row, __col, tab)
+                    for __row in xrange(bb_top, bb_bottom + 1)
+                    for __col in xrange(bb_left, bb_right + 1))
+
+        data = [[u""] * (bb_right - bb_left + 1)
+                for __ in xrange(bb_top, bb_bottom + 1)]
 
-        for __row in xrange(bb_top, bb_bottom + 1):
-            data.append([])
+        # Cells that are deleted as one undo operation
+        del_cells = {}
 
-            for __col in xrange(bb_left, bb_right + 1):
-                # Only copy content if cell is in selection or
-                # if there is no selection
+        for key in keys:
+            __row, __col, __ = key
 
-                if (__row, __col) in selection or not selection_bbox:
-                    content = getter((__row, __col, tab))
+            # Only copy content if cell is in selection or
+            # if there is no selection
 
-                    # Delete cell if delete flag is set
+            if selection_bbox and (__row, __col) not in selection:
+                continue
 
-                    if delete:
-                        try:
-                            self.grid.code_array.pop((__row, __col, tab))
+            content = getter(key)
 
-                        except KeyError:
-                            pass
+            # Delete cell if delete flag is set
 
-                    # Store data
+            if delete:
+                del_cells[key] = None
 
-                    if content is None:
-                        data[-1].append(u"")
+            # Store data
 
-                    else:
-                        data[-1].append(content)
+            if content is not None:
+                data[__row - bb_top][__col - bb_left] = content
 
-                else:
-                    data[-1].append(u"")
+        self.grid.code_array.replace_cells(del_cells)
 
         return "\n".join("\t".join(line) for line in data)
 
@@ -0,0 +1,394 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+
+==============
+pyspread-batch
+==============
+
+Headless evaluation of pyspread files
+
+Run this script to evaluate a pys file without a display, e.g. for
+scheduled computations. No wx application and no windows are created.
+The results are written as CSV or as NumPy .npy file.
+
+Note that file signatures are not checked. Only evaluate trusted files.
+
+Provides
+--------
+
+* Commandlineparser: Gets command line options and parameters
+* load: Loads a pys file into a CodeArray
+* get_ranges: Returns the cell ranges that are evaluated
+* write_csv: Writes results as CSV
+* main: Loads, evaluates and writes results
+
+"""
+
+import cPickle
+import csv
+import optparse
+import sys
+
+import numpy
+
+from sysvars import get_program_path
+
+import lib.i18n as i18n
+
+#use ugettext instead of getttext to avoid unicode errors
+_ = i18n.language.ugettext
+
+sys.setrecursionlimit(10000)
+sys.path.insert(0, get_program_path())
+
+from src.lib.compression import open_pys_file
+from src.lib.binary_format import BinaryPysFile, is_binary_pys_file
+from src.lib.journal import Journal
+from src.model.model import CodeArray
+from src.model.sqlite_store import SQLiteKeyValueStore
+
+
+class Commandlineparser(object):
+    """
+    Command line handling
+
+    Methods:
+    --------
+
+    parse: Returns command line options and arguments as 2-tuple
+
+    """
+
+    def __init__(self):
+        from src.config import config
+
+        usage = _("usage: %prog [options] filename")
+        version = _("%prog {}").format(config["version"])
+        self.parser = optparse.OptionParser(usage=usage, version=version)
+
+        self.parser.add_option("-o", "--output", dest="output",
+            default=None,
+            help=_("Output file, .npy for a NumPy array and CSV otherwise "
+                   "[default: CSV to stdout]"))
+
+        self.parser.add_option("-t", "--table", type="int", dest="table",
+            default=None,
+            help=_("Table that is evaluated [default: all tables]"))
+
+        self.parser.add_option("-r", "--rows", dest="rows", default=None,
+            help=_("Rows that are evaluated as start:stop "
+                   "[default: all rows with content]"))
+
+        self.parser.add_option("-c", "--cols", dest="cols", default=None,
+            help=_("Columns that are evaluated as start:stop "
+                   "[default: all columns with content]"))
+
+        self.parser.add_option("-p", "--processes", type="int",
+            dest="processes", default=1,
+            help=_("Number of worker processes in which all cells are "
+                   "recalculated before the output is written, 0 means "
+                   "number of CPUs [default: 1]"))
+
+        self.parser.add_option("-s", "--store", dest="store", default=None,
+            help=_("SQLite database file in which the cells are stored "
+                   "instead of memory, e.g. for files that are larger "
+                   "than the memory [default: memory]"))
+
+        self.parser.add_option("--no-macros", action="store_false",
+            dest="macros", default=True,
+            help=_("Do not execute macros before evaluation"))
+
+        self.parser.add_option("--profile", action="store_true",
+            dest="profile", default=False,
+            help=_("Profile cell evaluations and print a report of the "
+                   "slowest cells and tables to stderr, cells that are "
+                   "recalculated in worker processes are not profiled"))
+
+    def parse(self):
+        """
+        Returns a a tuple (options, filepath)
+
+        options: The command line options
+        filepath: String
+        \tThe name of the file that is evaluated
+
+        """
+
+        options, args = self.parser.parse_args()
+
+        if len(args) != 1:
+            self.parser.error(_("Exactly one file has to be given."))
+
+        for option in ["rows", "cols"]:
+            value = getattr(options, option)
+            if value is None:
+                continue
+
+            try:
+                start, stop = (int(ele) if ele else None
+                               for ele in value.split(":"))
+
+            except ValueError:
+                self.parser.error(
+                    _("Option --{} requires start:stop.").format(option))
+
+            setattr(options, option, slice(start, stop))
+
+        return options, args[0]
+
+# end of class Commandlineparser
+
+
+def _load_text(filepath, dict_grid):
+    """Loads the content of the text pys file filepath into dict_grid"""
+
+    section_readers = {
+        "[shape]": dict_grid.parse_to_shape,
+        "[grid]": dict_grid.parse_to_grid,
+        "[attributes]": dict_grid.parse_to_attribute,
+        "[row_heights]": dict_grid.parse_to_height,
+        "[col_widths]": dict_grid.parse_to_width,
+        "[macros]": dict_grid.parse_to_macro,
+    }
+
+    infile = open_pys_file(filepath, "r")
+
+    try:
+        if infile.readline().strip() != "[Pyspread save file version]":
+            raise ValueError(_("File format unsupported."))
+
+        version = infile.readline().strip()
+        if version != "0.1":
+            raise ValueError(
+                _("File version {} unsupported (not 0.1).").format(version))
+
+        parser = None
+
+        for line in infile:
+            stripped_line = line.decode("utf-8").strip()
+            if not stripped_line:
+                continue
+
+            if stripped_line in section_readers:
+                parser = section_readers[stripped_line]
+
+            elif parser is None:
+                raise ValueError(_("No section parser present."))
+
+            else:
+                parser(line)
+
+    except EOFError:
+        # Normally on empty grids
+        pass
+
+    finally:
+        infile.close()
+
+
+def load(filepath, store_filepath=None):
+    """Returns CodeArray with the content of the pys file filepath
+
+    Text and binary pys files are detected from the file content. A
+    journal of changes next to the file is replayed.
+
+    Parameters
+    ----------
+    filepath: String
+    \tPath of the pys file
+    store_filepath: String, defaults to None
+    \tPath of an SQLite database file in which the cells are stored.
+    \tCells that are present in the database are replaced.
+    \tNone stores the cells in the store that is selected in the config.
+
+    """
+
+    if store_filepath is None:
+        key_value_store = None
+
+    else:
+        key_value_store = SQLiteKeyValueStore(store_filepath)
+        key_value_store.clear()
+
+    code_array = CodeArray((1, 1, 1), key_value_store)
+    dict_grid = code_array.dict_grid
+
+    if is_binary_pys_file(filepath):
+        infile = BinaryPysFile(filepath)
+
+        try:
+            infile.load(dict_grid)
+
+        finally:
+            infile.close()
+
+    else:
+        _load_text(filepath, dict_grid)
+
+    if not Journal(filepath).replay(dict_grid):
+        print >> sys.stderr, \
+            _("Journal of file {} ignored.").format(filepath)
+
+    if key_value_store is not None:
+        key_value_store.flush()
+
+    return code_array
+
+
+def get_ranges(code_array, rows=None, cols=None, table=None):
+    """Returns list of (row slice, column slice, table) that are evaluated
+
+    Rows and columns that are None are limited to the cells with content.
+
+    Parameters
+    ----------
+    code_array: CodeArray
+    \tThe loaded grid
+    rows: Slice, defaults to None
+    \tEvaluated rows
+    cols: Slice, defaults to None
+    \tEvaluated columns
+    table: Integer, defaults to None
+    \tEvaluated table, None means all tables
+
+    """
+
+    if table is None:
+        tables = xrange(code_array.shape[2])
+    else:
+        tables = [table]
+
+    dict_grid = code_array.dict_grid
+
+    if rows is None:
+        max_row = dict_grid.get_max_position(0, table)
+        rows = slice(0, 0 if max_row is None else max_row + 1)
+
+    if cols is None:
+        max_col = dict_grid.get_max_position(1, table)
+        cols = slice(0, 0 if max_col is None else max_col + 1)
+
+    return [(rows, cols, tab) for tab in tables]
+
+
+def _to_csv_field(value):
+    """Returns CSV field string for a cell result"""
+
+    if value is None:
+        return ""
+
+    elif isinstance(value, str):
+        return value
+
+    return unicode(value).encode("utf-8")
+
+
+def write_csv(outfile, arrays):
+    """Writes 2D result arrays as CSV to outfile
+
+    Tables are separated by an empty line.
+
+    Parameters
+    ----------
+    outfile: File
+    \tOpen file to which the CSV data is written
+    arrays: List of numpy.array
+    \tResults of one table each
+
+    """
+
+    writer = csv.writer(outfile)
+
+    for i, array in enumerate(arrays):
+        if i:
+            writer.writerow([])
+
+        for row in array:
+            writer.writerow(map(_to_csv_field, row))
+
+
+def main():
+    """Loads, evaluates and writes the results of the file on the command line
+
+    The exit status is 1 if the file cannot be loaded or the results cannot
+    be written and 2 if the results of any evaluated cell is an exception.
+
+    """
+
+    options, filepath = Commandlineparser().parse()
+
+    try:
+        code_array = load(filepath, options.store)
+
+    except (IOError, ValueError), err:
+        print >> sys.stderr, _("Error loading file {}: {}").format(filepath,
+                                                                    err)
+        return 1
+
+    if options.profile:
+        code_array.set_profiling()
+
+    if options.macros:
+        macro_output = code_array.execute_macros()
+        if macro_output:
+            sys.stderr.write(macro_output)
+
+    # Cells that assign global variables are evaluated first
+    code_array.recalculate(processes=options.processes or None)
+
+    arrays = [code_array[key] for key in
+              get_ranges(code_array, options.rows, options.cols,
+                         options.table)]
+
+    try:
+        if options.output is None:
+            write_csv(sys.stdout, arrays)
+
+        elif options.output.endswith(".npy"):
+            # Tables are stacked along the last axis like the grid keys
+            numpy.save(options.output, numpy.dstack(arrays))
+
+        else:
+            outfile = open(options.output, "wb")
+            try:
+                write_csv(outfile, arrays)
+            finally:
+                outfile.close()
+
+    except (IOError, cPickle.PicklingError, TypeError), err:
+        # Object arrays are pickled into npy files
+        print >> sys.stderr, _("Error writing results: {}").format(err)
+        return 1
+
+    if options.profile:
+        print >> sys.stderr, code_array.profiler.get_report()
+
+    for array in arrays:
+        if any(isinstance(result, Exception) for result in array.flat):
+            return 2
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -26,10 +26,16 @@ pyspread config file
 """
 
 from ast import literal_eval
+import os
 
-import wx
+try:
+    import wx
 
-from sysvars import get_color, get_font_string
+except ImportError:
+    # Headless mode, e.g. for batch evaluation
+    wx = None
+
+from sysvars import get_color, get_font_string, is_headless
 
 VERSION = "0.2.3"
 
@@ -38,24 +44,37 @@ class DefaultConfig(object):
     """Contains default config for starting pyspread without resource file"""
 
     def __init__(self):
+        # Without wx application, system settings are not accessible
+        headless = is_headless()
+
         # User defined paths
         # ------------------
 
-        standardpaths = wx.StandardPaths.Get()
-        self.work_path = standardpaths.GetDocumentsDir()
+        if headless:
+            self.work_path = os.path.expanduser("~")
+
+        else:
+            standardpaths = wx.StandardPaths.Get()
+            self.work_path = standardpaths.GetDocumentsDir()
 
         # Window configuration
         # --------------------
 
+        if headless:
+            display_size = (1024, 768)
+
+        else:
+            display_size = wx.GetDisplaySize()
+
         self.window_position = "(10, 10)"
-        self.window_size = repr((wx.GetDisplaySize()[0] * 9 / 10,
-                                 wx.GetDisplaySize()[1] * 9 / 10))
+        self.window_size = repr((display_size[0] * 9 / 10,
+                                 display_size[1] * 9 / 10))
         self.window_layout = "''"
         self.icon_theme = "'Tango'"
 
-        self.help_window_position = repr((wx.GetDisplaySize()[0] * 7 / 10, 15))
-        self.help_window_size = repr((wx.GetDisplaySize()[0] * 3 / 10,
-                                      wx.GetDisplaySize()[1] * 7 / 10))
+        self.help_window_position = repr((display_size[0] * 7 / 10, 15))
+        self.help_window_size = repr((display_size[0] * 3 / 10,
+                                      display_size[1] * 7 / 10))
 
         # Grid configuration
         # ------------------
@@ -68,18 +87,78 @@ class DefaultConfig(object):
 
         self.max_unredo = "5000"
 
+        # Maximum estimated memory of the undo history in bytes
+        self.max_unredo_bytes = "268435456"
+
+        # Store undo steps that exceed the limits in a temporary file
+        # instead of discarding them
+        self.unredo_spill = "False"
+
+        # Storage of cell code, "dict", "compact" for large grids or "sqlite"
+        # for grids that are larger than the memory
+        self.key_value_store = repr("dict")
+
+        # Maximum number of cached cell attribute dicts of each grid
+        self.attr_cache_max_entries = "20000"
+
+        # Limits of the result cache, None means no limit
+        self.result_cache_max_entries = "100000"
+        self.result_cache_max_bytes = "536870912"
+
+        # Compression of saved files, "bz2", "zlib", "lzma" or "none".
+        # Only bz2 files can be read by older pyspread versions.
+        self.save_codec = repr("bz2")
+
+        # Number of threads that compress saved files, 0 means number of
+        # CPUs. With more than one thread, files consist of several bz2
+        # streams, of which older pyspread versions read only the first.
+        self.compression_workers = "1"
+
+        # Save changes since the last full save to a journal next to the
+        # pys file. Older pyspread versions ignore the journal.
+        self.save_journal = "False"
+
+        # Journal size relative to the pys file size above which the next
+        # save writes the full file and removes the journal
+        self.journal_compaction_ratio = "0.5"
+
+        # Save from a snapshot of the grid in a background thread, so that
+        # editing continues during the save
+        self.background_save = "True"
+
+        # Seconds between automatic background saves of changed files that
+        # have a file path, 0 disables autosave
+        self.autosave_interval = "0"
+
+        # Number of processes for recalculation, 0 means number of CPUs
+        self.recalc_processes = "0"
+
         # Maximum result length in a cell in characters
         self.max_result_length = "1000"
 
-        # Colors
-        self.grid_color = repr(get_color(wx.SYS_COLOUR_3DSHADOW))
-        self.selection_color = repr(get_color(wx.SYS_COLOUR_HIGHLIGHT))
-        self.background_color = repr(get_color(wx.SYS_COLOUR_WINDOW))
-        self.text_color = repr(get_color(wx.SYS_COLOUR_WINDOWTEXT))
+        # Evaluate cells in a background thread, visible cells first
+        self.background_evaluation = "True"
+
+        # Text that is shown in cells while they are evaluated
+        self.evaluation_placeholder = repr(u"...")
+
+        # Colors and fonts
 
-        # Fonts
+        if headless:
+            self.grid_color = repr((160, 160, 160))
+            self.selection_color = repr((51, 153, 255))
+            self.background_color = repr((255, 255, 255))
+            self.text_color = repr((0, 0, 0))
 
-        self.font = repr(get_font_string(wx.SYS_DEFAULT_GUI_FONT))
+            self.font = repr(u"Sans")
+
+        else:
+            self.grid_color = repr(get_color(wx.SYS_COLOUR_3DSHADOW))
+            self.selection_color = repr(get_color(wx.SYS_COLOUR_HIGHLIGHT))
+            self.background_color = repr(get_color(wx.SYS_COLOUR_WINDOW))
+            self.text_color = repr(get_color(wx.SYS_COLOUR_WINDOWTEXT))
+
+            self.font = repr(get_font_string(wx.SYS_DEFAULT_GUI_FONT))
 
         # Default cell font size
 
@@ -129,7 +208,12 @@ class Config(object):
 
         self.data = DefaultConfig()
 
-        self.cfg_file = wx.Config(self.config_filename)
+        # Headless configurations are not read from or written to disk
+        if is_headless():
+            self.cfg_file = None
+
+        else:
+            self.cfg_file = wx.Config(self.config_filename)
 
         self.load()
 
@@ -152,6 +236,9 @@ class Config(object):
         # Reset data
         self.data.__dict__.update(self.defaults.__dict__)
 
+        if self.cfg_file is None:
+            return
+
         for key in self.defaults.__dict__:
             if self.cfg_file.Exists(key):
                 setattr(self.data, key, self.cfg_file.Read(key))
@@ -159,6 +246,9 @@ class Config(object):
     def save(self):
         """Saves configuration file"""
 
+        if self.cfg_file is None:
+            return
+
         for key in self.defaults.__dict__:
             data = getattr(self.data, key)
 
@@ -1139,6 +1139,22 @@ class PreferencesDialog(wx.Dialog):
             "widget_params": {"min": 0, "allow_long": True},
             "prepocessor": int,
         }),
+        ("max_unredo_bytes", {
+            "label": _(u"Max. undo memory"),
+            "tooltip": _(u"Maximum estimated memory of all undo steps in "
+                         u"bytes, the oldest steps are discarded first"),
+            "widget": wx.lib.intctrl.IntCtrl,
+            "widget_params": {"min": 0, "allow_long": True},
+            "prepocessor": int,
+        }),
+        ("unredo_spill", {
+            "label": _(u"Keep old undo steps on disk"),
+            "tooltip": _(u"If True then undo steps that exceed the limits "
+                         u"are stored in a temporary file"),
+            "widget": CheckBoxCtrl,
+            "widget_params": {},
+            "prepocessor": bool,
+        }),
         ("grid_rows", {
             "label": _(u"Grid rows"),
             "tooltip": _(u"Number of grid rows when starting pyspread"),
@@ -116,6 +116,7 @@ class GridCellEventMixin(object):
     FontStrikethroughMsg, EVT_CMD_FONTSTRIKETHROUGH = new_command_event()
     FrozenMsg, EVT_CMD_FROZEN = new_command_event()
     MergeMsg, EVT_CMD_MERGE = new_command_event()
+    CompactAttributesMsg, EVT_CMD_COMPACT_ATTRIBUTES = new_command_event()
     JustificationMsg, EVT_CMD_JUSTIFICATION = new_command_event()
     AlignmentMsg, EVT_CMD_ALIGNMENT = new_command_event()
     BorderChoiceMsg, EVT_CMD_BORDERCHOICE = new_command_event()
@@ -166,6 +167,9 @@ class GridEventMixin(object):
     # Grid view events
 
     RefreshSelectionMsg, EVT_CMD_REFRESH_SELECTION = new_command_event()
+    RecalculateMsg, EVT_CMD_RECALCULATE = new_command_event()
+    ProfileToggleMsg, EVT_CMD_PROFILE_TOGGLE = new_command_event()
+    ExportProfileMsg, EVT_CMD_EXPORT_PROFILE = new_command_event()
     DisplayGotoCellDialogMsg, EVT_CMD_DISPLAY_GOTO_CELL_DIALOG = \
                                                         new_command_event()
     GotoCellMsg, EVT_CMD_GOTO_CELL = new_command_event()
@@ -35,6 +35,7 @@ import wx.grid
 from _events import post_command_event, EventMixin
 
 from _grid_table import GridTable
+from _grid_evaluator import BackgroundEvaluator
 from _grid_renderer import GridRenderer
 from _gui_interfaces import GuiInterfaces
 from _menubars import ContextMenu
@@ -69,6 +70,13 @@ class Grid(wx.grid.Grid, EventMixin):
 
         # Create new grid
         self.code_array = CodeArray(dimensions)
+
+        # Evaluates cells in a worker thread, visible cells first
+        if config["background_evaluation"]:
+            self.evaluator = BackgroundEvaluator(self)
+        else:
+            self.evaluator = None
+
         post_command_event(self, self.GridActionNewMsg, shape=dimensions)
 
         _grid_table = GridTable(self, self.code_array)
@@ -134,6 +142,7 @@ class Grid(wx.grid.Grid, EventMixin):
         # Non wx.Grid events
 
         self.Bind(wx.EVT_MOUSEWHEEL, handlers.OnMouseWheel)
+        self.Bind(wx.EVT_IDLE, handlers.OnIdle)
         self.Bind(wx.EVT_KEY_DOWN, handlers.OnKey)
 
         # Grid events
@@ -165,6 +174,8 @@ class Grid(wx.grid.Grid, EventMixin):
                     c_handlers.OnCellFontStrikethrough)
         main_window.Bind(self.EVT_CMD_FROZEN, c_handlers.OnCellFrozen)
         main_window.Bind(self.EVT_CMD_MERGE, c_handlers.OnMerge)
+        main_window.Bind(self.EVT_CMD_COMPACT_ATTRIBUTES,
+                    c_handlers.OnCompactAttributes)
         main_window.Bind(self.EVT_CMD_JUSTIFICATION,
                     c_handlers.OnCellJustification)
         main_window.Bind(self.EVT_CMD_ALIGNMENT, c_handlers.OnCellAlignment)
@@ -188,6 +199,9 @@ class Grid(wx.grid.Grid, EventMixin):
 
         main_window.Bind(self.EVT_CMD_REFRESH_SELECTION,
                     handlers.OnRefreshSelectedCells)
+        main_window.Bind(self.EVT_CMD_RECALCULATE, handlers.OnRecalculate)
+        main_window.Bind(self.EVT_CMD_PROFILE_TOGGLE, handlers.OnProfileToggle)
+        main_window.Bind(self.EVT_CMD_EXPORT_PROFILE, handlers.OnExportProfile)
         main_window.Bind(self.EVT_CMD_DISPLAY_GOTO_CELL_DIALOG,
                     handlers.OnDisplayGoToCellDialog)
         main_window.Bind(self.EVT_CMD_GOTO_CELL, handlers.OnGoToCell)
@@ -451,6 +465,13 @@ class GridCellEventHandlers(object):
 
         self.grid.ForceRefresh()
 
+    def OnCompactAttributes(self, event):
+        """Compact cell attributes event handler"""
+
+        self.grid.actions.compact_attributes()
+
+        event.Skip()
+
     def OnCellJustification(self, event):
         """Horizontal cell justification event handler"""
 
@@ -682,6 +703,17 @@ class GridEventHandlers(object):
 
                 grid.MoveCursorDown(False)
 
+            elif keycode in [314, 315, 316, 317] and not event.ShiftDown():
+                # <Ctrl> + <Arrow key>
+                # Jump to next cell with content in the direction of the key
+
+                axis = 0 if keycode in [315, 317] else 1
+                reverse = keycode in [314, 315]
+
+                self.grid.actions.move_to_next_cell(axis, reverse)
+
+                return
+
         else:
             # No Ctrl pressed
 
@@ -739,6 +771,36 @@ class GridEventHandlers(object):
 
         event.Skip()
 
+    def OnRecalculate(self, event):
+        """Event handler for recalculating all cells via menu"""
+
+        self.grid.actions.recalculate()
+        self.grid.ForceRefresh()
+
+        event.Skip()
+
+    def OnProfileToggle(self, event):
+        """Event handler for starting and stopping cell profiling"""
+
+        self.grid.actions.toggle_profiling()
+        self.grid.ForceRefresh()
+
+        event.Skip()
+
+    def OnExportProfile(self, event):
+        """Event handler for exporting the cell profile as CSV"""
+
+        wildcard = _("CSV file (*.*)|*.*")
+        message = _("Choose filename for profile export.")
+        style = wx.SAVE | wx.CHANGE_DIR
+        filepath, __ = self.grid.interfaces.get_filepath_findex_from_user(
+                                    wildcard, message, style)
+
+        if filepath is not None:
+            self.grid.actions.export_profile(filepath)
+
+        event.Skip()
+
     def OnZoomIn(self, event):
         """Event handler for increasing grid zoom"""
 
@@ -767,6 +829,14 @@ class GridEventHandlers(object):
 
         event.Skip()
 
+    def OnIdle(self, event):
+        """Event handler for evaluating off-screen cells when idle"""
+
+        if self.grid.evaluator is not None:
+            self.grid.evaluator.on_idle(event)
+
+        event.Skip()
+
     def OnMouseWheel(self, event):
         """Event handler for mouse wheel actions
 
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+
+"""
+_grid_evaluator
+===============
+
+Provides
+--------
+
+1) BackgroundEvaluator: Evaluates cells in a worker thread
+
+"""
+
+from collections import deque
+from itertools import islice
+import threading
+
+import wx
+
+# Returned by CodeArray.get_cached_result for cells that need evaluation
+PENDING = object()
+
+
+class BackgroundEvaluator(object):
+    """Evaluates cells in a worker thread so that the GUI stays responsive
+
+    Cells that are requested by the renderer are evaluated first, most
+    recently requested cells before older ones. Off-screen cells without
+    results are queued when the application is idle. The grid is refreshed
+    when requested cells have been evaluated.
+
+    Each cell is evaluated at most once per generation of the result
+    cache. Results that are removed by later evaluations, e.g. by global
+    assignments or by eviction, are not queued again. Otherwise, such
+    cells would be evaluated endlessly.
+
+    Parameters
+    ----------
+    grid: Grid
+    \tThe main grid
+
+    """
+
+    # Number of cells that are checked in one idle event
+    idle_chunk_size = 100
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.code_array = grid.code_array
+
+        self.condition = threading.Condition()
+
+        # Keys of visible cells, evaluated last in first out
+        self.visible = deque()
+
+        # Keys of off-screen cells, evaluated first in first out
+        self.idle = deque()
+
+        self.queued = set()
+
+        # Keys of cells that have been evaluated in the current generation
+        self.evaluated = set()
+        self._generation = None
+
+        # Iterator over cell keys that are checked for missing results
+        self._scan = None
+        self._scan_done = False
+
+        self._refresh_pending = False
+
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _check_generation(self):
+        """Starts a new scan if the result cache generation has changed
+
+        Must be called with self.condition acquired.
+
+        """
+
+        generation = self.code_array.result_cache.generation
+
+        if generation != self._generation:
+            self._generation = generation
+            self.evaluated.clear()
+
+            self._scan = None
+            self._scan_done = False
+
+    def is_evaluated(self, key):
+        """Returns True if key has been evaluated in the current generation"""
+
+        with self.condition:
+            self._check_generation()
+
+            return key in self.evaluated
+
+    def request(self, key):
+        """Queues visible cell key for evaluation"""
+
+        with self.condition:
+            self._check_generation()
+
+            if key in self.queued or key in self.evaluated:
+                return
+
+            self.queued.add(key)
+            self.visible.append(key)
+
+            self.condition.notify()
+
+    def clear(self):
+        """Removes all queued keys"""
+
+        with self.condition:
+            self.visible.clear()
+            self.idle.clear()
+            self.queued.clear()
+            self.evaluated.clear()
+
+            self._scan = None
+            self._scan_done = False
+
+    def on_idle(self, event):
+        """Queues a chunk of off-screen cells that have no result
+
+        Parameters
+        ----------
+        event: wx.IdleEvent
+        \tMore idle events are requested until all cells are checked
+
+        """
+
+        if self.visible:
+            return
+
+        with self.condition:
+            self._check_generation()
+
+            if self._scan_done:
+                # All cells have been checked in this generation
+                return
+
+            if self._scan is None:
+                self._scan = iter(self.code_array.keys())
+
+            scan = self._scan
+
+        keys = list(islice(scan, self.idle_chunk_size))
+
+        with self.condition:
+            if scan is not self._scan:
+                # A new generation has started during the scan
+                event.RequestMore()
+                return
+
+            if not keys:
+                self._scan = None
+                self._scan_done = True
+                return
+
+            for key in keys:
+                if key not in self.queued and key not in self.evaluated and \
+                   self.code_array.get_cached_result(key, PENDING) is PENDING:
+                    self.queued.add(key)
+                    self.idle.append(key)
+
+            self.condition.notify()
+
+        event.RequestMore()
+
+    def _run(self):
+        """Worker thread loop"""
+
+        while True:
+            with self.condition:
+                while not self.visible and not self.idle:
+                    self.condition.wait()
+
+                if self.visible:
+                    key = self.visible.pop()
+                    is_visible = True
+                else:
+                    key = self.idle.popleft()
+                    is_visible = False
+
+                self._check_generation()
+                generation = self._generation
+
+            try:
+                self.code_array[key]
+
+            except Exception:
+                # Keys may have become invalid, e.g. by a shape change
+                pass
+
+            with self.condition:
+                self.queued.discard(key)
+
+                # Results of former generations may be outdated
+                if generation == self._generation:
+                    self.evaluated.add(key)
+
+                refresh = is_visible and not self._refresh_pending
+                if refresh:
+                    self._refresh_pending = True
+
+            if refresh:
+                wx.CallAfter(self._refresh)
+
+    def _refresh(self):
+        """Refreshes the grid after visible cells have been evaluated"""
+
+        self._refresh_pending = False
+        self.grid.ForceRefresh()
+
+# end of class BackgroundEvaluator
@@ -44,6 +44,7 @@ from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 
 import src.lib.i18n as i18n
 
+from src.gui._grid_evaluator import PENDING
 from src.lib import xrect
 from src.lib.parsers import get_pen_from_data, get_font_from_data
 from src.config import config
@@ -69,9 +70,47 @@ class GridRenderer(wx.grid.PyGridCellRenderer):
         # Zoom of grid
         self.zoom = 1.0
 
+        # Tint cells by evaluation cost if the code array is profiled
+        self.profile_overlay = False
+
         # Old curso position
         self.old_cursor_row_col = 0, 0
 
+    def get_result(self, grid, key, printing=False):
+        """Returns cell result or a placeholder if the result is pending
+
+        If the grid has a background evaluator then results that are not
+        available are requested from it. Printing always evaluates.
+
+        Parameters
+        ----------
+        grid: Grid
+        \tThe grid that is drawn
+        key: 3-tuple of Integer
+        \tKey of the cell
+        printing: Bool, defaults to False
+        \tTrue if the cell is drawn for printing
+
+        """
+
+        evaluator = grid.evaluator
+
+        if evaluator is None or printing:
+            return self.data_array[key]
+
+        result = self.data_array.get_cached_result(key, PENDING)
+
+        if result is PENDING:
+            if evaluator.is_evaluated(key):
+                # The result has been removed by later evaluations, e.g. of
+                # global assignments. Queueing it again would not converge.
+                return self.data_array[key]
+
+            evaluator.request(key)
+            return config["evaluation_placeholder"]
+
+        return result
+
     def get_zoomed_size(self, size):
         """Returns zoomed size as Integer
 
@@ -166,7 +205,7 @@ class GridRenderer(wx.grid.PyGridCellRenderer):
 
             if not(
                (blocking_distance is None or distance == blocking_distance)
-               and not self.data_array[__row, __col, tab]):
+               and not self.get_result(grid, (__row, __col, tab))):
 
                 yield __row, __col, tab
 
@@ -191,8 +230,8 @@ class GridRenderer(wx.grid.PyGridCellRenderer):
         for distance, __row, __col in grid.colliding_cells(row, col, textbox):
 
             if blocking_distance is None or distance == blocking_distance:
-                if self.data_array[__row, __col, tab] is not None and \
-                   self.data_array[__row, __col, tab] != "":
+                result = self.get_result(grid, (__row, __col, tab))
+                if result is not None and result != "":
                     blocking_distance = distance
                 else:
                     yield __row, __col, tab
@@ -575,11 +614,54 @@ class GridRenderer(wx.grid.PyGridCellRenderer):
 
         self.draw_bitmap(dc, bmp, crop_rect, grid, key, scale=False)
 
+    def draw_cost_overlay(self, dc, rect, key):
+        """Tints cell from white to red by its evaluation cost"""
+
+        profiler = self.data_array.profiler
+
+        if profiler is None:
+            return
+
+        cost = profiler.get_cost(key)
+
+        if cost <= 0:
+            return
+
+        green_blue = int(round(255 * (1.0 - cost)))
+        color = wx.Colour(255, green_blue, green_blue)
+
+        dc.SetBrush(wx.Brush(color, wx.SOLID))
+        dc.SetPen(wx.TRANSPARENT_PEN)
+        dc.DrawRectangle(rect.x, rect.y, rect.width, rect.height)
+
+    def prefetch_attributes(self, grid, key):
+        """Caches cell attributes of the visible area if key is not cached
+
+        The attributes of all visible cells are retrieved in one block
+        query instead of one lookup per cell.
+
+        """
+
+        cell_attributes = self.data_array.cell_attributes
+
+        if cell_attributes.is_cached(key):
+            return
+
+        (top, left), (bottom, right) = grid.actions.get_visible_area()
+
+        # Border lines require the cells above and left of the area.
+        # Blocks that are larger than the cache start at the row of key.
+        cell_attributes.prefetch(top - 1, left - 1, bottom, right, key[2],
+                                 row=key[0] - 1)
+
     def Draw(self, grid, attr, dc, rect, row, col, isSelected, printing=False):
         """Draws the cell border and content"""
 
         key = (row, col, grid.current_table)
 
+        if not printing:
+            self.prefetch_attributes(grid, key)
+
         rect = self._get_merged_rect(grid, key, rect)
         if rect is None:
             # Merged cell --> Draw nothing
@@ -621,8 +703,11 @@ class GridRenderer(wx.grid.PyGridCellRenderer):
         dc.Blit(rect.x, rect.y, rect.width, rect.height,
                 bg.dc, 0, 0, mask_type)
 
+        if self.profile_overlay and not printing:
+            self.draw_cost_overlay(dc, rect, key)
+
         # Check if the dc is drawn manually be a return func
-        res = self.data_array[row, col, grid.current_table]
+        res = self.get_result(grid, key, printing)
 
         if isinstance(res, types.FunctionType):
             # Add func_dict attribute
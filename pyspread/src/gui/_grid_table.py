@@ -83,16 +83,16 @@ class GridTable(wx.grid.PyGridTableBase):
             return value
 
     def GetValue(self, row, col, table=None):
-        """Return the result value of a cell"""
+        """Return the code of a cell
+
+        Results are drawn by the renderer, which evaluates in the background.
+
+        """
 
         if table is None:
             table = self.grid.current_table
 
-        wx.BeginBusyCursor()
-        result = self.data_array((row, col, table))
-        wx.EndBusyCursor()
-
-        return result
+        return self.data_array((row, col, table))
 
     def SetValue(self, row, col, value, refresh=True):
         """Set the value of a cell"""
@@ -283,6 +283,13 @@ class MainWindow(wx.Frame, EventMixin):
         self.Bind(self.EVT_CMD_APPROVE, handlers.OnApprove)
         self.Bind(self.EVT_CMD_CLEAR_GLOBALS, handlers.OnClearGlobals)
 
+        # Autosave timer, saves changed files in the background
+        self.autosave_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, handlers.OnAutosave, self.autosave_timer)
+
+        if config["autosave_interval"]:
+            self.autosave_timer.Start(config["autosave_interval"] * 1000)
+
         # Find events
         self.Bind(self.EVT_CMD_FOCUSFIND, handlers.OnFocusFind)
 
@@ -422,8 +429,15 @@ class MainWindowEventHandlers(object):
                 return
 
             elif save_choice:
-                # User wants to save content
-                post_command_event(self.main_window, self.main_window.SaveMsg)
+                # User wants to save content, in the foreground because the
+                # application exits
+                post_command_event(self.main_window, self.main_window.SaveMsg,
+                                   background=False)
+
+        # Stop autosaving and complete a running background save
+
+        self.main_window.autosave_timer.Stop()
+        self.main_window.grid.actions.finish_background_save()
 
         # Save the AUI state
 
@@ -611,7 +625,9 @@ class MainWindowEventHandlers(object):
 
         # Get filepath from user
 
-        wildcard = _("Pyspread file (*.pys)|*.pys|All files (*.*)|*.*")
+        wildcard = _("Pyspread file (*.pys)|*.pys|"
+                     "Pyspread binary file (*.pysb)|*.pysb|"
+                     "All files (*.*)|*.*")
         message = _("Choose pyspread file to open.")
         style = wx.OPEN | wx.CHANGE_DIR
         filepath, filterindex = self.interfaces.get_filepath_findex_from_user(
@@ -649,23 +665,45 @@ class MainWindowEventHandlers(object):
 
         # Save the grid
 
+        # SaveMsg events may request a foreground save, e.g. on exit
+        background = getattr(event, "background", config["background_save"])
+
         post_command_event(self.main_window,
                            self.main_window.GridActionSaveMsg,
-                           attr={"filepath": self.main_window.filepath})
+                           attr={"filepath": self.main_window.filepath,
+                                 "background": background})
 
-        # Display file save in status bar
+        # Display file save in status bar, background saves report this
+        # on completion
 
-        statustext = self.main_window.filepath.split("/")[-1] + " saved."
-        post_command_event(self.main_window,
-                           self.main_window.StatusBarMsg,
-                           text=statustext)
+        if not background:
+            statustext = self.main_window.filepath.split("/")[-1] + " saved."
+            post_command_event(self.main_window,
+                               self.main_window.StatusBarMsg,
+                               text=statustext)
+
+    def OnAutosave(self, event):
+        """Autosave timer event handler, saves changes in the background"""
+
+        main_window = self.main_window
+
+        if main_window.filepath is None or \
+           not main_window.changed_since_save or \
+           main_window.grid.actions.background_save is not None:
+            return
+
+        post_command_event(main_window, main_window.GridActionSaveMsg,
+                           attr={"filepath": main_window.filepath,
+                                 "background": True})
 
     def OnSaveAs(self, event):
         """File save as event handler"""
 
         # Get filepath from user
 
-        wildcard = _("Pyspread file (*.pys)|*.pys|All files (*.*)|*.*")
+        wildcard = _("Pyspread file (*.pys)|*.pys|"
+                     "Pyspread binary file (*.pysb)|*.pysb|"
+                     "All files (*.*)|*.*")
         message = _("Choose filename for saving.")
         style = wx.SAVE | wx.CHANGE_DIR
         filepath, filterindex = self.interfaces.get_filepath_findex_from_user(
@@ -697,10 +735,13 @@ class MainWindowEventHandlers(object):
                                    text=statustext)
                 return 0
 
-        # Put pys suffix if wildcard choice is 0
+        # Put pys suffix if wildcard choice is 0 and pysb suffix if it is 1
         if filterindex == 0 and filepath[-4:] != ".pys":
             filepath += ".pys"
 
+        elif filterindex == 1 and filepath[-5:] != ".pysb":
+            filepath += ".pysb"
+
         # Set the filepath state
         self.main_window.filepath = filepath
 
@@ -759,7 +800,9 @@ class MainWindowEventHandlers(object):
 
             selection_bbox = self.main_window.grid.actions.get_visible_area()
 
-        (top, left), (bottom, right) = selection_bbox
+        # Whole rows and cols are exported up to the last cell with content
+        (top, left), (bottom, right) = \
+            self.main_window.grid.actions.get_used_bbox(selection_bbox)
 
         # Generator of row and column keys in correct order
 
@@ -847,7 +890,8 @@ class MainWindowEventHandlers(object):
         if print_area is None:
             print_area = self.main_window.grid.actions.get_visible_area()
 
-        return print_area
+        # Whole rows and cols are printed up to the last cell with content
+        return self.main_window.grid.actions.get_used_bbox(print_area)
 
     def OnPrintPreview(self, event):
         """Print preview handler"""
@@ -290,6 +290,15 @@ class MainMenu(_filledMenu, EventMixin):
                         _("Refresh selected cells\tF5"),
                         _("Refresh selected cells even when frozen"),
                         wx.ID_REFRESH]],
+                [item, [self.RecalculateMsg,
+                        _("Recalculate all cells\tCtrl+F5"),
+                        _("Recalculate all cells")]],
+                ["Separator"],
+                [item, [self.ProfileToggleMsg, _("Profile cells"),
+                        _("Records evaluation costs of cells and tints "
+                          "cells by cost.")], wx.ITEM_CHECK],
+                [item, [self.ExportProfileMsg, _("Export profile..."),
+                        _("Exports evaluation costs of cells as CSV.")]],
                 ],
             ],
             [wx.Menu, _("F&ormat"), [
@@ -305,6 +314,9 @@ class MainMenu(_filledMenu, EventMixin):
                       _("Frozen cells are updated only when F5 is pressed.")]],
                 [item, [self.MergeMsg, _("Merge cells"),
                       _("Merges / unmerges selected cells. ")]],
+                [item, [self.CompactAttributesMsg, _("Compact attributes"),
+                      _("Removes cell formats that are overridden by later "
+                        "ones.")]],
 
                 ["Separator"],
                 [wx.Menu, _("Justification"), [
@@ -102,9 +102,20 @@ class PrintCanvas(wx.ScrolledWindow):
 
         (top, left), (bottom, right) = self.print_area
 
+        cell_attributes = self.grid.code_array.cell_attributes
+        tab = self.grid.current_table
+
+        # Cell attributes are fetched in blocks of about 5000 cells
+        block_rows = max(1, 5000 // (right - left + 2))
+
         dc.BeginDrawing()
 
         for row in xrange(bottom, top - 1, -1):
+            if (bottom - row) % block_rows == 0:
+                # Border lines require the cells above and left of the block
+                block_top = max(top, row - block_rows + 1) - 1
+                cell_attributes.prefetch(block_top, left - 1, row, right, tab)
+
             for col in xrange(right, left - 1, -1):
 
                 #Draw cell content
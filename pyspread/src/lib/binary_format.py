@@ -0,0 +1,372 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+Binary format
+=============
+
+Binary columnar pys files
+
+Binary pys files hold the content of a DictGrid in arrays that are read
+via mmap without parsing each line. The text format 0.1 remains the
+format for interchange.
+
+Layout (little endian)
+----------------------
+
+Header: magic, format version, flags, shape, number of cells and
+(offset, length) of each section in SECTIONS
+
+* keys: int64 (row, col, tab) of each cell, sorted by tab, row and col
+* offsets: uint64 start of the code of each cell in the heap and the end
+  of the heap
+* heap: UTF-8 code of all cells
+* attributes: UTF-8 lines of the [attributes] section of format 0.1
+* row_heights: (int64 row, int64 tab, float64 height) records
+* col_widths: (int64 col, int64 tab, float64 width) records
+* macros: UTF-8 macro code
+
+Sections start at multiples of 8 bytes.
+
+Provides
+--------
+
+* BinaryPysFile: Reader of binary pys files
+* write_binary_pys_file: Writes DictGrid content to a binary pys file
+* is_binary_pys_file: Returns True if a file is a binary pys file
+* is_binary_pys_filepath: Returns True if a file path has the binary suffix
+
+"""
+
+from itertools import izip
+import mmap
+import struct
+
+import numpy
+
+# Start of binary pys files
+MAGIC = "PYSB\r\n\x1a\n"
+
+# Current binary format version
+VERSION = 1
+
+# Suffix of binary pys files, files are detected by MAGIC on opening
+SUFFIX = ".pysb"
+
+# Sections in the order of the header entries
+SECTIONS = ["keys", "offsets", "heap", "attributes", "row_heights",
+            "col_widths", "macros"]
+
+# magic, version, flags, shape, number of cells, (offset, length) per section
+HEADER_STRUCT = struct.Struct("<8sII3qQ" + "QQ" * len(SECTIONS))
+
+KEY_DTYPE = numpy.dtype("<i8")
+OFFSET_DTYPE = numpy.dtype("<u8")
+SIZE_DTYPE = numpy.dtype([("pos", "<i8"), ("tab", "<i8"), ("size", "<f8")])
+
+# Section alignment in bytes
+ALIGNMENT = 8
+
+
+def is_binary_pys_file(filepath):
+    """Returns True if the file at filepath starts with MAGIC"""
+
+    with open(filepath, "rb") as infile:
+        return infile.read(len(MAGIC)) == MAGIC
+
+
+def is_binary_pys_filepath(filepath):
+    """Returns True if filepath ends with SUFFIX"""
+
+    return filepath is not None and filepath.endswith(SUFFIX)
+
+
+def _get_size_array(sizes):
+    """Returns SIZE_DTYPE array of row_heights or col_widths dict
+
+    Sizes of None, which are left by row and column insertion, are omitted.
+
+    """
+
+    return numpy.array([(pos, tab, size)
+                        for (pos, tab), size in sorted(sizes.iteritems())
+                        if size is not None],
+                       dtype=SIZE_DTYPE)
+
+
+def write_binary_pys_file(filepath, dict_grid):
+    """Writes cells, attributes, sizes and macros of dict_grid to filepath
+
+    Parameters
+    ----------
+    filepath: String
+    \tPath of the file
+    dict_grid: DictGrid
+    \tGrid that is saved
+
+    """
+
+    # Sorted keys are appended to the key index on loading
+    keys = sorted(dict_grid, key=lambda key: (key[2], key[0], key[1]))
+
+    codes = [unicode(dict_grid.get(key)).encode("utf-8") for key in keys]
+
+    offsets = numpy.zeros(len(codes) + 1, dtype=OFFSET_DTYPE)
+    offsets[1:] = numpy.cumsum([len(code) for code in codes])
+
+    # Attribute lines without the section header line
+    attribute_lines = list(dict_grid.attributes_to_strings())[1:]
+
+    sections = [
+        numpy.array(keys, dtype=KEY_DTYPE).tostring(),
+        offsets.tostring(),
+        "".join(codes),
+        u"".join(attribute_lines).encode("utf-8"),
+        _get_size_array(dict_grid.row_heights).tostring(),
+        _get_size_array(dict_grid.col_widths).tostring(),
+        unicode(dict_grid.macros).encode("utf-8"),
+    ]
+
+    with open(filepath, "wb") as outfile:
+        position = HEADER_STRUCT.size
+        outfile.write("\0" * position)
+
+        section_table = []
+
+        for data in sections:
+            padding = -position % ALIGNMENT
+            outfile.write("\0" * padding)
+            position += padding
+
+            outfile.write(data)
+            section_table += [position, len(data)]
+            position += len(data)
+
+        outfile.seek(0)
+        outfile.write(HEADER_STRUCT.pack(MAGIC, VERSION, 0,
+                                         *(list(dict_grid.shape) +
+                                           [len(keys)] + section_table)))
+
+
+class BinaryPysFile(object):
+    """Reader of binary pys files
+
+    The file is memory mapped. Key, offset and size arrays are numpy views
+    of the mapped file.
+
+    Parameters
+    ----------
+    filepath: String
+    \tPath of the file
+
+    """
+
+    def __init__(self, filepath):
+        self._file = open(filepath, "rb")
+
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+
+        except (mmap.error, ValueError):
+            # Empty files cannot be mapped
+            self._file.close()
+            raise ValueError("File format unsupported.")
+
+        try:
+            self._read_header()
+
+        except:
+            self.close()
+            raise
+
+    def _read_header(self):
+        """Reads shape, number of cells and section table"""
+
+        if len(self._map) < HEADER_STRUCT.size:
+            raise ValueError("File format unsupported.")
+
+        header = HEADER_STRUCT.unpack_from(self._map)
+
+        magic, self.version, _ = header[:3]
+
+        if magic != MAGIC:
+            raise ValueError("File format unsupported.")
+
+        if self.version > VERSION:
+            raise ValueError("Binary file version {} unsupported (not {})."
+                             .format(self.version, VERSION))
+
+        self.shape = tuple(header[3:6])
+        self.cell_count = header[6]
+
+        section_table = header[7:]
+
+        self._sections = {}
+
+        for i, name in enumerate(SECTIONS):
+            offset, length = section_table[2 * i:2 * i + 2]
+
+            if offset + length > len(self._map):
+                raise ValueError("Binary file truncated.")
+
+            self._sections[name] = offset, length
+
+    def _get_array(self, name, dtype):
+        """Returns numpy view of section name"""
+
+        offset, length = self._sections[name]
+
+        if not length:
+            return numpy.zeros(0, dtype=dtype)
+
+        return numpy.frombuffer(self._map, dtype=dtype,
+                                count=length // dtype.itemsize, offset=offset)
+
+    def _get_bytes(self, name):
+        """Returns string of section name"""
+
+        offset, length = self._sections[name]
+
+        return self._map[offset:offset + length]
+
+    def get_keys(self):
+        """Returns (cell_count, 3) array of cell keys
+
+        The array is a view of the mapped file that is valid until close.
+
+        """
+
+        return self._get_array("keys", KEY_DTYPE).reshape(-1, 3)
+
+    def get_key_list(self):
+        """Returns list of the keys of all cells sorted by tab, row and col"""
+
+        # Zipping the columns avoids one intermediate list per key
+        return zip(*self.get_keys().T.tolist())
+
+    def iter_codes(self, chunk_size=100000):
+        """Yields code of all cells in the order of get_key_list
+
+        The heap is decoded in chunks of chunk_size cells. Byte offsets
+        are character offsets in ASCII chunks, so that their code is sliced
+        from the decoded chunk. Other chunks are decoded per cell.
+
+        """
+
+        heap_offset = self._sections["heap"][0]
+        heap_map = self._map
+
+        offsets = self._get_array("offsets", OFFSET_DTYPE).tolist()
+
+        for chunk_start in xrange(0, len(offsets) - 1, chunk_size):
+            chunk_offsets = offsets[chunk_start:chunk_start + chunk_size + 1]
+            first, last = chunk_offsets[0], chunk_offsets[-1]
+
+            chunk = heap_map[heap_offset + first:heap_offset + last]
+            decoded_chunk = chunk.decode("utf-8")
+
+            if len(decoded_chunk) == len(chunk):
+                for start, end in izip(chunk_offsets, chunk_offsets[1:]):
+                    yield decoded_chunk[start - first:end - first]
+
+            else:
+                for start, end in izip(chunk_offsets, chunk_offsets[1:]):
+                    yield chunk[start - first:end - first].decode("utf-8")
+
+    def iter_cells(self):
+        """Yields (key, code) of all cells sorted by tab, row and col"""
+
+        return izip(self.get_key_list(), self.iter_codes())
+
+    def iter_attribute_lines(self):
+        """Yields UTF-8 lines of the [attributes] section of format 0.1"""
+
+        for line in self._get_bytes("attributes").splitlines(True):
+            yield line
+
+    def _iter_sizes(self, name):
+        """Yields ((pos, tab), size) of row_heights or col_widths"""
+
+        for pos, tab, size in self._get_array(name, SIZE_DTYPE).tolist():
+            yield (pos, tab), size
+
+    def iter_row_heights(self):
+        """Yields ((row, tab), height) of all rows with height"""
+
+        return self._iter_sizes("row_heights")
+
+    def iter_col_widths(self):
+        """Yields ((col, tab), width) of all columns with width"""
+
+        return self._iter_sizes("col_widths")
+
+    def get_macros(self):
+        """Returns macro code as unicode"""
+
+        return self._get_bytes("macros").decode("utf-8")
+
+    def load(self, dict_grid, abort=None):
+        """Sets shape and content of the empty dict_grid from the file
+
+        Cells are set in bulk from the key array, see DictGrid.set_cells.
+
+        Parameters
+        ----------
+        dict_grid: DictGrid
+        \tEmpty grid that is loaded
+        abort: Function, defaults to None
+        \tCalled with the number of loaded cells during loading. If it
+        \treturns True then loading stops.
+
+        Returns False if loading has been aborted and True otherwise.
+
+        """
+
+        dict_grid.shape = self.shape
+
+        if not dict_grid.set_cells(self.get_key_list(), self.iter_codes(),
+                                   abort):
+            return False
+
+        for line in self.iter_attribute_lines():
+            dict_grid.parse_to_attribute(line)
+
+        dict_grid.row_heights.update(self.iter_row_heights())
+        dict_grid.col_widths.update(self.iter_col_widths())
+
+        dict_grid.macros = self.get_macros()
+
+        return True
+
+    def close(self):
+        """Unmaps and closes the file"""
+
+        if self._file.closed:
+            return
+
+        try:
+            self._map.close()
+
+        finally:
+            self._file.close()
+
+# End of class BinaryPysFile
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+Cache
+=====
+
+Bounded caches
+
+"""
+
+from itertools import count, islice
+import sys
+import threading
+
+# Maximum number of container elements that are measured by get_size
+SAMPLE_SIZE = 10000
+
+
+def get_size(obj):
+    """Returns estimated memory consumption of obj in bytes
+
+    Arrays are estimated by their buffer size, bitmaps by their pixels.
+    Contents of lists, tuples and dicts are included one level deep. For
+    large containers, the content size is extrapolated from a sample.
+
+    """
+
+    try:
+        size = sys.getsizeof(obj)
+
+    except TypeError:
+        size = 64
+
+    if hasattr(obj, "nbytes"):
+        # numpy arrays
+        try:
+            size += int(obj.nbytes)
+        except TypeError:
+            pass
+
+    elif hasattr(obj, "GetWidth") and hasattr(obj, "GetHeight"):
+        # Bitmaps and images
+        try:
+            size += obj.GetWidth() * obj.GetHeight() * 4
+        except Exception:
+            pass
+
+    elif type(obj) in (list, tuple, set, frozenset):
+        size += _extrapolate(sum(sys.getsizeof(ele)
+                                 for ele in islice(obj, SAMPLE_SIZE)),
+                             len(obj))
+
+    elif type(obj) is dict:
+        size += _extrapolate(sum(sys.getsizeof(key) + sys.getsizeof(value)
+                                 for key, value in islice(obj.iteritems(),
+                                                          SAMPLE_SIZE)),
+                             len(obj))
+
+    return size
+
+
+def _extrapolate(sample_size, length):
+    """Returns size of length elements from size of the first sample"""
+
+    if length <= SAMPLE_SIZE:
+        return sample_size
+
+    return sample_size * length // SAMPLE_SIZE
+
+
+class LRUCache(dict):
+    """Dict that evicts least recently used entries when limits are exceeded
+
+    Lookups via __getitem__ count as hits or misses. Lookups via get only
+    mark the entry as recently used so that cache statistics reflect
+    evaluations. If an insertion exceeds a limit then the least recently
+    used entries are evicted until the cache is 10 % below its limits.
+
+    generation is incremented when entries are removed other than by
+    eviction, i.e. when cached values become invalid.
+
+    All dict methods keep sizes and use order up to date. They are guarded
+    by a lock because the evaluation thread and the GUI thread share caches.
+
+    Parameters
+    ----------
+    max_entries: Integer or None, defaults to None
+    \tMaximum number of entries, None means no limit
+    max_bytes: Integer or None, defaults to None
+    \tMaximum estimated size of all values in bytes, None means no limit
+    get_size: Function, defaults to get_size
+    \tReturns estimated size of a value in bytes
+
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, get_size=get_size):
+        dict.__init__(self)
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.get_size = get_size
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.bytes = 0
+
+        self.generation = 0
+
+        self._sizes = {}
+        self._ticks = {}
+        self._counter = count()
+
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        with self._lock:
+            try:
+                value = dict.__getitem__(self, key)
+
+            except KeyError:
+                self.misses += 1
+                raise
+
+            self.hits += 1
+            self._ticks[key] = next(self._counter)
+
+            return value
+
+    def __setitem__(self, key, value):
+        size = self.get_size(value)
+
+        with self._lock:
+            self._set(key, value, size)
+
+    def __delitem__(self, key):
+        with self._lock:
+            dict.__delitem__(self, key)
+            self._discard(key)
+            self.generation += 1
+
+    def get(self, key, default=None):
+        """Returns value of key or default without counting a hit or miss
+
+        The entry is marked as recently used.
+
+        """
+
+        with self._lock:
+            try:
+                value = dict.__getitem__(self, key)
+
+            except KeyError:
+                return default
+
+            self._ticks[key] = next(self._counter)
+
+            return value
+
+    def setdefault(self, key, default=None):
+        """Returns value of key, inserts default if key is missing"""
+
+        with self._lock:
+            try:
+                value = dict.__getitem__(self, key)
+
+            except KeyError:
+                self._set(key, default, self.get_size(default))
+                return default
+
+            self._ticks[key] = next(self._counter)
+
+            return value
+
+    def update(self, *args, **kwargs):
+        """Inserts all entries of a dict or iterable and of kwargs"""
+
+        items = [(key, value, self.get_size(value))
+                 for key, value in dict(*args, **kwargs).iteritems()]
+
+        with self._lock:
+            for key, value, size in items:
+                self._set(key, value, size)
+
+    def pop(self, key, *default):
+        """Removes key and returns its value"""
+
+        with self._lock:
+            if key in self:
+                self._discard(key)
+
+            self.generation += 1
+
+            return dict.pop(self, key, *default)
+
+    def popitem(self):
+        """Removes and returns an arbitrary (key, value) pair"""
+
+        with self._lock:
+            key, value = dict.popitem(self)
+            self._discard(key)
+            self.generation += 1
+
+            return key, value
+
+    def clear(self):
+        """Removes all entries"""
+
+        with self._lock:
+            dict.clear(self)
+
+            self.generation += 1
+
+            self._sizes.clear()
+            self._ticks.clear()
+            self.bytes = 0
+
+    def copy(self):
+        """Returns shallow copy with the same limits and use order"""
+
+        cache = LRUCache(self.max_entries, self.max_bytes, self.get_size)
+
+        with self._lock:
+            dict.update(cache, self)
+            cache.bytes = self.bytes
+            cache._sizes = self._sizes.copy()
+            cache._ticks = self._ticks.copy()
+            cache._counter = count(next(self._counter))
+
+        return cache
+
+    def _set(self, key, value, size):
+        """Inserts value of size and evicts entries if a limit is exceeded"""
+
+        if key in self:
+            self._discard(key)
+
+        dict.__setitem__(self, key, value)
+
+        self._sizes[key] = size
+        self.bytes += size
+        self._ticks[key] = next(self._counter)
+
+        if self.max_entries is not None and len(self) > self.max_entries or \
+           self.max_bytes is not None and self.bytes > self.max_bytes:
+            self._evict()
+
+    def _discard(self, key):
+        """Removes size and tick of key"""
+
+        self.bytes -= self._sizes.pop(key)
+        del self._ticks[key]
+
+    def _evict(self):
+        """Evicts least recently used entries until below 90 % of limits"""
+
+        max_entries = max_bytes = float("inf")
+
+        if self.max_entries is not None:
+            max_entries = self.max_entries - self.max_entries // 10
+
+        if self.max_bytes is not None:
+            max_bytes = self.max_bytes - self.max_bytes // 10
+
+        # The most recent entry is never evicted
+        keys = sorted(self._ticks, key=self._ticks.__getitem__)[:-1]
+
+        for key in keys:
+            if len(self) <= max_entries and self.bytes <= max_bytes:
+                break
+
+            dict.__delitem__(self, key)
+            self._discard(key)
+            self.evictions += 1
+
+    def get_stats(self):
+        """Returns dict with cache statistics"""
+
+        return {
+            "entries": len(self),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def reset_stats(self):
+        """Sets hit, miss and eviction counters to zero"""
+
+        self.hits = self.misses = self.evictions = 0
+
+# End of class LRUCache
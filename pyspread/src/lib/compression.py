@@ -0,0 +1,537 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+Compression
+===========
+
+Compression of pys files
+
+Saved files either are bz2 files as a whole, which older pyspread
+versions can read, or they start with an uncompressed header in which
+the version line is followed by a codec tag, e.g.
+
+[Pyspread save file version]
+0.1 zlib
+
+The content after the header is compressed with the codec.
+
+Provides
+--------
+
+* ParallelBZ2File: bz2 file that is compressed in parallel streams
+* CodecFile: pys file with codec tag in its header
+* get_codecs: Returns the names of the available codecs
+* open_pys_file: Opens a pys file with any codec
+
+"""
+
+import bz2
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+import re
+import zlib
+
+try:
+    import lzma
+
+except ImportError:
+    try:
+        from backports import lzma
+
+    except ImportError:
+        # lzma is optional in Python 2
+        lzma = None
+
+# First line of pys files
+HEADER = "[Pyspread save file version]\n"
+
+# Compressed bytes that are read at once
+READ_SIZE = 1048576
+
+# Uncompressed bytes per bz2 stream, i.e. one block at compression level 9
+STREAM_SIZE = 900000
+
+# Possible start of a bz2 stream, i.e. stream magic and block size followed
+# by the magic of the first block or the end of stream magic
+STREAM_START = re.compile("BZh[1-9](?:1AY&SY|\x17rE8P\x90)")
+
+
+def decompress_streams(data):
+    """Returns decompressed data of consecutive complete bz2 streams
+
+    Raises EOFError if data ends before the end of a stream and IOError
+    for invalid data like bz2.BZ2File.
+
+    """
+
+    chunks = []
+
+    while data:
+        decompressor = bz2.BZ2Decompressor()
+        chunks.append(decompressor.decompress(data))
+
+        try:
+            # Raises EOFError only if the end of stream has been found
+            decompressor.decompress("")
+
+        except EOFError:
+            data = decompressor.unused_data
+
+        else:
+            raise EOFError("Compressed data ended before the end of stream")
+
+    return "".join(chunks)
+
+
+class ParallelBZ2File(object):
+    """bz2 file that is compressed and decompressed in parallel streams
+
+    In write mode, the data is split into independent bz2 streams that
+    are compressed in worker threads and written one after the other.
+    Such multi-stream files can be read by bzip2 and by this class but
+    bz2.BZ2File in Python 2 reads only the first stream. Therefore, one
+    worker writes a single stream file.
+
+    In read mode, the positions of the streams are detected and the
+    streams are decompressed in worker threads. Files with one stream are
+    decompressed sequentially.
+
+    The file is iterated line by line like bz2.BZ2File.
+
+    Parameters
+    ----------
+    filepath: String
+    \tPath of the file
+    mode: String in ["r", "rb", "w", "wb"], defaults to "r"
+    \tRead or write mode
+    workers: Integer, defaults to None
+    \tNumber of worker threads, None means number of CPUs
+    compresslevel: Integer in [1, 9], defaults to 9
+    \tbz2 compression level for writing
+    stream_size: Integer, defaults to STREAM_SIZE
+    \tUncompressed bytes per stream for writing
+
+    """
+
+    def __init__(self, filepath, mode="r", workers=None, compresslevel=9,
+                 stream_size=STREAM_SIZE):
+        if mode not in ["r", "rb", "w", "wb"]:
+            raise ValueError("Invalid mode {}".format(mode))
+
+        self.mode = mode[0]
+        self.workers = cpu_count() if workers is None else max(1, workers)
+        self.compresslevel = compresslevel
+        self.stream_size = stream_size
+
+        self._file = open(filepath, self.mode + "b")
+
+        self._pool = None if self.workers == 1 else ThreadPool(self.workers)
+
+        if self.mode == "w":
+            # Data that is not yet compressed
+            self._buffer = []
+            self._buffer_size = 0
+
+            # Compressed streams that are not yet written
+            self._pending = []
+
+            if self._pool is None:
+                self._compressor = bz2.BZ2Compressor(compresslevel)
+
+        else:
+            self._lines = self._iter_lines()
+
+    # Writing
+
+    def write(self, data):
+        """Writes data string to the file"""
+
+        if self._pool is None:
+            self._file.write(self._compressor.compress(data))
+            return
+
+        self._buffer.append(data)
+        self._buffer_size += len(data)
+
+        if self._buffer_size >= self.stream_size:
+            self._submit()
+
+    def _submit(self):
+        """Compresses buffered data as one stream in a worker thread"""
+
+        data = "".join(self._buffer)
+        self._buffer = []
+        self._buffer_size = 0
+
+        self._pending.append(self._pool.apply_async(bz2.compress,
+                                                    (data,
+                                                     self.compresslevel)))
+
+        # Limit the memory of streams that are compressed ahead
+        while len(self._pending) > 2 * self.workers:
+            self._file.write(self._pending.pop(0).get())
+
+    def _flush_streams(self):
+        """Compresses remaining data and writes all pending streams"""
+
+        if self._pool is None:
+            self._file.write(self._compressor.flush())
+            return
+
+        if self._buffer or not self._pending:
+            # Empty files contain one empty stream
+            self._submit()
+
+        while self._pending:
+            self._file.write(self._pending.pop(0).get())
+
+    # Reading
+
+    def _get_chunks(self, data):
+        """Returns list of (start, end) of possible streams in data"""
+
+        starts = [match.start() for match in STREAM_START.finditer(data)]
+
+        if not starts or starts[0] != 0:
+            # Invalid data is reported by the decompressor
+            return [(0, len(data))]
+
+        return zip(starts, starts[1:] + [len(data)])
+
+    def _iter_decompressed(self):
+        """Yields decompressed data of the file in stream sized pieces"""
+
+        data = self._file.read()
+
+        if self._pool is None:
+            yield decompress_streams(data)
+            return
+
+        chunks = self._get_chunks(data)
+
+        window_size = 2 * self.workers
+
+        for i in xrange(0, len(chunks), window_size):
+            window = chunks[i:i + window_size]
+
+            try:
+                results = self._pool.map(decompress_streams,
+                                         [data[start:end]
+                                          for start, end in window])
+
+            except (EOFError, IOError):
+                # A stream start has been detected inside a stream
+                yield decompress_streams(data[window[0][0]:])
+                return
+
+            for result in results:
+                yield result
+
+    def _iter_lines(self):
+        """Yields lines of the decompressed file"""
+
+        rest = ""
+
+        for decompressed in self._iter_decompressed():
+            lines = (rest + decompressed).split("\n")
+            rest = lines.pop()
+
+            for line in lines:
+                yield line + "\n"
+
+        if rest:
+            yield rest
+
+    def __iter__(self):
+        return self._lines
+
+    def next(self):
+        """Returns next line"""
+
+        return next(self._lines)
+
+    def readline(self):
+        """Returns next line or an empty string at the end of the file"""
+
+        return next(self._lines, "")
+
+    def close(self):
+        """Writes remaining data in write mode and closes the file"""
+
+        if self._file.closed:
+            return
+
+        try:
+            if self.mode == "w":
+                self._flush_streams()
+
+        finally:
+            if self._pool is not None:
+                self._pool.terminate()
+
+            self._file.close()
+
+# End of class ParallelBZ2File
+
+
+class BZ2StreamsDecompressor(object):
+    """Incremental decompressor for consecutive bz2 streams"""
+
+    def __init__(self):
+        self._decompressor = bz2.BZ2Decompressor()
+
+    def decompress(self, data):
+        """Returns decompressed data, data may span several streams"""
+
+        chunks = []
+
+        while data:
+            try:
+                chunks.append(self._decompressor.decompress(data))
+
+            except EOFError:
+                # The previous stream has ended, data starts a new one
+                self._decompressor = bz2.BZ2Decompressor()
+                continue
+
+            data = self._decompressor.unused_data
+
+            if data:
+                self._decompressor = bz2.BZ2Decompressor()
+
+        return "".join(chunks)
+
+# End of class BZ2StreamsDecompressor
+
+
+class _NoneCompressor(object):
+    """Compressor and decompressor of the codec none"""
+
+    def compress(self, data):
+        """Returns data"""
+
+        return data
+
+    decompress = compress
+
+    def flush(self):
+        """Returns an empty string"""
+
+        return ""
+
+# End of class _NoneCompressor
+
+
+# Maps codec tag to (compressor factory, decompressor factory)
+CODECS = {
+    "none": (_NoneCompressor, _NoneCompressor),
+    "zlib": (lambda: zlib.compressobj(6), zlib.decompressobj),
+    "bz2": (lambda: bz2.BZ2Compressor(9), BZ2StreamsDecompressor),
+}
+
+if lzma is not None:
+    CODECS["lzma"] = lzma.LZMACompressor, lzma.LZMADecompressor
+
+
+def get_codecs():
+    """Returns sorted list of the names of the available codecs"""
+
+    return sorted(CODECS)
+
+
+class CodecFile(object):
+    """pys file with a codec tag in its uncompressed header
+
+    In read mode, the file is iterated line by line. The header lines are
+    yielded without the codec tag, so that the content is the same as for
+    bz2 pys files.
+
+    Parameters
+    ----------
+    filepath: String
+    \tPath of the file
+    mode: String in ["r", "rb", "w", "wb"], defaults to "r"
+    \tRead or write mode
+    codec: String, defaults to "none"
+    \tCodec for writing, the codec is read from the header in read mode
+    version: String, defaults to "0.1"
+    \tFile version for writing
+
+    """
+
+    def __init__(self, filepath, mode="r", codec="none", version="0.1"):
+        if mode not in ["r", "rb", "w", "wb"]:
+            raise ValueError("Invalid mode {}".format(mode))
+
+        self.mode = mode[0]
+
+        self._file = open(filepath, self.mode + "b")
+
+        try:
+            if self.mode == "w":
+                self.codec = codec
+                self.version = version
+
+                self._compressor = self._get_codec(codec)[0]()
+
+                self._file.write(HEADER)
+                self._file.write("{} {}\n".format(version, codec))
+
+            else:
+                self._read_header()
+                self._lines = self._iter_lines()
+
+        except:
+            self._file.close()
+            raise
+
+    def _get_codec(self, codec):
+        """Returns (compressor factory, decompressor factory) of codec"""
+
+        try:
+            return CODECS[codec]
+
+        except KeyError:
+            raise ValueError("Codec {} unavailable".format(codec))
+
+    def _read_header(self):
+        """Reads version and codec from the file header"""
+
+        if self._file.readline() != HEADER:
+            raise ValueError("File format unsupported.")
+
+        version_line = self._file.readline().split()
+
+        if not version_line:
+            raise ValueError("File version missing.")
+
+        self.version = version_line[0]
+
+        # Files without tag are uncompressed
+        self.codec = version_line[1] if len(version_line) > 1 else "none"
+
+        self._decompressor = self._get_codec(self.codec)[1]()
+
+    def write(self, data):
+        """Writes data string to the file"""
+
+        self._file.write(self._compressor.compress(data))
+
+    def _iter_lines(self):
+        """Yields header lines without codec tag and decompressed lines"""
+
+        yield HEADER
+        yield self.version + "\n"
+
+        rest = ""
+
+        while True:
+            data = self._file.read(READ_SIZE)
+
+            if data:
+                decompressed = self._decompressor.decompress(data)
+            elif hasattr(self._decompressor, "flush"):
+                decompressed = self._decompressor.flush()
+            else:
+                # lzma decompressors have no flush method
+                decompressed = ""
+
+            lines = (rest + decompressed).split("\n")
+            rest = lines.pop()
+
+            for line in lines:
+                yield line + "\n"
+
+            if not data:
+                break
+
+        if rest:
+            yield rest
+
+    def __iter__(self):
+        return self._lines
+
+    def next(self):
+        """Returns next line"""
+
+        return next(self._lines)
+
+    def readline(self):
+        """Returns next line or an empty string at the end of the file"""
+
+        return next(self._lines, "")
+
+    def close(self):
+        """Writes remaining data in write mode and closes the file"""
+
+        if self._file.closed:
+            return
+
+        try:
+            if self.mode == "w":
+                self._file.write(self._compressor.flush())
+
+        finally:
+            self._file.close()
+
+# End of class CodecFile
+
+
+def open_pys_file(filepath, mode="r", codec="bz2", workers=None):
+    """Returns pys file object for reading or writing
+
+    In write mode, the header is written. bz2 files are written without
+    codec tag, so that older pyspread versions can read them.
+
+    In read mode, the codec is detected from the file. The returned file
+    yields all lines of the file including the header without codec tag.
+
+    Parameters
+    ----------
+    filepath: String
+    \tPath of the file
+    mode: String in ["r", "rb", "w", "wb"], defaults to "r"
+    \tRead or write mode
+    codec: String, defaults to "bz2"
+    \tCodec for writing, see get_codecs
+    workers: Integer, defaults to None
+    \tNumber of threads for bz2 files, None means number of CPUs
+
+    """
+
+    if mode.startswith("w"):
+        if codec != "bz2":
+            return CodecFile(filepath, mode, codec)
+
+        outfile = ParallelBZ2File(filepath, mode, workers=workers)
+        outfile.write(HEADER)
+        outfile.write("0.1\n")
+
+        return outfile
+
+    with open(filepath, "rb") as infile:
+        start = infile.read(len(HEADER))
+
+    if start == HEADER:
+        return CodecFile(filepath, mode)
+
+    return ParallelBZ2File(filepath, mode, workers=workers)
@@ -0,0 +1,466 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+Journal
+=======
+
+Append-only change journal of pys files
+
+A save appends the changes since the previous save to a journal file
+next to the pys file instead of rewriting the pys file. Opening replays
+the journal on top of the pys file. A full save removes the journal.
+
+The journal is an uncompressed UTF-8 text file. It starts with a header
+that identifies the pys file by its size and modification time, so that
+journals of replaced pys files are ignored:
+
+[Pyspread journal version]
+0.1
+size\tmtime
+
+Each save appends one record. Cells, attributes and sizes have the line
+formats of the pys file sections:
+
+[record]
+[shape]
+rows\tcols\ttabs
+[grid]
+row\tcol\ttab\tcode
+[deleted]
+row\tcol\ttab
+[attributes] or [attributes_append]
+...
+[row_heights]
+row\ttab\theight
+[col_widths]
+col\ttab\twidth
+[macros]
+repr(macros)
+[end]
+
+[attributes] replaces all cell attributes, [attributes_append] appends
+to them. Heights and widths of None remove the size. Records without
+[end], e.g. from an interrupted save, are ignored.
+
+Provides
+--------
+
+* Journal: Change journal of one pys file
+* get_journal_filepath: Returns the journal path of a pys file
+
+"""
+
+import ast
+import os
+
+# Suffix that is appended to the pys file path
+JOURNAL_SUFFIX = ".journal"
+
+HEADER = "[Pyspread journal version]\n"
+VERSION = "0.1"
+
+# Sections of a record that are replayed line by line
+SECTIONS = ["[shape]", "[grid]", "[deleted]", "[attributes]",
+            "[attributes_append]", "[row_heights]", "[col_widths]",
+            "[macros]"]
+
+
+def get_journal_filepath(filepath):
+    """Returns path of the journal of the pys file filepath"""
+
+    return filepath + JOURNAL_SUFFIX
+
+
+def _get_key_string(key):
+    """Returns tab separated key string"""
+
+    return u"\t".join(repr(ele) for ele in key)
+
+
+def _get_key(key_string):
+    """Returns int key tuple from tab separated key string"""
+
+    return tuple(int(ele) for ele in key_string.split(u"\t"))
+
+
+class Journal(object):
+    """Change journal of the pys file filepath
+
+    After a full save or after opening, start records the saved state of
+    a DictGrid and lets it track changed cells. append then writes the
+    differences to that state.
+
+    Parameters
+    ----------
+    filepath: String
+    \tPath of the pys file
+
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.journal_filepath = get_journal_filepath(filepath)
+
+        # Base identity, attribute lines, sizes and macros of the saved
+        # state, None if not started
+        self._base_id = None
+        self._attribute_lines = None
+        self._row_heights = None
+        self._col_widths = None
+        self._macros = None
+
+    def _get_base_id(self):
+        """Returns identity string of the pys file"""
+
+        stat = os.stat(self.filepath)
+
+        return u"{}\t{}\n".format(stat.st_size, repr(stat.st_mtime))
+
+    def get_size(self):
+        """Returns journal file size in bytes, 0 if there is no journal"""
+
+        try:
+            return os.path.getsize(self.journal_filepath)
+
+        except OSError:
+            return 0
+
+    def remove(self):
+        """Removes journal file and its signature if present"""
+
+        for filepath in [self.journal_filepath,
+                         self.journal_filepath + ".sig"]:
+            try:
+                os.remove(filepath)
+
+            except OSError:
+                pass
+
+    def start(self, dict_grid, snapshot=None):
+        """Records the saved state and starts tracking cells of dict_grid
+
+        Parameters
+        ----------
+        dict_grid: DictGrid
+        \tGrid that has been saved
+        snapshot: GridSnapshot, defaults to None
+        \tSnapshot that has been saved instead of the current content of
+        \tdict_grid, e.g. in a background save
+
+        """
+
+        saved = dict_grid if snapshot is None else snapshot
+
+        self._base_id = self._get_base_id()
+        self._attribute_lines = list(saved.attributes_to_strings())[1:]
+        self._row_heights = dict(saved.row_heights)
+        self._col_widths = dict(saved.col_widths)
+        self._macros = saved.macros
+
+        if snapshot is None:
+            dict_grid.changed_keys = set()
+        else:
+            dict_grid.changed_keys = snapshot.get_changed_keys()
+
+    def can_append(self, dict_grid, max_size=None):
+        """Returns True if changes of dict_grid can be appended
+
+        This requires that cells have been tracked since start and that
+        the pys file has not been replaced.
+
+        Parameters
+        ----------
+        dict_grid: DictGrid
+        \tGrid that is saved
+        max_size: Integer, defaults to None
+        \tMaximum journal size in bytes, None means no limit
+
+        """
+
+        if self._base_id is None or dict_grid.changed_keys is None:
+            return False
+
+        if max_size is not None and self.get_size() > max_size:
+            return False
+
+        try:
+            return self._get_base_id() == self._base_id
+
+        except OSError:
+            return False
+
+    def _get_size_lines(self, old_sizes, sizes):
+        """Returns lines of sizes that differ from old_sizes"""
+
+        lines = []
+
+        for pos, tab in set(old_sizes) | set(sizes):
+            size = sizes.get((pos, tab))
+
+            if size != old_sizes.get((pos, tab)):
+                lines.append(u"\t".join(map(repr, [pos, tab, size])) + u"\n")
+
+        return lines
+
+    def _get_record_lines(self, dict_grid, attribute_lines):
+        """Returns lines of the changes of dict_grid since the saved state"""
+
+        lines = [u"[record]\n", u"[shape]\n",
+                 u"\t".join(map(unicode, dict_grid.shape)) + u"\n"]
+
+        grid_lines = []
+        deleted_lines = []
+
+        for key in dict_grid.changed_keys:
+            code = dict_grid.get(key)
+
+            if code is None:
+                deleted_lines.append(_get_key_string(key) + u"\n")
+            else:
+                grid_lines.append(_get_key_string(key) + u"\t" +
+                                  unicode(code) + u"\n")
+
+        if grid_lines:
+            lines += [u"[grid]\n"] + grid_lines
+
+        if deleted_lines:
+            lines += [u"[deleted]\n"] + deleted_lines
+
+        old_attribute_lines = self._attribute_lines
+        no_old_lines = len(old_attribute_lines)
+
+        if attribute_lines[:no_old_lines] == old_attribute_lines:
+            if len(attribute_lines) > no_old_lines:
+                lines += [u"[attributes_append]\n"] + \
+                    attribute_lines[no_old_lines:]
+        else:
+            lines += [u"[attributes]\n"] + attribute_lines
+
+        for section, old_sizes, sizes in [
+                (u"[row_heights]\n", self._row_heights,
+                 dict_grid.row_heights),
+                (u"[col_widths]\n", self._col_widths, dict_grid.col_widths)]:
+            size_lines = self._get_size_lines(old_sizes, sizes)
+
+            if size_lines:
+                lines += [section] + size_lines
+
+        if dict_grid.macros != self._macros:
+            lines += [u"[macros]\n", repr(dict_grid.macros) + u"\n"]
+
+        lines.append(u"[end]\n")
+
+        return lines
+
+    def append(self, dict_grid):
+        """Appends the changes of dict_grid since the saved state
+
+        Raises IOError if the journal cannot be written. In this case, the
+        saved state is unchanged.
+
+        """
+
+        attribute_lines = list(dict_grid.attributes_to_strings())[1:]
+
+        lines = self._get_record_lines(dict_grid, attribute_lines)
+
+        if not self.get_size():
+            lines = [HEADER, VERSION + u"\n", self._base_id] + lines
+
+        data = u"".join(lines).encode("utf-8")
+
+        with open(self.journal_filepath, "ab") as journal_file:
+            journal_file.write(data)
+
+        self._attribute_lines = attribute_lines
+        self._row_heights = dict(dict_grid.row_heights)
+        self._col_widths = dict(dict_grid.col_widths)
+        self._macros = dict_grid.macros
+
+        dict_grid.changed_keys = set()
+
+    def _iter_records(self, journal_file):
+        """Yields lists of the lines of complete records"""
+
+        record = None
+
+        for line in journal_file:
+            stripped_line = line.strip()
+
+            if stripped_line == "[record]":
+                # Records without end are dropped
+                record = []
+
+            elif stripped_line == "[end]":
+                if record is not None:
+                    yield record
+                record = None
+
+            elif record is not None:
+                record.append(line)
+
+    def _parse_line(self, dict_grid, section, line):
+        """Returns operation of one line of a record
+
+        Operations are (name, argument) tuples that _apply_operations
+        applies. Raises ValueError if the line is invalid.
+
+        """
+
+        stripped_line = line.decode("utf-8").strip()
+
+        try:
+            if section == "[shape]":
+                shape = _get_key(stripped_line)
+                if len(shape) != 3:
+                    raise ValueError("Journal shape {} invalid.".format(shape))
+
+                return "shape", shape
+
+            elif section == "[grid]":
+                row, col, tab, code = line.rstrip("\n").split("\t", 3)
+                key = _get_key(u"\t".join([row, col, tab]))
+                return "set", (key, unicode(code, encoding="utf-8"))
+
+            elif section == "[deleted]":
+                return "pop", _get_key(stripped_line)
+
+            elif section in ["[attributes]", "[attributes_append]"]:
+                return "append_attribute", dict_grid.get_attribute(line)
+
+            elif section in ["[row_heights]", "[col_widths]"]:
+                pos, tab, size = stripped_line.split("\t")
+                key = _get_key(u"\t".join([pos, tab]))
+                size = None if size == "None" else float(size)
+
+                return section, (key, size)
+
+            elif section == "[macros]":
+                macros = ast.literal_eval(stripped_line)
+                if not isinstance(macros, basestring):
+                    raise ValueError("Journal macros are no string.")
+
+                return "macros", macros
+
+        except (TypeError, SyntaxError), err:
+            raise ValueError(err)
+
+        raise ValueError("Journal line outside of section.")
+
+    def _parse_record(self, dict_grid, record):
+        """Returns list of the operations of one record"""
+
+        operations = []
+        section = None
+
+        for line in record:
+            stripped_line = line.decode("utf-8").strip()
+
+            if stripped_line in SECTIONS:
+                section = stripped_line
+
+                if section == "[attributes]":
+                    operations.append(("clear_attributes", None))
+
+            elif stripped_line:
+                operations.append(self._parse_line(dict_grid, section, line))
+
+        return operations
+
+    def _apply_operations(self, dict_grid, operations):
+        """Applies operations from _parse_record to dict_grid"""
+
+        for name, argument in operations:
+            if name == "shape":
+                dict_grid.shape = argument
+
+            elif name == "set":
+                key, code = argument
+                dict_grid[key] = code
+
+            elif name == "pop":
+                dict_grid.pop(argument, None)
+
+            elif name == "clear_attributes":
+                del dict_grid.cell_attributes[:]
+
+            elif name == "append_attribute":
+                dict_grid.cell_attributes.append(argument)
+
+            elif name in ["[row_heights]", "[col_widths]"]:
+                key, size = argument
+
+                sizes = dict_grid.row_heights \
+                    if name == "[row_heights]" else dict_grid.col_widths
+
+                if size is None:
+                    sizes.pop(key, None)
+                else:
+                    sizes[key] = size
+
+            elif name == "macros":
+                dict_grid.macros = argument
+
+    def replay(self, dict_grid):
+        """Applies the journal to dict_grid, which holds the pys file content
+
+        Returns False if the journal has been written for another version
+        of the pys file and True otherwise, also if there is no journal.
+        Raises ValueError for invalid journals. All records are parsed
+        before the first one is applied, so that dict_grid is unchanged
+        if the journal is not replayed.
+
+        """
+
+        try:
+            journal_file = open(self.journal_filepath, "rb")
+
+        except IOError:
+            # No journal
+            return True
+
+        try:
+            if journal_file.readline() != HEADER:
+                raise ValueError("Journal format unsupported.")
+
+            version = journal_file.readline().strip()
+            if version != VERSION:
+                raise ValueError("Journal version {} unsupported (not {})."
+                                 .format(version, VERSION))
+
+            if journal_file.readline().decode("utf-8") != \
+               self._get_base_id():
+                return False
+
+            operations = []
+
+            for record in self._iter_records(journal_file):
+                operations += self._parse_record(dict_grid, record)
+
+        finally:
+            journal_file.close()
+
+        self._apply_operations(dict_grid, operations)
+
+        return True
+
+# End of class Journal
@@ -118,6 +118,118 @@ class Selection(object):
 
         return False
 
+    def _covers_block(self, top, left, bottom, right):
+        """Returns True iif the block is in one block, the rows or the cols"""
+
+        for (s_top, s_left), (s_bottom, s_right) in izip(self.block_tl,
+                                                         self.block_br):
+            if s_top <= top and bottom <= s_bottom and \
+               s_left <= left and right <= s_right:
+                return True
+
+        if bottom - top < len(self.rows):
+            rows = set(self.rows)
+            if all(row in rows for row in xrange(top, bottom + 1)):
+                return True
+
+        if right - left < len(self.cols):
+            cols = set(self.cols)
+            if all(col in cols for col in xrange(left, right + 1)):
+                return True
+
+        return False
+
+    def covers(self, selection):
+        """Returns True iif all cells of selection are in self
+
+        Cells that are only covered by a combination of several blocks of
+        self are not detected, so that False may be returned for them.
+
+        Parameters
+        ----------
+
+        selection: Selection
+        \tSelection that is checked if it is inside self
+
+        """
+
+        for (top, left), (bottom, right) in izip(selection.block_tl,
+                                                 selection.block_br):
+            if not self._covers_block(top, left, bottom, right):
+                return False
+
+        rows = set(self.rows)
+        cols = set(self.cols)
+
+        return all(row in rows for row in selection.rows) and \
+               all(col in cols for col in selection.cols) and \
+               all(tuple(cell) in self for cell in selection.cells)
+
+    def union(self, selection):
+        """Returns new Selection that contains the cells of self and selection
+
+        Blocks that form a rectangle are merged. Duplicates as well as
+        blocks and cells that are contained in other parts are left out.
+
+        Parameters
+        ----------
+
+        selection: Selection
+        \tSelection that is united with self
+
+        """
+
+        blocks = set((top, left, bottom, right) for (top, left), (bottom, right)
+                     in izip(self.block_tl + selection.block_tl,
+                             self.block_br + selection.block_br))
+
+        # Merge blocks with equal columns and then blocks with equal rows
+        # until nothing changes
+
+        no_blocks = None
+
+        while no_blocks != len(blocks):
+            no_blocks = len(blocks)
+
+            for sort_key, merge in [(lambda b: (b[1], b[3], b[0]), 0),
+                                    (lambda b: (b[0], b[2], b[1]), 1)]:
+                merged = []
+                for block in sorted(blocks, key=sort_key):
+                    if merged:
+                        last = merged[-1]
+                        if last[1 - merge] == block[1 - merge] and \
+                           last[3 - merge] == block[3 - merge] and \
+                           block[merge] <= last[2 + merge] + 1:
+                            end = max(last[2 + merge], block[2 + merge])
+                            last = list(last)
+                            last[2 + merge] = end
+                            merged[-1] = tuple(last)
+                            continue
+
+                    merged.append(block)
+
+                blocks = set(merged)
+
+        # Leave out blocks that are inside larger blocks
+
+        area = lambda (top, left, bottom, right): \
+            (bottom - top + 1) * (right - left + 1)
+
+        union = Selection([], [], sorted(set(self.rows + selection.rows)),
+                          sorted(set(self.cols + selection.cols)), [])
+
+        for top, left, bottom, right in sorted(blocks, key=area, reverse=True):
+            if not union._covers_block(top, left, bottom, right):
+                union.block_tl.append((top, left))
+                union.block_br.append((bottom, right))
+
+        for cell in self.cells + selection.cells:
+            cell = tuple(cell)
+            if cell not in union:
+                union.cells.append(cell)
+
+        return union
+
     def __add__(self, value):
         """Shifts selection down and / or right
 
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmarks for binary_format.py
+
+Run with python bench_binary_format.py
+
+"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+import os
+import sys
+import tempfile
+from timeit import default_timer
+
+TESTPATH = "/".join(os.path.realpath(__file__).split("/")[:-1]) + "/"
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + "/../../..")
+sys.path.insert(0, TESTPATH + "/../..")
+
+from src.lib.binary_format import BinaryPysFile, write_binary_pys_file
+from src.model.model import DictGrid
+
+
+def bench_load(no_cells=1000000):
+    """Load time of the grid section of text and binary pys files
+
+    The text file is uncompressed, so that only parsing is measured.
+
+    """
+
+    dict_grid = DictGrid((10000, no_cells // 10000 + 1, 1))
+
+    for cell in xrange(no_cells):
+        dict_grid[cell % 10000, cell // 10000, 0] = \
+            u"S[{}, 0, 0] * {}".format(cell, cell % 17)
+
+    __, text_filepath = tempfile.mkstemp(suffix=".pys")
+    __, binary_filepath = tempfile.mkstemp(suffix=".pysb")
+
+    try:
+        with open(text_filepath, "wb") as outfile:
+            for line in dict_grid.grid_to_strings():
+                outfile.write(line.encode("utf-8"))
+
+        write_binary_pys_file(binary_filepath, dict_grid)
+
+        start = default_timer()
+
+        text_grid = DictGrid((1, 1, 1))
+        parser = None
+        with open(text_filepath, "rb") as infile:
+            for line in infile:
+                if line == "[shape]\n":
+                    parser = text_grid.parse_to_shape
+                elif line == "[grid]\n":
+                    parser = text_grid.parse_to_grid
+                else:
+                    parser(line)
+
+        text_time = default_timer() - start
+
+        start = default_timer()
+
+        binary_grid = DictGrid((1, 1, 1))
+        infile = BinaryPysFile(binary_filepath)
+        infile.load(binary_grid)
+        infile.close()
+
+        binary_time = default_timer() - start
+
+        print "Load time for {} cells".format(no_cells)
+        print "{0:>10} {1:>10} {2:>10}".format("format", "load s", "file MB")
+
+        for name, load_time, filepath in [
+                ("text", text_time, text_filepath),
+                ("binary", binary_time, binary_filepath)]:
+            file_size = os.path.getsize(filepath) / 1024.0 ** 2
+            print "{0:>10} {1:>10.2f} {2:>10.2f}".format(name, load_time,
+                                                         file_size)
+
+    finally:
+        os.remove(text_filepath)
+        os.remove(binary_filepath)
+
+
+if __name__ == "__main__":
+    bench_load()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmarks for compression.py
+
+Run with python bench_compression.py
+
+"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+import os
+import sys
+import tempfile
+from timeit import default_timer
+
+TESTPATH = "/".join(os.path.realpath(__file__).split("/")[:-1]) + "/"
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + "/../../..")
+sys.path.insert(0, TESTPATH + "/../..")
+
+from src.lib.compression import ParallelBZ2File, get_codecs, open_pys_file
+
+
+def _get_lines(no_cells):
+    """Returns grid section lines of a pys file with no_cells cells"""
+
+    return [u"{}\t{}\t0\tS[{}, 0, 0] * {} + {}\n".format(
+            row % 10000, row // 10000, row, row % 17, row * 0.5)
+            .encode("utf-8") for row in xrange(no_cells)]
+
+
+def bench_bz2_throughput(workers_list=(1, 4, 16), no_cells=1000000):
+    """Save and load throughput of pys files against the number of threads
+
+    Throughput is given in MB of uncompressed data per second.
+
+    """
+
+    lines = _get_lines(no_cells)
+    size = sum(len(line) for line in lines) / 1024.0 ** 2
+
+    __, filepath = tempfile.mkstemp(suffix=".pys")
+
+    print "bz2 throughput for {:.1f} MB, {} CPUs".format(
+        size, os.sysconf("SC_NPROCESSORS_ONLN"))
+    print "{0:>10} {1:>10} {2:>10} {3:>10}".format("workers", "save MB/s",
+                                                   "load MB/s", "file MB")
+
+    try:
+        for workers in workers_list:
+            start = default_timer()
+
+            outfile = ParallelBZ2File(filepath, "wb", workers=workers)
+            for line in lines:
+                outfile.write(line)
+            outfile.close()
+
+            save_time = default_timer() - start
+
+            start = default_timer()
+
+            infile = ParallelBZ2File(filepath, "r", workers=workers)
+            for line in infile:
+                pass
+            infile.close()
+
+            load_time = default_timer() - start
+
+            file_size = os.path.getsize(filepath) / 1024.0 ** 2
+
+            print "{0:>10} {1:>10.1f} {2:>10.1f} {3:>10.2f}".format(
+                workers, size / save_time, size / load_time, file_size)
+
+    finally:
+        os.remove(filepath)
+
+
+def bench_codecs(no_cells=1000000):
+    """Save and load throughput and file size of the available codecs
+
+    Throughput is given in MB of uncompressed data per second. bz2 is
+    compressed with one thread.
+
+    """
+
+    lines = _get_lines(no_cells)
+    size = sum(len(line) for line in lines) / 1024.0 ** 2
+
+    __, filepath = tempfile.mkstemp(suffix=".pys")
+
+    print "Codecs for {:.1f} MB".format(size)
+    print "{0:>10} {1:>10} {2:>10} {3:>10}".format("codec", "save MB/s",
+                                                   "load MB/s", "file MB")
+
+    try:
+        for codec in get_codecs():
+            start = default_timer()
+
+            outfile = open_pys_file(filepath, "wb", codec=codec, workers=1)
+            for line in lines:
+                outfile.write(line)
+            outfile.close()
+
+            save_time = default_timer() - start
+
+            start = default_timer()
+
+            infile = open_pys_file(filepath, "r", workers=1)
+            for line in infile:
+                pass
+            infile.close()
+
+            load_time = default_timer() - start
+
+            file_size = os.path.getsize(filepath) / 1024.0 ** 2
+
+            print "{0:>10} {1:>10.1f} {2:>10.1f} {3:>10.2f}".format(
+                codec, size / save_time, size / load_time, file_size)
+
+    finally:
+        os.remove(filepath)
+
+
+if __name__ == "__main__":
+    bench_bz2_throughput()
+    bench_codecs()
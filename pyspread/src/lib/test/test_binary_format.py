@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit test for binary_format.py"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+import os
+import struct
+import sys
+
+import pytest
+
+TESTPATH = "/".join(os.path.realpath(__file__).split("/")[:-1]) + "/"
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + "/../../..")
+sys.path.insert(0, TESTPATH + "/../..")
+
+from src.lib.binary_format import BinaryPysFile, write_binary_pys_file, \
+    is_binary_pys_file, is_binary_pys_filepath, MAGIC
+from src.lib.selection import Selection
+from src.model.model import DictGrid
+
+
+def _get_dict_grid():
+    """Returns DictGrid with cells, attributes, sizes and macros"""
+
+    dict_grid = DictGrid((100, 10, 3))
+
+    dict_grid[5, 2, 1] = u"u'\xe4\xf6\xfc'"
+    dict_grid[0, 0, 0] = u"1 + 1"
+    dict_grid[0, 3, 0] = u""
+    dict_grid[99, 9, 2] = u"S[0, 0, 0]\n"
+
+    dict_grid.cell_attributes.append((Selection([], [], [], [], [(1, 1)]), 0,
+                                      {"bgcolor": 0xFF0000}))
+
+    dict_grid.row_heights[3, 0] = 42.5
+    dict_grid.col_widths[1, 2] = 100.0
+
+    dict_grid.macros = u"x = u'\xdf'\n"
+
+    return dict_grid
+
+
+def test_write_read(tmpdir):
+    """Binary files are read back with the same content"""
+
+    filepath = str(tmpdir.join("test.pysb"))
+
+    dict_grid = _get_dict_grid()
+    write_binary_pys_file(filepath, dict_grid)
+
+    assert is_binary_pys_file(filepath)
+
+    infile = BinaryPysFile(filepath)
+
+    assert infile.shape == (100, 10, 3)
+    assert infile.cell_count == 4
+
+    # Cells are sorted by table, row and col
+    assert [key for key, code in infile.iter_cells()] == \
+        [(0, 0, 0), (0, 3, 0), (5, 2, 1), (99, 9, 2)]
+
+    # ASCII and non-ASCII chunks are decoded
+    assert list(infile.iter_codes(chunk_size=2)) == \
+        [code for key, code in infile.iter_cells()] == \
+        [dict_grid[key] for key in infile.get_key_list()]
+
+    loaded_grid = DictGrid((1, 1, 1))
+    assert infile.load(loaded_grid)
+
+    # Aborted loads leave out the remaining content
+    aborted_grid = DictGrid((1, 1, 1))
+    assert not infile.load(aborted_grid, abort=lambda no_cells: True)
+    assert aborted_grid.macros == u""
+
+    infile.close()
+
+    assert loaded_grid.shape == dict_grid.shape
+    assert dict(loaded_grid.iteritems()) == dict(dict_grid.iteritems())
+    assert loaded_grid.get_keys(0, 1) == dict_grid.get_keys(0, 1)
+    assert list(loaded_grid.cell_attributes) == \
+        list(dict_grid.cell_attributes)
+    assert loaded_grid.row_heights == dict_grid.row_heights
+    assert loaded_grid.col_widths == dict_grid.col_widths
+    assert loaded_grid.macros == dict_grid.macros
+
+
+def test_empty_grid(tmpdir):
+    """Grids without content are saved and loaded"""
+
+    filepath = str(tmpdir.join("test.pysb"))
+
+    write_binary_pys_file(filepath, DictGrid((1, 2, 3)))
+
+    infile = BinaryPysFile(filepath)
+
+    assert infile.shape == (1, 2, 3)
+    assert list(infile.iter_cells()) == []
+    assert list(infile.iter_attribute_lines()) == []
+    assert infile.get_macros() == u""
+
+    infile.close()
+
+
+def test_text_file():
+    """Text pys files are no binary files"""
+
+    filepath = TESTPATH + "test1.pys"
+
+    assert not is_binary_pys_file(filepath)
+
+    with pytest.raises(ValueError):
+        BinaryPysFile(filepath)
+
+
+def test_unsupported_version(tmpdir):
+    """Files of newer format versions are rejected"""
+
+    filepath = str(tmpdir.join("test.pysb"))
+
+    write_binary_pys_file(filepath, _get_dict_grid())
+
+    with open(filepath, "r+b") as binfile:
+        binfile.seek(len(MAGIC))
+        binfile.write(struct.pack("<I", 2))
+
+    with pytest.raises(ValueError):
+        BinaryPysFile(filepath)
+
+
+def test_truncated_file(tmpdir):
+    """Truncated files are rejected"""
+
+    filepath = str(tmpdir.join("test.pysb"))
+
+    write_binary_pys_file(filepath, _get_dict_grid())
+
+    with open(filepath, "r+b") as binfile:
+        binfile.truncate(os.path.getsize(filepath) - 4)
+
+    with pytest.raises(ValueError):
+        BinaryPysFile(filepath)
+
+
+@pytest.mark.parametrize("filepath, result", [
+    ("test.pysb", True),
+    ("test.pys", False),
+    (None, False),
+])
+def test_is_binary_pys_filepath(filepath, result):
+    """Unit test for is_binary_pys_filepath"""
+
+    assert is_binary_pys_filepath(filepath) == result
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit test for cache.py"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+import os
+import sys
+
+import numpy
+
+TESTPATH = "/".join(os.path.realpath(__file__).split("/")[:-1]) + "/"
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + "/../../..")
+sys.path.insert(0, TESTPATH + "/../..")
+
+from src.lib.cache import get_size, LRUCache
+
+
+def test_get_size():
+    """Unit test for get_size"""
+
+    array = numpy.zeros(1000)
+
+    assert get_size(array) >= 8000
+    assert get_size([array]) < get_size(array)
+    assert get_size(["a" * 1000]) > 1000
+
+
+class TestLRUCache(object):
+    """Unit tests for LRUCache"""
+
+    def setup_method(self, method):
+        """Creates LRUCache with 10 entries at most"""
+
+        self.cache = LRUCache(max_entries=10, get_size=lambda value: value)
+
+    def test_getitem(self):
+        """Unit test for __getitem__"""
+
+        self.cache[(0, 0, 0)] = 1
+
+        assert self.cache[(0, 0, 0)] == 1
+
+        try:
+            self.cache[(1, 0, 0)]
+            assert False
+
+        except KeyError:
+            pass
+
+        stats = self.cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_evict_entries(self):
+        """Unit test for eviction by entry count"""
+
+        for i in xrange(10):
+            self.cache[i, 0, 0] = 1
+
+        # Use oldest entry
+        self.cache[0, 0, 0]
+
+        self.cache[10, 0, 0] = 1
+
+        assert len(self.cache) == 9
+        assert (0, 0, 0) in self.cache
+        assert (1, 0, 0) not in self.cache
+        assert (2, 0, 0) not in self.cache
+        assert self.cache.get_stats()["evictions"] == 2
+
+    def test_evict_bytes(self):
+        """Unit test for eviction by size"""
+
+        self.cache.max_bytes = 100
+
+        self.cache["a"] = 60
+        self.cache["b"] = 30
+        assert self.cache.bytes == 90
+
+        self.cache["c"] = 50
+
+        assert "a" not in self.cache
+        assert self.cache.bytes == 80
+
+        # The most recent entry is kept even if it is too large
+        self.cache["d"] = 500
+        assert self.cache.keys() == ["d"]
+
+    def test_pop_clear(self):
+        """Unit test for pop and clear"""
+
+        self.cache["a"] = 5
+        self.cache["b"] = 6
+
+        assert self.cache.pop("a") == 5
+        assert self.cache.pop("a", None) is None
+        assert self.cache.bytes == 6
+
+        del self.cache["b"]
+        assert self.cache.bytes == 0
+
+        self.cache["c"] = 7
+        self.cache.clear()
+
+        assert self.cache.bytes == 0
+        assert self.cache == {}
+
+    def test_generation(self):
+        """Removals increment the generation, insertions and evictions not"""
+
+        for i in xrange(11):
+            self.cache[i] = 1
+
+        assert self.cache.get_stats()["evictions"]
+        assert self.cache.generation == 0
+
+        self.cache.pop(10)
+        del self.cache[9]
+        self.cache.clear()
+
+        assert self.cache.generation == 3
+
+    def test_get(self):
+        """get marks entries as recently used without counting hits"""
+
+        for i in xrange(10):
+            self.cache[i] = 1
+
+        assert self.cache.get(0) == 1
+        assert self.cache.get(20, 2) == 2
+
+        self.cache[10] = 1
+
+        assert 0 in self.cache
+        assert 1 not in self.cache
+
+        stats = self.cache.get_stats()
+        assert stats["hits"] == 0
+        assert stats["misses"] == 0
+
+    def test_dict_methods(self):
+        """setdefault, update, popitem and copy keep sizes and use order"""
+
+        assert self.cache.setdefault("a", 5) == 5
+        assert self.cache.setdefault("a", 7) == 5
+        assert self.cache.bytes == 5
+
+        self.cache.update({"b": 6}, c=7)
+        assert self.cache.bytes == 18
+
+        cache = self.cache.copy()
+        assert type(cache) is LRUCache
+        assert cache == self.cache
+        assert cache.bytes == 18
+
+        key, value = self.cache.popitem()
+        assert self.cache.bytes == 18 - value
+        assert self.cache.generation == 1
+
+        cache.update((i, 1) for i in xrange(10))
+        assert len(cache) == 9
+        assert cache.bytes == 9
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit test for compression.py"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+import bz2
+import os
+import sys
+
+import pytest
+
+TESTPATH = "/".join(os.path.realpath(__file__).split("/")[:-1]) + "/"
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + "/../../..")
+sys.path.insert(0, TESTPATH + "/../..")
+
+from src.lib.compression import ParallelBZ2File, decompress_streams, \
+    CodecFile, get_codecs, open_pys_file, HEADER
+
+LINES = ["{}\t{}\t0\t'{}'\n".format(row, row % 3, "a" * (row % 50))
+         for row in xrange(2000)]
+
+
+def _write(filepath, workers, lines=LINES):
+    """Writes lines with stream size 1000 and returns the file content"""
+
+    outfile = ParallelBZ2File(filepath, "wb", workers=workers,
+                              stream_size=1000)
+    for line in lines:
+        outfile.write(line)
+    outfile.close()
+
+    return open(filepath, "rb").read()
+
+
+def test_decompress_streams():
+    """Unit test for decompress_streams"""
+
+    data = bz2.compress("abc") + bz2.compress("") + bz2.compress("def")
+
+    assert decompress_streams(data) == "abcdef"
+
+    with pytest.raises(EOFError):
+        decompress_streams(data[:-1])
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_write_read(tmpdir, workers):
+    """Files are read line by line with any number of workers"""
+
+    filepath = str(tmpdir.join("test.pys"))
+
+    _write(filepath, workers)
+
+    for read_workers in [1, 3]:
+        infile = ParallelBZ2File(filepath, "r", workers=read_workers)
+        assert infile.readline() == LINES[0]
+        assert list(infile) == LINES[1:]
+        assert infile.readline() == ""
+        infile.close()
+
+
+def test_streams(tmpdir):
+    """One worker writes one stream, more workers write several streams"""
+
+    filepath = str(tmpdir.join("test.pys"))
+
+    _write(filepath, 1)
+
+    assert bz2.BZ2File(filepath).read() == "".join(LINES)
+
+    data = _write(filepath, 2)
+
+    assert data.count("BZh9") > 10
+    assert decompress_streams(data) == "".join(LINES)
+
+
+def test_empty(tmpdir):
+    """Empty files are valid bz2 files"""
+
+    filepath = str(tmpdir.join("test.pys"))
+
+    _write(filepath, 2, lines=[])
+
+    assert bz2.BZ2File(filepath).read() == ""
+    assert list(ParallelBZ2File(filepath, "r", workers=2)) == []
+
+
+def test_false_stream_start(tmpdir, monkeypatch):
+    """Stream magic inside a stream falls back to sequential reading"""
+
+    filepath = str(tmpdir.join("test.pys"))
+
+    _write(filepath, 2)
+
+    monkeypatch.setattr(ParallelBZ2File, "_get_chunks",
+                        lambda self, data: [(0, 10), (10, len(data))])
+
+    assert list(ParallelBZ2File(filepath, "r", workers=2)) == LINES
+
+
+@pytest.mark.parametrize("codec", get_codecs())
+def test_open_pys_file(tmpdir, codec):
+    """Files of all codecs are read with the header without codec tag"""
+
+    filepath = str(tmpdir.join("test.pys"))
+
+    outfile = open_pys_file(filepath, "wb", codec=codec, workers=2)
+    for line in LINES:
+        outfile.write(line)
+    outfile.close()
+
+    data = open(filepath, "rb").read()
+
+    if codec == "bz2":
+        # bz2 files have no codec tag
+        assert data.startswith("BZh")
+    else:
+        assert data.startswith(HEADER + "0.1 " + codec + "\n")
+
+    infile = open_pys_file(filepath, "r")
+
+    assert infile.readline() == HEADER
+    assert infile.readline() == "0.1\n"
+    assert list(infile) == LINES
+
+    infile.close()
+
+
+def test_codec_file(tmpdir):
+    """Header errors and files without codec tag"""
+
+    filepath = str(tmpdir.join("test.pys"))
+
+    open(filepath, "wb").write(HEADER + "0.1\n" + "".join(LINES))
+
+    infile = CodecFile(filepath)
+    assert infile.codec == "none"
+    assert list(infile)[2:] == LINES
+
+    with pytest.raises(ValueError):
+        CodecFile(filepath, "wb", codec="unknown")
+
+    # Tagged bz2 content may consist of several streams
+    open(filepath, "wb").write(HEADER + "0.1 bz2\n" +
+                               bz2.compress("".join(LINES[:3])) +
+                               bz2.compress("".join(LINES[3:])))
+
+    assert list(CodecFile(filepath))[2:] == LINES
+
+    open(filepath, "wb").write(HEADER + "0.1 unknown\n")
+
+    with pytest.raises(ValueError):
+        open_pys_file(filepath)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit test for journal.py"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+import os
+import sys
+
+import pytest
+
+TESTPATH = "/".join(os.path.realpath(__file__).split("/")[:-1]) + "/"
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + "/../../..")
+sys.path.insert(0, TESTPATH + "/../..")
+
+from src.lib.journal import Journal
+from src.lib.selection import Selection
+from src.model.model import DictGrid
+
+
+def _get_state(dict_grid):
+    """Returns comparable content of dict_grid"""
+
+    return (dict_grid.shape, dict(dict_grid.iteritems()),
+            list(dict_grid.attributes_to_strings()),
+            dict((key, size) for key, size in dict_grid.row_heights.iteritems()
+                 if size is not None),
+            dict_grid.col_widths, dict_grid.macros)
+
+
+class TestJournal(object):
+    """Unit tests for Journal"""
+
+    def setup_method(self, method):
+        """Creates a saved DictGrid with a started journal"""
+
+        self.dict_grid = DictGrid((10, 10, 2))
+
+        self.dict_grid[0, 0, 0] = u"1"
+        self.dict_grid[1, 0, 0] = u"2"
+        self.dict_grid.row_heights[0, 0] = 30.0
+        self.dict_grid.macros = u"a = 1\n"
+
+    def _start(self, tmpdir):
+        """Writes a dummy pys file, returns its path and starts journal"""
+
+        filepath = str(tmpdir.join("test.pys"))
+        open(filepath, "wb").write("base")
+
+        self.journal = Journal(filepath)
+        self.journal.start(self.dict_grid)
+
+        return filepath
+
+    def _start_snapshot(self, tmpdir, snapshot):
+        """Writes a dummy pys file and starts journal from snapshot"""
+
+        filepath = str(tmpdir.join("test.pys"))
+        open(filepath, "wb").write("base")
+
+        self.journal = Journal(filepath)
+        self.journal.start(self.dict_grid, snapshot)
+        snapshot.release()
+
+        return filepath
+
+    def _replay(self, filepath):
+        """Returns DictGrid with the saved content and the journal replayed"""
+
+        dict_grid = DictGrid((10, 10, 2))
+
+        dict_grid[0, 0, 0] = u"1"
+        dict_grid[1, 0, 0] = u"2"
+        dict_grid.row_heights[0, 0] = 30.0
+        dict_grid.macros = u"a = 1\n"
+
+        assert Journal(filepath).replay(dict_grid)
+
+        return dict_grid
+
+    def test_append_replay(self, tmpdir):
+        """Cell, attribute, size and macro changes are replayed"""
+
+        filepath = self._start(tmpdir)
+
+        dict_grid = self.dict_grid
+
+        dict_grid[2, 2, 1] = u"u'\xe4'"
+        dict_grid.pop((1, 0, 0))
+        dict_grid.cell_attributes.append(
+            (Selection([], [], [], [], [(1, 1)]), 0, {"bgcolor": 0}))
+        dict_grid.row_heights[0, 0] = None
+        dict_grid.col_widths[3, 1] = 80.0
+
+        self.journal.append(dict_grid)
+
+        assert dict_grid.changed_keys == set()
+        assert _get_state(self._replay(filepath)) == _get_state(dict_grid)
+
+        # A second record replaces the attributes and changes the shape
+
+        dict_grid.shape = (20, 10, 2)
+        dict_grid[0, 0, 0] = u"3"
+        del dict_grid.cell_attributes[:]
+        dict_grid.cell_attributes.append(
+            (Selection([], [], [], [], [(2, 2)]), 1, {"bgcolor": 1}))
+        dict_grid.macros = u"a = 2\n[end]\n"
+
+        self.journal.append(dict_grid)
+
+        assert _get_state(self._replay(filepath)) == _get_state(dict_grid)
+
+    def test_incomplete_record(self, tmpdir):
+        """Records without end are ignored"""
+
+        filepath = self._start(tmpdir)
+
+        self.dict_grid[5, 5, 0] = u"5"
+        self.journal.append(self.dict_grid)
+
+        with open(self.journal.journal_filepath, "ab") as journal_file:
+            journal_file.write("[record]\n[grid]\n6\t6\t0\t6\n")
+
+        assert self._replay(filepath)[6, 6, 0] is None
+        assert self._replay(filepath)[5, 5, 0] == u"5"
+
+    def test_replaced_base(self, tmpdir):
+        """Journals of replaced pys files are not replayed or appended"""
+
+        filepath = self._start(tmpdir)
+
+        self.dict_grid[5, 5, 0] = u"5"
+        self.journal.append(self.dict_grid)
+
+        assert self.journal.can_append(self.dict_grid)
+
+        open(filepath, "wb").write("other base")
+
+        assert not self.journal.can_append(self.dict_grid)
+        assert not Journal(filepath).replay(DictGrid((10, 10, 2)))
+
+    def test_can_append(self, tmpdir):
+        """Appending requires tracked cells and a small journal"""
+
+        assert not Journal("test.pys").can_append(self.dict_grid)
+
+        self._start(tmpdir)
+
+        self.dict_grid[5, 5, 0] = u"5"
+
+        assert self.journal.can_append(self.dict_grid, max_size=0)
+
+        self.journal.append(self.dict_grid)
+
+        assert not self.journal.can_append(self.dict_grid, max_size=0)
+
+        self.dict_grid.clear()
+
+        assert not self.journal.can_append(self.dict_grid)
+
+    def test_remove(self, tmpdir):
+        """Unit test for remove"""
+
+        self._start(tmpdir)
+        self.journal.append(self.dict_grid)
+
+        assert self.journal.get_size()
+
+        self.journal.remove()
+
+        assert self.journal.get_size() == 0
+
+    def test_invalid_journal(self, tmpdir):
+        """Files without journal header are rejected"""
+
+        filepath = self._start(tmpdir)
+
+        open(self.journal.journal_filepath, "wb").write("nonsense\n")
+
+        with pytest.raises(ValueError):
+            Journal(filepath).replay(DictGrid((10, 10, 2)))
+
+    def test_start_snapshot(self, tmpdir):
+        """Changes after a snapshot are appended after saving the snapshot"""
+
+        snapshot = self.dict_grid.get_snapshot()
+
+        self.dict_grid[5, 5, 0] = u"5"
+        self.dict_grid.row_heights[0, 0] = 40.0
+
+        filepath = self._start_snapshot(tmpdir, snapshot)
+
+        assert self.dict_grid.changed_keys == set([(5, 5, 0)])
+
+        self.journal.append(self.dict_grid)
+
+        assert _get_state(self._replay(filepath)) == _get_state(self.dict_grid)
+
+    def test_invalid_record(self, tmpdir):
+        """Invalid records leave the grid unchanged"""
+
+        filepath = self._start(tmpdir)
+
+        self.dict_grid[5, 5, 0] = u"5"
+        self.journal.append(self.dict_grid)
+
+        with open(self.journal.journal_filepath, "ab") as journal_file:
+            journal_file.write("[record]\n[row_heights]\n1\t0\tx\n[end]\n")
+
+        dict_grid = DictGrid((10, 10, 2))
+
+        with pytest.raises(ValueError):
+            Journal(filepath).replay(dict_grid)
+
+        assert list(dict_grid) == []
@@ -105,3 +105,33 @@ class TestSelection(object):
         bbox_tl, bbox_br = selection.get_bbox()
         assert bbox_tl == sel_tl[0]
         assert bbox_br == sel_br[0]
+
+    def test_covers(self):
+        """Unit test for covers"""
+
+        selection = self.SelectionCls([(0, 0)], [(9, 2)], [20], [5], [])
+
+        assert selection.covers(self.SelectionCls([(1, 1)], [(3, 2)], [20],
+                                                  [], [(4, 0), (20, 99)]))
+        assert selection.covers(self.SelectionCls([(10, 5)], [(99, 5)], [],
+                                                  [5], []))
+        assert not selection.covers(self.SelectionCls([(1, 1)], [(10, 2)],
+                                                      [], [], []))
+        assert not selection.covers(self.selection)
+
+    def test_union(self):
+        """Unit test for union"""
+
+        selection_1 = self.SelectionCls([(0, 0)], [(4, 2)], [], [], [(10, 10)])
+        selection_2 = self.SelectionCls([(5, 0), (1, 1)], [(9, 2), (2, 2)],
+                                        [7], [], [(10, 10), (3, 1)])
+
+        union = selection_1.union(selection_2)
+
+        assert union.block_tl == [(0, 0)]
+        assert union.block_br == [(9, 2)]
+        assert union.rows == [7]
+        assert union.cells == [(10, 10)]
+
+        for cell in [(0, 0), (9, 2), (7, 100), (10, 10)]:
+            assert cell in union
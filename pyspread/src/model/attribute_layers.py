@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+
+Attribute layers
+================
+
+Attribute layers contains the AttributeLayers class that stores cell
+attributes as run-length encoded layers for rectangular block queries.
+
+"""
+
+from bisect import bisect_right
+from itertools import izip
+import sys
+
+# Value of cells for which an attribute has not been set
+MISSING = object()
+
+# Last row or column of selections that cover whole rows or columns
+MAX_INDEX = sys.maxint - 1
+
+
+def _is_same(value_1, value_2):
+    """Returns True if both values are equal and of the same type"""
+
+    return type(value_1) is type(value_2) and value_1 == value_2
+
+
+def _are_same_runs(runs_1, runs_2):
+    """Returns True if both [row_starts, values] runs are the same"""
+
+    starts_1, values_1 = runs_1
+    starts_2, values_2 = runs_2
+
+    return starts_1 == starts_2 and \
+           all(_is_same(value_1, value_2)
+               for value_1, value_2 in izip(values_1, values_2))
+
+
+class RunLayer(object):
+    """Run-length encoded values of one attribute in one table
+
+    The columns are split into intervals in which all columns have the
+    same row runs. Each interval contains a list of run start rows and a
+    list of the values of the runs.
+
+    """
+
+    def __init__(self):
+        # First column of each column interval
+        self.col_starts = [0]
+
+        # Row runs of each column interval as [row_starts, values]
+        self.row_runs = [[[0], [MISSING]]]
+
+    def _split_cols(self, pos):
+        """Splits the column interval that contains pos at pos
+
+        Returns the position of the column interval that starts at pos.
+
+        """
+
+        col_starts = self.col_starts
+
+        i = bisect_right(col_starts, pos) - 1
+
+        if col_starts[i] == pos:
+            return i
+
+        row_starts, values = self.row_runs[i]
+
+        col_starts.insert(i + 1, pos)
+        self.row_runs.insert(i + 1, [row_starts[:], values[:]])
+
+        return i + 1
+
+    def _set_rows(self, row_runs, top, bottom, value):
+        """Sets value for rows top to bottom in row_runs"""
+
+        row_starts, values = row_runs
+
+        first = self._split_rows(row_starts, values, top)
+        if bottom < MAX_INDEX:
+            last = self._split_rows(row_starts, values, bottom + 1)
+        else:
+            last = len(row_starts)
+
+        row_starts[first:last] = [top]
+        values[first:last] = [value]
+
+        # Merge equal neighbouring runs
+        if first + 1 < len(values) and _is_same(values[first + 1], value):
+            del row_starts[first + 1]
+            del values[first + 1]
+
+        if first > 0 and _is_same(values[first - 1], value):
+            del row_starts[first]
+            del values[first]
+
+    def _split_rows(self, row_starts, values, pos):
+        """Splits row run that contains pos, returns position of new run"""
+
+        i = bisect_right(row_starts, pos) - 1
+
+        if row_starts[i] == pos:
+            return i
+
+        row_starts.insert(i + 1, pos)
+        values.insert(i + 1, values[i])
+
+        return i + 1
+
+    def set_block(self, top, left, bottom, right, value):
+        """Sets value for all cells in block, boundaries are inclusive"""
+
+        top = max(0, top)
+        left = max(0, left)
+
+        if bottom < top or right < left:
+            return
+
+        col_starts = self.col_starts
+        row_runs = self.row_runs
+
+        first = self._split_cols(left)
+        if right < MAX_INDEX:
+            last = self._split_cols(right + 1)
+        else:
+            last = len(col_starts)
+
+        for runs in row_runs[first:last]:
+            self._set_rows(runs, top, bottom, value)
+
+        # Merge equal neighbouring column intervals
+        for i in xrange(min(last, len(col_starts) - 1), max(first, 1) - 1,
+                        -1):
+            if _are_same_runs(row_runs[i], row_runs[i - 1]):
+                del col_starts[i]
+                del row_runs[i]
+
+    def get_runs(self, top, left, bottom, right):
+        """Yields (top, left, bottom, right, value) of runs inside block
+
+        The runs are clipped to the block. Runs without value are left out.
+
+        """
+
+        col_starts = self.col_starts
+        col_ends = col_starts[1:] + [MAX_INDEX + 1]
+
+        first = bisect_right(col_starts, left) - 1
+
+        for col_start, col_end, (row_starts, values) in \
+                izip(col_starts[first:], col_ends[first:],
+                     self.row_runs[first:]):
+            if col_start > right:
+                break
+
+            run_left = max(left, col_start)
+            run_right = min(right, col_end - 1)
+
+            row_ends = row_starts[1:] + [MAX_INDEX + 1]
+            first_row = bisect_right(row_starts, top) - 1
+
+            for row_start, row_end, value in \
+                    izip(row_starts[first_row:], row_ends[first_row:],
+                         values[first_row:]):
+                if row_start > bottom:
+                    break
+
+                if value is not MISSING:
+                    yield (max(top, row_start), run_left,
+                           min(bottom, row_end - 1), run_right, value)
+
+# End of class RunLayer
+
+
+class AttributeLayers(object):
+    """Cell attributes as one RunLayer per table and attribute
+
+    Entries are applied in order, so that later entries override earlier
+    ones like in CellAttributes.
+
+    Parameters
+    ----------
+    entries: Iterable of 3-tuples (selection, table, attr_dict)
+    \tEntries that are applied, e.g. a CellAttributes object
+
+    """
+
+    def __init__(self, entries=()):
+        # Maps table to dict that maps attribute name to RunLayer
+        self.tables = {}
+
+        for entry in entries:
+            self.apply(entry)
+
+    def apply(self, entry):
+        """Applies a CellAttributes entry on top of the layers"""
+
+        selection, table, attr_dict = entry
+
+        layers = self.tables.setdefault(table, {})
+
+        blocks = [(top, left, bottom, right)
+                  for (top, left), (bottom, right)
+                  in izip(selection.block_tl, selection.block_br)]
+        blocks += [(row, 0, row, MAX_INDEX) for row in selection.rows]
+        blocks += [(0, col, MAX_INDEX, col) for col in selection.cols]
+        blocks += [(row, col, row, col) for row, col in selection.cells]
+
+        for attr, value in attr_dict.iteritems():
+            try:
+                layer = layers[attr]
+
+            except KeyError:
+                layer = layers[attr] = RunLayer()
+
+            for block in blocks:
+                layer.set_block(*(block + (value,)))
+
+    def get_block(self, top, left, bottom, right, table):
+        """Returns dict that maps (row, col) to dict of set attributes
+
+        Only cells with at least one set attribute are contained.
+
+        Parameters
+        ----------
+        top, left, bottom, right: Integer
+        \tInclusive boundaries of the block
+        table: Integer
+        \tTable of the block
+
+        """
+
+        block = {}
+
+        for attr, layer in self.tables.get(table, {}).iteritems():
+            for run_top, run_left, run_bottom, run_right, value in \
+                    layer.get_runs(top, left, bottom, right):
+                for row in xrange(run_top, run_bottom + 1):
+                    for col in xrange(run_left, run_right + 1):
+                        try:
+                            block[row, col][attr] = value
+
+                        except KeyError:
+                            block[row, col] = {attr: value}
+
+        return block
+
+# End of class AttributeLayers
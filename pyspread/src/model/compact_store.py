@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+
+Compact store
+=============
+
+Compact store contains the CompactKeyValueStore class, a memory saving
+alternative to KeyValueStore for grids with many cells.
+
+"""
+
+# Bits of the packed key for cols and rows, tables use the remaining bits
+COL_BITS = 20
+ROW_BITS = 26
+TAB_BITS = 17
+
+COL_MASK = (1 << COL_BITS) - 1
+ROW_MASK = (1 << ROW_BITS) - 1
+TAB_MASK = (1 << TAB_BITS) - 1
+
+ROW_SHIFT = COL_BITS
+TAB_SHIFT = COL_BITS + ROW_BITS
+
+
+def pack_key(key):
+    """Returns integer for (row, col, tab) key or None if key does not fit
+
+    Keys fit if row, col and tab are non-negative integers below 2 ** 26,
+    2 ** 20 and 2 ** 17, so that packed keys are machine sized integers
+    on 64 bit systems.
+
+    """
+
+    try:
+        row, col, tab = key
+
+    except (TypeError, ValueError):
+        return
+
+    if type(row) is not int or type(col) is not int or type(tab) is not int:
+        try:
+            int_key = int(row), int(col), int(tab)
+
+        except (TypeError, ValueError):
+            # Key elements that cannot be converted, e.g. slices
+            return
+
+        if int_key != (row, col, tab):
+            return
+
+        row, col, tab = int_key
+
+    if 0 <= row <= ROW_MASK and 0 <= col <= COL_MASK and 0 <= tab <= TAB_MASK:
+        return (tab << TAB_SHIFT) | (row << ROW_SHIFT) | col
+
+
+def unpack_key(packed_key):
+    """Returns (row, col, tab) key for integer from pack_key"""
+
+    return ((packed_key >> ROW_SHIFT) & ROW_MASK, packed_key & COL_MASK,
+            packed_key >> TAB_SHIFT)
+
+
+class CompactKeyValueStore(object):
+    """Key-Value store in memory with packed keys and shared code strings
+
+    Cell keys are stored as single integers instead of tuples. Equal
+    unicode code strings are stored once in a string table with reference
+    counts, so that cells with repeated formulas share one string. Keys
+    that cannot be packed are stored in a separate dict.
+
+    The mapping interface is the same as for KeyValueStore, i.e. the
+    default value for missing keys is None.
+
+    """
+
+    def __init__(self):
+        # Maps packed keys to code
+        self._cells = {}
+
+        # Maps keys that cannot be packed to code
+        self._other_cells = {}
+
+        # Maps code strings to themselves
+        self._strings = {}
+
+        # Maps code strings that are used by more than one cell to the
+        # number of cells
+        self._string_counts = {}
+
+    def __len__(self):
+        return len(self._cells) + len(self._other_cells)
+
+    def __repr__(self):
+        return repr(dict(self.iteritems()))
+
+    def _get_cells(self, key):
+        """Returns (cells dict, key in dict) for key"""
+
+        packed_key = pack_key(key)
+
+        if packed_key is None:
+            return self._other_cells, key
+
+        return self._cells, packed_key
+
+    def _intern(self, value):
+        """Returns shared string for value and increases its count"""
+
+        if type(value) is not unicode:
+            return value
+
+        try:
+            shared_value = self._strings[value]
+
+        except KeyError:
+            self._strings[value] = value
+            return value
+
+        string_counts = self._string_counts
+        string_counts[shared_value] = string_counts.get(shared_value, 1) + 1
+
+        return shared_value
+
+    def _release(self, value):
+        """Decreases count of value and removes it if it is unused"""
+
+        if type(value) is not unicode:
+            return
+
+        string_counts = self._string_counts
+
+        try:
+            count = string_counts[value]
+
+        except KeyError:
+            # The last cell with value
+            del self._strings[value]
+            return
+
+        if count > 2:
+            string_counts[value] = count - 1
+
+        else:
+            del string_counts[value]
+
+    def __getitem__(self, key):
+        cells, cell_key = self._get_cells(key)
+
+        return cells.get(cell_key)
+
+    def get(self, key, default=None):
+        """Returns code of key or default if key is not present"""
+
+        cells, cell_key = self._get_cells(key)
+
+        return cells.get(cell_key, default)
+
+    def __setitem__(self, key, value):
+        cells, cell_key = self._get_cells(key)
+
+        value = self._intern(value)
+
+        try:
+            self._release(cells[cell_key])
+
+        except KeyError:
+            pass
+
+        cells[cell_key] = value
+
+    def __delitem__(self, key):
+        cells, cell_key = self._get_cells(key)
+
+        self._release(cells.pop(cell_key))
+
+    def __contains__(self, key):
+        cells, cell_key = self._get_cells(key)
+
+        return cell_key in cells
+
+    has_key = __contains__
+
+    def pop(self, key, *default):
+        """Removes key and returns its code, see dict.pop"""
+
+        cells, cell_key = self._get_cells(key)
+
+        try:
+            value = cells.pop(cell_key)
+
+        except KeyError:
+            if default:
+                return default[0]
+            raise KeyError(key)
+
+        self._release(value)
+
+        return value
+
+    def clear(self):
+        """Removes all cells"""
+
+        self.__init__()
+
+    def iterkeys(self):
+        """Returns iterator of the keys of all cells"""
+
+        for packed_key in self._cells:
+            yield unpack_key(packed_key)
+
+        for key in self._other_cells:
+            yield key
+
+    __iter__ = iterkeys
+
+    def itervalues(self):
+        """Returns iterator of the code of all cells"""
+
+        for value in self._cells.itervalues():
+            yield value
+
+        for value in self._other_cells.itervalues():
+            yield value
+
+    def iteritems(self):
+        """Returns iterator of (key, code) tuples of all cells"""
+
+        for packed_key, value in self._cells.iteritems():
+            yield unpack_key(packed_key), value
+
+        for item in self._other_cells.iteritems():
+            yield item
+
+    def keys(self):
+        """Returns list of the keys of all cells"""
+
+        return list(self.iterkeys())
+
+    def values(self):
+        """Returns list of the code of all cells"""
+
+        return list(self.itervalues())
+
+    def items(self):
+        """Returns list of (key, code) tuples of all cells"""
+
+        return list(self.iteritems())
+
+    def update(self, *args, **kwargs):
+        """Sets cells, see dict.update"""
+
+        for key, value in dict(*args, **kwargs).iteritems():
+            self[key] = value
+
+    def get_string_count(self):
+        """Returns number of distinct code strings"""
+
+        return len(self._strings)
+
+    def __getstate__(self):
+        """Returns state for pickling without the string table"""
+
+        return {"cells": self._cells, "other_cells": self._other_cells}
+
+    def __setstate__(self, state):
+        """Restores cells and rebuilds the string table after unpickling"""
+
+        self.__init__()
+
+        for cells, pickled_cells in [(self._cells, state["cells"]),
+                                     (self._other_cells,
+                                      state["other_cells"])]:
+            for key, value in pickled_cells.iteritems():
+                cells[key] = self._intern(value)
+
+# End of class CompactKeyValueStore
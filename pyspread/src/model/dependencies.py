@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+
+Dependencies
+============
+
+Dependencies contains the DependencyGraph class that tracks which cells
+read which other cells during evaluation.
+
+"""
+
+
+class DependencyGraph(object):
+    """Graph of cell read dependencies
+
+    Edges are recorded while a cell is evaluated: Each cell key that is read
+    via S[...] becomes a precedent of the evaluated cell. The graph is used
+    for invalidating only the transitive dependents of a changed cell.
+
+    Attributes
+    ----------
+    precedents: Dict
+    \tMaps cell key to set of keys that the cell has read
+    dependents: Dict
+    \tMaps cell key to set of keys that have read the cell
+
+    """
+
+    def __init__(self):
+        self.precedents = {}
+        self.dependents = {}
+
+    def __contains__(self, key):
+        """Returns True iif key has precedents or dependents"""
+
+        return key in self.precedents or key in self.dependents
+
+    def add(self, dependent, precedent):
+        """Records that dependent has read precedent"""
+
+        try:
+            self.precedents[dependent].add(precedent)
+        except KeyError:
+            self.precedents[dependent] = set([precedent])
+
+        try:
+            self.dependents[precedent].add(dependent)
+        except KeyError:
+            self.dependents[precedent] = set([dependent])
+
+    def remove_precedents(self, dependent):
+        """Removes all edges from dependent to its precedents
+
+        This is called before a cell is re-evaluated, because the new
+        evaluation records its reads again.
+
+        """
+
+        for precedent in self.precedents.pop(dependent, ()):
+            dependents = self.dependents[precedent]
+            dependents.discard(dependent)
+            if not dependents:
+                del self.dependents[precedent]
+
+    def get_dependents(self, key):
+        """Returns set of all transitive dependents of key
+
+        key itself is not included unless it lies on a cycle.
+
+        """
+
+        return self.get_all_dependents([key])
+
+    def get_all_dependents(self, keys):
+        """Returns set of all transitive dependents of the keys
+
+        The dependency graph is traversed once for all keys. The keys are
+        not included unless they depend on one of the keys.
+
+        """
+
+        result = set()
+        stack = list(keys)
+
+        while stack:
+            for dependent in self.dependents.get(stack.pop(), ()):
+                if dependent not in result:
+                    result.add(dependent)
+                    stack.append(dependent)
+
+        return result
+
+    def clear(self):
+        """Removes all edges"""
+
+        self.precedents.clear()
+        self.dependents.clear()
+
+# End of class DependencyGraph
@@ -0,0 +1,563 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+
+Key index
+=========
+
+Key index contains the KeyIndex class that keeps the keys of the non-empty
+cells of DictGrid sorted per table, row and column.
+
+"""
+
+from bisect import bisect_left, bisect_right
+
+
+def _sorted_method(method):
+    """Decorator for TableKeyIndex methods that require sorted lists"""
+
+    def wrapper(self, *args, **kwargs):
+        if self.unsorted:
+            self.sort()
+
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+
+    return wrapper
+
+
+class TableKeyIndex(object):
+    """Keys of the non-empty cells of one table
+
+    For rows and columns, the positions that contain cells are kept in a
+    sorted list and mapped to the sorted list of positions on the other
+    axis.
+
+    add appends to the lists and records lists that are out of order. They
+    are sorted once before the next query, so that adding many keys in
+    arbitrary order, e.g. on loading, does not insert into sorted lists.
+
+    """
+
+    def __init__(self):
+        # Maps row to sorted cols and col to sorted rows
+        self.maps = {}, {}
+
+        # Sorted rows and sorted cols that contain cells
+        self.positions = [], []
+
+        # (axis, pos) of map lists and (axis, None) of position lists that
+        # are out of order
+        self.unsorted = set()
+
+    def __iter__(self):
+        """Yields (row, col) of all cells"""
+
+        for row, cols in self.maps[0].iteritems():
+            for col in cols:
+                yield row, col
+
+    def add(self, row, col):
+        """Adds cell, the cell must not be present"""
+
+        for axis, (pos, other) in enumerate([(row, col), (col, row)]):
+            axis_map = self.maps[axis]
+
+            try:
+                others = axis_map[pos]
+
+            except KeyError:
+                axis_map[pos] = [other]
+
+                positions = self.positions[axis]
+                if positions and positions[-1] > pos:
+                    self.unsorted.add((axis, None))
+                positions.append(pos)
+
+                continue
+
+            if others[-1] > other:
+                self.unsorted.add((axis, pos))
+            others.append(other)
+
+    def update(self, cells):
+        """Adds (row, col) of cells, the cells must not be present"""
+
+        row_map, col_map = self.maps
+
+        for row, col in cells:
+            try:
+                row_map[row].append(col)
+            except KeyError:
+                row_map[row] = [col]
+
+            try:
+                col_map[col].append(row)
+            except KeyError:
+                col_map[col] = [row]
+
+        for axis_map in self.maps:
+            for others in axis_map.itervalues():
+                others.sort()
+
+        self.positions = sorted(row_map), sorted(col_map)
+        self.unsorted.clear()
+
+    def sort(self):
+        """Sorts the lists that are out of order after add"""
+
+        for axis, pos in self.unsorted:
+            if pos is None:
+                self.positions[axis].sort()
+            else:
+                self.maps[axis][pos].sort()
+
+        self.unsorted.clear()
+
+    @_sorted_method
+    def remove(self, row, col):
+        """Removes cell, the cell must be present"""
+
+        for axis, (pos, other) in enumerate([(row, col), (col, row)]):
+            others = self.maps[axis][pos]
+            del others[bisect_left(others, other)]
+
+            if not others:
+                del self.maps[axis][pos]
+                positions = self.positions[axis]
+                del positions[bisect_left(positions, pos)]
+
+    @_sorted_method
+    def get_cells(self, axis, start, stop=None):
+        """Yields (row, col) of cells with start <= cell[axis] < stop"""
+
+        positions = self.positions[axis]
+        axis_map = self.maps[axis]
+
+        for pos in positions[bisect_left(positions, start):]:
+            if stop is not None and pos >= stop:
+                break
+
+            for other in axis_map[pos]:
+                yield (pos, other) if axis == 0 else (other, pos)
+
+    @_sorted_method
+    def get_block(self, top, left, bottom, right):
+        """Returns list of (row, col) of the cells in block sorted by row
+
+        The block boundaries are inclusive. The axis with fewer non-empty
+        positions inside the block is traversed.
+
+        """
+
+        bounds = (top, bottom), (left, right)
+
+        ranges = []
+        for axis, (start, stop) in enumerate(bounds):
+            positions = self.positions[axis]
+            ranges.append((bisect_left(positions, start),
+                           bisect_right(positions, stop)))
+
+        axis = 0 if ranges[0][1] - ranges[0][0] <= \
+            ranges[1][1] - ranges[1][0] else 1
+
+        first, last = ranges[axis]
+        other_start, other_stop = bounds[1 - axis]
+        axis_map = self.maps[axis]
+
+        cells = []
+
+        for pos in self.positions[axis][first:last]:
+            others = axis_map[pos]
+            for other in others[bisect_left(others, other_start):
+                                bisect_right(others, other_stop)]:
+                cells.append((pos, other) if axis == 0 else (other, pos))
+
+        if axis == 1:
+            cells.sort()
+
+        return cells
+
+    @_sorted_method
+    def get_next(self, row, col, axis, reverse=False):
+        """Returns position of next cell along axis or None
+
+        Parameters
+        ----------
+        row, col: Integer
+        \tCell from which the search starts, the cell itself is excluded
+        axis: Integer in [0, 1]
+        \tThe search goes along the column for 0 and along the row for 1
+        reverse: Bool, defaults to False
+        \tSearches towards lower positions if True
+
+        """
+
+        pos, other = (row, col) if axis == 0 else (col, row)
+
+        try:
+            positions = self.maps[1 - axis][other]
+
+        except KeyError:
+            return
+
+        if reverse:
+            i = bisect_left(positions, pos) - 1
+            if i >= 0:
+                return positions[i]
+
+        else:
+            i = bisect_right(positions, pos)
+            if i < len(positions):
+                return positions[i]
+
+    @_sorted_method
+    def get_max(self, axis):
+        """Returns largest row (axis 0) or col (axis 1) with cells or None"""
+
+        positions = self.positions[axis]
+
+        if positions:
+            return positions[-1]
+
+    @_sorted_method
+    def get_sorted_cells(self, start=None, reverse=False):
+        """Yields (row, col) of cells sorted by col and row
+
+        Parameters
+        ----------
+        start: 2-tuple of Integer, defaults to None
+        \tCells before start (row, col) in sort order are left out
+        reverse: Bool, defaults to False
+        \tReverses the sort order
+
+        """
+
+        cols = self.positions[1]
+        col_map = self.maps[1]
+
+        if start is None:
+            start_row, start_col = None, None
+            sorted_cols = cols[::-1] if reverse else cols
+
+        else:
+            start_row, start_col = start
+            if reverse:
+                sorted_cols = cols[:bisect_right(cols, start_col)][::-1]
+            else:
+                sorted_cols = cols[bisect_left(cols, start_col):]
+
+        for col in sorted_cols:
+            rows = col_map[col]
+
+            if col == start_col:
+                if reverse:
+                    rows = rows[:bisect_right(rows, start_row)]
+                else:
+                    rows = rows[bisect_left(rows, start_row):]
+
+            for row in reversed(rows) if reverse else rows[:]:
+                yield row, col
+
+    @_sorted_method
+    def shift(self, axis, point, amount):
+        """Adds amount to the positions >= point on axis
+
+        For negative amounts, there must be no cells with positions from
+        point + amount to point.
+
+        """
+
+        positions = self.positions[axis]
+        axis_map = self.maps[axis]
+        other_map = self.maps[1 - axis]
+
+        first = bisect_left(positions, point)
+        moved = positions[first:]
+
+        if not moved:
+            return
+
+        moved_others = [axis_map.pop(pos) for pos in moved]
+
+        touched = set()
+
+        for pos, others in zip(moved, moved_others):
+            axis_map[pos + amount] = others
+            touched.update(others)
+
+        # Moved positions are at the end of the sorted lists
+        for other in touched:
+            other_positions = other_map[other]
+            i = bisect_left(other_positions, point)
+            other_positions[i:] = [pos + amount
+                                   for pos in other_positions[i:]]
+
+        positions[first:] = [pos + amount for pos in moved]
+
+# End of class TableKeyIndex
+
+
+class KeyIndex(object):
+    """Sorted index of the keys of the non-empty cells of a grid
+
+    Keys are (row, col, table) tuples.
+
+    """
+
+    def __init__(self, keys=()):
+        # Maps table to TableKeyIndex
+        self.tables = {}
+
+        self.update(keys)
+
+    def update(self, keys):
+        """Adds keys, the keys must not be present"""
+
+        table_cells = {}
+
+        for row, col, tab in keys:
+            try:
+                table_cells[tab].append((row, col))
+            except KeyError:
+                table_cells[tab] = [(row, col)]
+
+        for tab, cells in table_cells.iteritems():
+            try:
+                table_index = self.tables[tab]
+
+            except KeyError:
+                table_index = self.tables[tab] = TableKeyIndex()
+
+            table_index.update(cells)
+
+    def add(self, key):
+        """Adds key, the key must not be present"""
+
+        row, col, tab = key
+
+        try:
+            table_index = self.tables[tab]
+
+        except KeyError:
+            table_index = self.tables[tab] = TableKeyIndex()
+
+        table_index.add(row, col)
+
+    def remove(self, key):
+        """Removes key, the key must be present"""
+
+        row, col, tab = key
+
+        table_index = self.tables[tab]
+        table_index.remove(row, col)
+
+        if not table_index.maps[0]:
+            del self.tables[tab]
+
+    def clear(self):
+        """Removes all keys"""
+
+        self.tables.clear()
+
+    def get_keys(self, axis, start, stop=None):
+        """Returns list of keys with start <= key[axis] < stop
+
+        Parameters
+        ----------
+        axis: Integer in [0, 1, 2]
+        \tAxis of the range, i.e. 0 == row, 1 == col, 2 == table
+        start: Integer
+        \tFirst position of the range
+        stop: Integer, defaults to None
+        \tPosition after the range, None means no upper limit
+
+        """
+
+        keys = []
+
+        for tab, table_index in self.tables.iteritems():
+            if axis < 2:
+                cells = table_index.get_cells(axis, start, stop)
+
+            elif start <= tab and (stop is None or tab < stop):
+                cells = table_index
+
+            else:
+                continue
+
+            keys.extend((row, col, tab) for row, col in cells)
+
+        return keys
+
+    def get_block(self, top, left, bottom, right, tab):
+        """Returns list of keys in block sorted by row and col
+
+        Parameters
+        ----------
+        top, left, bottom, right: Integer
+        \tInclusive boundaries of the block
+        tab: Integer
+        \tTable of the block
+
+        """
+
+        try:
+            table_index = self.tables[tab]
+
+        except KeyError:
+            return []
+
+        return [(row, col, tab)
+                for row, col in table_index.get_block(top, left, bottom, right)]
+
+    def get_next(self, key, axis, reverse=False):
+        """Returns key of next non-empty cell along axis or None
+
+        Parameters
+        ----------
+        key: 3-tuple of Integer
+        \tKey of the cell from which the search starts, it is excluded
+        axis: Integer in [0, 1]
+        \tThe search goes down the column for 0 and right in the row for 1
+        reverse: Bool, defaults to False
+        \tSearches up or left if True
+
+        """
+
+        row, col, tab = key
+
+        try:
+            table_index = self.tables[tab]
+
+        except KeyError:
+            return
+
+        pos = table_index.get_next(row, col, axis, reverse)
+
+        if pos is not None:
+            return (pos, col, tab) if axis == 0 else (row, pos, tab)
+
+    def get_max(self, axis, tab=None):
+        """Returns largest position with non-empty cells on axis or None
+
+        Parameters
+        ----------
+        axis: Integer in [0, 1, 2]
+        \tAxis, i.e. 0 == row, 1 == col, 2 == table
+        tab: Integer, defaults to None
+        \tTable for rows and cols, None means all tables
+
+        """
+
+        if axis == 2:
+            return max(self.tables) if self.tables else None
+
+        if tab is None:
+            table_indices = self.tables.values()
+
+        elif tab in self.tables:
+            table_indices = [self.tables[tab]]
+
+        else:
+            return
+
+        maxima = [table_index.get_max(axis) for table_index in table_indices]
+
+        return max(maxima) if maxima else None
+
+    def get_sorted_keys(self, startkey, reverse=False):
+        """Yields all keys sorted by table, col and row starting at startkey
+
+        Keys before startkey are yielded at the end, i.e. the iteration
+        wraps around. This is the search order of find.
+
+        Parameters
+        ----------
+        startkey: 3-tuple of Integer
+        \tFirst key to be yielded if present
+        reverse: Bool, defaults to False
+        \tSort direction reversed if True
+
+        """
+
+        start_row, start_col, start_tab = startkey
+
+        tables = sorted(self.tables, reverse=reverse)
+
+        is_before = (lambda tab: tab > start_tab) if reverse else \
+                    (lambda tab: tab < start_tab)
+
+        # Keys from startkey to the end
+
+        for tab in tables:
+            if is_before(tab):
+                continue
+
+            start = (start_row, start_col) if tab == start_tab else None
+
+            for row, col in self.tables[tab].get_sorted_cells(start, reverse):
+                yield row, col, tab
+
+        # Keys from the beginning to startkey
+
+        for tab in tables:
+            if not is_before(tab) and tab != start_tab:
+                break
+
+            for row, col in self.tables[tab].get_sorted_cells(None, reverse):
+                if tab == start_tab and \
+                   ((col, row) >= (start_col, start_row) if not reverse else
+                    (col, row) <= (start_col, start_row)):
+                    break
+
+                yield row, col, tab
+
+    def shift(self, axis, point, amount):
+        """Adds amount to the key positions >= point on axis
+
+        For negative amounts, there must be no keys with positions from
+        point + amount to point.
+
+        Parameters
+        ----------
+        axis: Integer in [0, 1, 2]
+        \tAxis of the shift, i.e. 0 == row, 1 == col, 2 == table
+        point: Integer
+        \tFirst position that is shifted
+        amount: Integer
+        \tNumber of positions that keys are shifted
+
+        """
+
+        if axis < 2:
+            for table_index in self.tables.itervalues():
+                table_index.shift(axis, point, amount)
+
+        else:
+            self.tables = dict((tab + amount if tab >= point else tab,
+                                table_index)
+                               for tab, table_index in self.tables.iteritems())
+
+# End of class KeyIndex
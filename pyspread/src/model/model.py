@@ -40,23 +40,43 @@ import bz2
 from copy import copy
 import cStringIO
 import datetime
-from itertools import imap, ifilter, product
+from itertools import imap, ifilter, izip, product
 import re
 import sys
-from types import SliceType, IntType
+import threading
+from timeit import default_timer
+from types import CodeType, SliceType, IntType
 
 import numpy
 
-import wx
+try:
+    import wx
+
+except ImportError:
+    # Headless mode, e.g. for batch evaluation
+    wx = None
 
 from src.config import config
+from src.sysvars import get_rgb
 
-from src.lib.typechecks import is_slice_like, is_string_like, is_generator_like
+from src.lib.typechecks import is_slice_like, is_string_like
 from src.lib.selection import Selection
+from src.lib.cache import LRUCache
 
 import src.lib.charts as charts
 
 from unredo import UnRedo
+from dependencies import DependencyGraph
+import parallel
+from profiler import CellProfiler
+from selection_index import SelectionIndex
+from attribute_layers import AttributeLayers
+from key_index import KeyIndex
+from compact_store import CompactKeyValueStore
+from sqlite_store import SQLiteKeyValueStore
+
+# Font weight and style wx.NORMAL, also valid without wx
+FONT_NORMAL = 90
 
 
 class KeyValueStore(dict):
@@ -73,6 +93,13 @@ class KeyValueStore(dict):
 
 # End of class KeyValueStore
 
+# Layer 0 classes that can be selected with the key_value_store config
+KEY_VALUE_STORES = {
+    "dict": KeyValueStore,
+    "compact": CompactKeyValueStore,
+    "sqlite": SQLiteKeyValueStore,
+}
+
 # -----------------------------------------------------------------------------
 
 
@@ -94,14 +121,14 @@ class CellAttributes(list):
     default_cell_attributes = {
         "borderwidth_bottom": 1,
         "borderwidth_right": 1,
-        "bordercolor_bottom": wx.Colour(*config["grid_color"]).GetRGB(),
-        "bordercolor_right": wx.Colour(*config["grid_color"]).GetRGB(),
-        "bgcolor": wx.Colour(*config["background_color"]).GetRGB(),
+        "bordercolor_bottom": get_rgb(config["grid_color"]),
+        "bordercolor_right": get_rgb(config["grid_color"]),
+        "bgcolor": get_rgb(config["background_color"]),
         "textfont": config["font"],
         "pointsize": 10,
-        "fontweight": wx.NORMAL,
-        "fontstyle": wx.NORMAL,
-        "textcolor": wx.Colour(*config["text_color"]).GetRGB(),
+        "fontweight": FONT_NORMAL,
+        "fontstyle": FONT_NORMAL,
+        "textcolor": get_rgb(config["text_color"]),
         "underline": False,
         "strikethrough": False,
         "angle": 0.0,
@@ -113,9 +140,27 @@ class CellAttributes(list):
         "merge_area": None,
     }
 
-    # Cache for __getattr__ maps key to tuple of len and attr_dict
+    def __init__(self, *args):
+        list.__init__(self, *args)
+
+        # SelectionIndex of the entries, rebuilt on lookup if None
+        self._index = None
+
+        # AttributeLayers for block queries, rebuilt on query if None
+        self._layers = None
+
+        # Cache for __getitem__ maps key to attr_dict
+        # Sizes are not limited so that len serves as cheap size function
+        self._attr_cache = LRUCache(
+            max_entries=config["attr_cache_max_entries"], get_size=len)
+
+        # Lookups may come from the evaluation thread
+        self._lock = threading.RLock()
+
+    def __reduce__(self):
+        """Pickles and copies only the entries, caches are rebuilt"""
 
-    _attr_cache = {}
+        return (self.__class__, (list(self),))
 
     def undoable_append(self, value):
         """Appends item to list and provides undo and redo functionality"""
@@ -128,30 +173,364 @@ class CellAttributes(list):
         self.unredo.mark()
 
         self.append(value)
-        self._attr_cache.clear()
+
+    def append(self, value):
+        """Appends entry, adds it to the index and updates the cache"""
+
+        selection, table, __ = value
+
+        with self._lock:
+            list.append(self, value)
+
+            if self._index is not None:
+                self._index.add(len(self) - 1, selection, table)
+
+            if self._layers is not None:
+                self._layers.apply(value)
+
+            self._uncache(selection, table)
+
+    def pop(self, index=-1):
+        """Removes and returns entry, the index is updated for the last one"""
+
+        with self._lock:
+            is_last = index in (-1, len(self) - 1)
+
+            value = list.pop(self, index)
+            selection, table, __ = value
+
+            if self._index is not None:
+                if is_last:
+                    self._index.remove(len(self), selection, table)
+                else:
+                    self._index = None
+
+            self._layers = None
+
+            self._uncache(selection, table)
+
+        return value
+
+    def invalidate_index(self):
+        """Marks selection index and attribute layers as outdated
+
+        Call this method after changing selections or tables of entries.
+
+        """
+
+        self._index = None
+        self._layers = None
+
+    def clear_cache(self):
+        """Removes all cached attribute dicts"""
+
+        with self._lock:
+            self._attr_cache.clear()
+
+    def _uncache(self, selection, table):
+        """Removes cached attribute dicts of the cells in selection"""
+
+        with self._lock:
+            keys = [key for key in self._attr_cache
+                    if key[2] == table and key[:2] in selection]
+
+            for key in keys:
+                self._attr_cache.pop(key)
+
+    def _invalidating(method):
+        """Decorator for list methods after which index and cache are reset"""
+
+        def wrapper(self, *args, **kwargs):
+            with self._lock:
+                self._index = None
+                self._layers = None
+                self._attr_cache.clear()
+                return method(self, *args, **kwargs)
+
+        wrapper.__name__ = method.__name__
+        wrapper.__doc__ = method.__doc__
+
+        return wrapper
+
+    extend = _invalidating(list.extend)
+    insert = _invalidating(list.insert)
+    remove = _invalidating(list.remove)
+    reverse = _invalidating(list.reverse)
+    sort = _invalidating(list.sort)
+    __iadd__ = _invalidating(list.__iadd__)
+    __setitem__ = _invalidating(list.__setitem__)
+    __delitem__ = _invalidating(list.__delitem__)
+    __setslice__ = _invalidating(list.__setslice__)
+    __delslice__ = _invalidating(list.__delslice__)
+
+    del _invalidating
+
+    def _set_entries(self, entries):
+        """Replaces all entries, used for undo and redo of compact"""
+
+        self[:] = entries
+
+    def _get_selection_point(self, selection):
+        """Returns a (row, col) tuple inside selection or None if empty"""
+
+        if selection.block_tl:
+            return selection.block_tl[0]
+
+        elif selection.cells:
+            return tuple(selection.cells[0])
+
+        elif selection.rows:
+            return selection.rows[0], 0
+
+        elif selection.cols:
+            return 0, selection.cols[0]
+
+    def _get_unshadowed_entries(self):
+        """Returns list of entries without attributes that are overridden
+
+        An attribute of an entry is overridden if a later entry of the
+        same table sets it for the whole selection. Entries without
+        remaining attributes are left out.
+
+        """
+
+        if self._index is None:
+            self._index = SelectionIndex(self)
+
+        entries = []
+
+        for i, (selection, table, attr_dict) in enumerate(self):
+            point = self._get_selection_point(selection)
+            if point is None:
+                continue
+
+            keys = set(attr_dict)
+
+            for j in self._index.get_candidates(point[0], point[1], table):
+                if j <= i or not keys:
+                    continue
+
+                later_selection, __, later_dict = list.__getitem__(self, j)
+
+                if keys.intersection(later_dict) and \
+                   later_selection.covers(selection):
+                    keys.difference_update(later_dict)
+
+            if len(keys) == len(attr_dict):
+                entries.append((selection, table, attr_dict))
+
+            elif keys:
+                attr_dict = dict((key, attr_dict[key]) for key in keys)
+                entries.append((selection, table, attr_dict))
+
+        return entries
+
+    def _get_merged_entries(self, entries):
+        """Returns list of entries in which identical dicts are united
+
+        An entry is united with an earlier one of the same table and with
+        an identical attribute dict if no entry in between sets one of the
+        attributes.
+
+        """
+
+        merged = []
+
+        # Maps (table, dict items) to position in merged of mergeable entries
+        mergeable = {}
+
+        # Maps (table, attribute name) to the keys of mergeable that set it
+        attr_merge_keys = {}
+
+        for selection, table, attr_dict in entries:
+            try:
+                merge_key = (table, frozenset((key, type(value), value)
+                                              for key, value
+                                              in attr_dict.iteritems()))
+
+            except TypeError:
+                # Values that are not hashable are not merged
+                merge_key = None
+
+            if merge_key in mergeable:
+                pos = mergeable[merge_key]
+                merged_selection, __, __ = merged[pos]
+                merged[pos] = (merged_selection.union(selection), table,
+                               attr_dict)
+                continue
+
+            # Entries with common attributes must not be moved behind this
+            for key in attr_dict:
+                for other_merge_key in attr_merge_keys.pop((table, key), []):
+                    mergeable.pop(other_merge_key, None)
+
+            if merge_key is not None:
+                mergeable[merge_key] = len(merged)
+                for key in attr_dict:
+                    attr_merge_keys.setdefault((table, key),
+                                               []).append(merge_key)
+
+            merged.append((selection, table, attr_dict))
+
+        return merged
+
+    def compact(self):
+        """Removes overridden entries and unites entries with equal dicts
+
+        The attributes of all cells remain unchanged. The compaction is
+        undone together with the last undo step so that the undo
+        operations of earlier appends stay valid.
+
+        Returns the number of removed entries.
+
+        """
+
+        entries = self._get_merged_entries(self._get_unshadowed_entries())
+
+        no_removed = len(self) - len(entries)
+
+        if no_removed:
+            undo_operation = (self._set_entries, [list(self)])
+            redo_operation = (self._set_entries, [entries])
+
+            self.unredo.append_to_last(undo_operation, redo_operation)
+
+            self._set_entries(entries)
+
+        return no_removed
+
+    def is_cached(self, key):
+        """Returns True if the attribute dict of key is cached"""
+
+        return key in self._attr_cache
+
+    def get_block(self, top, left, bottom, right, table):
+        """Returns dict that maps keys of all cells in a block to attr dicts
+
+        The attributes are taken from run-length encoded layers in one
+        query. Cells with identical attributes share one dict.
+
+        Parameters
+        ----------
+        top, left, bottom, right: Integer
+        \tInclusive boundaries of the block
+        table: Integer
+        \tTable of the block
+
+        """
+
+        top = max(0, top)
+        left = max(0, left)
+
+        with self._lock:
+            if self._layers is None:
+                self._layers = AttributeLayers(self)
+
+            block = self._layers.get_block(top, left, bottom, right, table)
+
+        default_cell_attributes = self.default_cell_attributes
+        shared_dicts = {}
+
+        result = {}
+
+        for row in xrange(top, bottom + 1):
+            for col in xrange(left, right + 1):
+                attrs = block.get((row, col), {})
+
+                try:
+                    signature = frozenset((attr, type(value), value)
+                                          for attr, value
+                                          in attrs.iteritems())
+                    attr_dict = shared_dicts[signature]
+
+                except KeyError:
+                    attr_dict = shared_dicts[signature] = \
+                        copy(default_cell_attributes)
+                    attr_dict.update(attrs)
+
+                except TypeError:
+                    # Values that are not hashable
+                    attr_dict = copy(default_cell_attributes)
+                    attr_dict.update(attrs)
+
+                result[row, col, table] = attr_dict
+
+        return result
+
+    def prefetch(self, top, left, bottom, right, table, row=None):
+        """Caches attribute dicts of all cells in a block
+
+        Blocks that do not fit into the cache would evict their own cells.
+        Such blocks are cut to the rows that fit.
+
+        Parameters
+        ----------
+        top, left, bottom, right, table: Integer
+        \tBlock as for get_block
+        row: Integer, defaults to None
+        \tFirst row of a block that is cut, None means top
+
+        """
+
+        top = max(0, top)
+        left = max(0, left)
+
+        max_entries = self._attr_cache.max_entries
+
+        if max_entries is not None:
+            # Eviction reduces the cache to 90 % of its limit
+            max_rows = (max_entries - max_entries // 10) // \
+                (right - left + 1)
+
+            if max_rows < 1:
+                return
+
+            if bottom - top + 1 > max_rows:
+                if row is not None:
+                    top = max(top, row)
+                bottom = min(bottom, top + max_rows - 1)
+
+        block = self.get_block(top, left, bottom, right, table)
+
+        with self._lock:
+            attr_cache = self._attr_cache
+
+            for key, attr_dict in block.iteritems():
+                if key not in attr_cache:
+                    attr_cache[key] = attr_dict
 
     def __getitem__(self, key):
         """Returns attribute dict for a single key"""
 
         assert not any(type(key_ele) is SliceType for key_ele in key)
 
-        if key in self._attr_cache:
-            cache_len, cache_dict = self._attr_cache[key]
+        with self._lock:
+            try:
+                return self._attr_cache[key]
+
+            except KeyError:
+                pass
 
-            # Use cache result only if no new attrs have been defined
-            if cache_len == len(self):
-                return cache_dict
+            result_dict = self._get_attr_dict(key)
+            self._attr_cache[key] = result_dict
+
+        return result_dict
+
+    def _get_attr_dict(self, key):
+        """Returns attribute dict for a single key from the entries"""
 
         row, col, tab = key
 
         result_dict = copy(self.default_cell_attributes)
 
-        for selection, table, attr_dict in self:
-            if tab == table and (row, col) in selection:
-                result_dict.update(attr_dict)
+        if self._index is None:
+            self._index = SelectionIndex(self)
 
-        # Upddate cache with current length and dict
-        self._attr_cache[key] = (len(self), result_dict)
+        # Candidates are sorted so that later entries override earlier ones
+        for i in self._index.get_candidates(row, col, tab):
+            selection, __, attr_dict = list.__getitem__(self, i)
+            if (row, col) in selection:
+                result_dict.update(attr_dict)
 
         return result_dict
 
@@ -190,6 +569,11 @@ class ParserMixin(object):
     def parse_to_attribute(self, line):
         """Parses line and appends cell attribute"""
 
+        self.cell_attributes.append(self.get_attribute(line))
+
+    def get_attribute(self, line):
+        """Parses line and returns cell attribute (selection, tab, attrs)"""
+
         splitline = self._split_tidy(line)
 
         selection_data = map(ast.literal_eval, splitline[:5])
@@ -207,7 +591,7 @@ class ParserMixin(object):
                 # Even cols are values
                 attrs[key] = ast.literal_eval(ele)
 
-        self.cell_attributes.append((selection, tab, attrs))
+        return selection, tab, attrs
 
     def parse_to_height(self, line):
         """Parses line and inserts row hight"""
@@ -349,26 +733,47 @@ class StringGeneratorMixin(object):
 # End of class StringGeneratorMixin
 
 
-class DictGrid(KeyValueStore, ParserMixin, StringGeneratorMixin):
+class DictGrid(ParserMixin, StringGeneratorMixin):
     """The core data class with all information that is stored in a pys file.
 
-    Besides grid code access via standard dict operations, it provides
-    the following attributes:
+    Grid code is accessed via standard dict operations. The code is stored
+    in a layer 0 key value store. Besides, DictGrid provides the following
+    attributes:
 
     * cell_attributes: Stores cell formatting attributes
     * macros:          String of all macros
 
+    The keys of the non-empty cells are kept sorted in a KeyIndex so that
+    ranges of rows, cols or tables can be moved without scanning the grid.
+    Stores that provide get_key_index, e.g. SQLiteKeyValueStore, answer
+    these range queries themselves.
+
+    If changed_keys is a set, the keys of all changed cells are added to
+    it, e.g. for journal saves. clear sets it to None because removing all
+    cells is not tracked.
+
+    get_snapshot returns a GridSnapshot, to which the old code of cells is
+    passed before they change.
+
     This class represents layer 1 of the model.
 
     Parameters
     ----------
     shape: n-tuple of integer
     \tShape of the grid
+    key_value_store: Object with dict interface, defaults to None
+    \tEmpty layer 0 store, None creates a store of the class that is
+    \tselected in the config, see KEY_VALUE_STORES
 
     """
 
-    def __init__(self, shape):
-        KeyValueStore.__init__(self)
+    def __init__(self, shape, key_value_store=None):
+        if key_value_store is None:
+            key_value_store = KEY_VALUE_STORES[config["key_value_store"]]()
+
+        self.key_value_store = key_value_store
+
+        self.key_index = self._get_key_index()
 
         self.shape = shape
 
@@ -379,6 +784,36 @@ class DictGrid(KeyValueStore, ParserMixin, StringGeneratorMixin):
         self.row_heights = {}  # Keys have the format (row, table)
         self.col_widths = {}  # Keys have the format (col, table)
 
+        # Keys of changed cells, None if changes are not tracked
+        self.changed_keys = None
+
+        # GridSnapshots that have not been released
+        self.snapshots = []
+
+    def _get_key_index(self):
+        """Returns key index of the cells in the layer 0 store"""
+
+        get_key_index = getattr(self.key_value_store, "get_key_index", None)
+
+        if get_key_index is None:
+            return KeyIndex(self.key_value_store.iterkeys())
+
+        return get_key_index()
+
+    def _preserve(self, keys):
+        """Passes the code of the cells keys to all snapshots"""
+
+        key_value_store = self.key_value_store
+
+        for snapshot in self.snapshots:
+            for key in keys:
+                snapshot.preserve(key, key_value_store.get(key))
+
+    def get_snapshot(self):
+        """Returns GridSnapshot of the current content"""
+
+        return GridSnapshot(self)
+
     def __getitem__(self, key):
 
         shape = self.shape
@@ -388,180 +823,579 @@ class DictGrid(KeyValueStore, ParserMixin, StringGeneratorMixin):
                 msg = "Grid index {} outside grid shape {}.".format(key, shape)
                 raise IndexError(msg)
 
-        return KeyValueStore.__getitem__(self, key)
-
-# End of class DictGrid
+        return self.key_value_store[key]
 
-# -----------------------------------------------------------------------------
+    def __setitem__(self, key, value):
+        key_value_store = self.key_value_store
 
+        if self.snapshots:
+            self._preserve([key])
 
-class DataArray(object):
-    """DataArray provides enhanced grid read/write access.
+        if key not in key_value_store:
+            self.key_index.add(key)
 
-    Enhancements comprise:
-     * Slicing
-     * Multi-dimensional operations such as insertion and deletion along 1 axis
-     * Undo/redo operations
+        key_value_store[key] = value
 
-    This class represents layer 2 of the model.
+        if self.changed_keys is not None:
+            self.changed_keys.add(key)
 
-    Parameters
-    ----------
-    shape: n-tuple of integer
-    \tShape of the grid
+    def __delitem__(self, key):
+        if self.snapshots:
+            self._preserve([key])
 
-    """
+        del self.key_value_store[key]
 
-    def __init__(self, shape):
-        self.dict_grid = DictGrid(shape)
+        self.key_index.remove(key)
 
-        # Undo and redo management
-        self.unredo = UnRedo()
-        self.dict_grid.cell_attributes.unredo = self.unredo
+        if self.changed_keys is not None:
+            self.changed_keys.add(key)
 
-        # Safe mode
-        self.safe_mode = False
+    def __contains__(self, key):
+        return key in self.key_value_store
 
-    # Row and column attributes mask
-    # Keys have the format (row, table)
+    def __iter__(self):
+        return iter(self.key_value_store)
 
-    @property
-    def row_heights(self):
-        """Returns row_heights dict"""
+    def __len__(self):
+        return len(self.key_value_store)
 
-        return self.dict_grid.row_heights
+    def __repr__(self):
+        return repr(self.key_value_store)
 
-    @property
-    def col_widths(self):
-        """Returns col_widths dict"""
+    def get(self, key, default=None):
+        """Returns code of key or default, see dict.get"""
 
-        return self.dict_grid.col_widths
+        return self.key_value_store.get(key, default)
 
-    # Cell attributes mask
-    @property
-    def cell_attributes(self):
-        """Returns cell_attributes list"""
+    def pop(self, key, *default):
+        """Pops key, see dict.pop"""
 
-        return self.dict_grid.cell_attributes
+        if key in self.key_value_store:
+            if self.snapshots:
+                self._preserve([key])
 
-    def __iter__(self):
-        """Returns iterator over self.dict_grid"""
+            self.key_index.remove(key)
 
-        return iter(self.dict_grid)
+            if self.changed_keys is not None:
+                self.changed_keys.add(key)
 
-    def _get_macros(self):
-        """Returns macros string"""
+        return self.key_value_store.pop(key, *default)
 
-        return self.dict_grid.macros
+    def clear(self):
+        """Removes all cells"""
 
-    def _set_macros(self, macros):
-        """Sets  macros string"""
+        for snapshot in self.snapshots:
+            snapshot.preserve_all()
 
-        self.dict_grid.macros = macros
+        self.key_value_store.clear()
+        self.key_index.clear()
 
-    macros = property(_get_macros, _set_macros)
+        self.changed_keys = None
 
-    def keys(self):
-        """Returns keys in self.dict_grid"""
+    def update(self, *args, **kwargs):
+        """Sets cells, see dict.update"""
 
-        return self.dict_grid.keys()
+        for key, value in dict(*args, **kwargs).iteritems():
+            self[key] = value
 
-    def pop(self, key):
-        """Pops dict_grid with undo and redo support"""
+    def set_cells(self, keys, codes, abort=None, chunk_size=100000):
+        """Sets code of empty cells in bulk, e.g. when loading a file
 
-        # UnRedo support
+        The store is updated in chunks of cells. The key index is updated
+        once with all keys.
 
-        try:
-            undo_operation = (self.__setitem__, [key, self.dict_grid[key]])
-            redo_operation = (self.pop, [key])
+        Parameters
+        ----------
+        keys: List of 3-tuples of Integer
+        \tKeys of cells that are empty
+        codes: Iterable of unicode
+        \tCode of the cells in the order of keys
+        abort: Function, defaults to None
+        \tCalled with the number of set cells after each chunk. If it
+        \treturns True then the remaining cells are not set.
+        chunk_size: Integer, defaults to 100000
+        \tNumber of cells that are set between two abort calls
+
+        Returns False if aborted and True otherwise.
 
-            self.unredo.append(undo_operation, redo_operation)
+        """
 
-            self.unredo.mark()
+        if self.snapshots:
+            self._preserve(keys)
 
-        except KeyError:
-            # If key not present then unredo is not necessary
-            pass
+        update = self.key_value_store.update
+        codes = iter(codes)
 
-        # End UnRedo support
+        no_set = 0
+        is_aborted = False
 
-        return self.dict_grid.pop(key)
+        for start in xrange(0, len(keys), chunk_size):
+            # izip stops at the end of the chunk without consuming codes
+            update(izip(keys[start:start + chunk_size], codes))
+            no_set = min(len(keys), start + chunk_size)
 
-    # Shape mask
+            if abort is not None and abort(no_set):
+                is_aborted = True
+                break
 
-    def _get_shape(self):
-        """Returns dict_grid shape"""
+        self.key_index.update(keys[:no_set])
 
-        return self.dict_grid.shape
+        if self.changed_keys is not None:
+            self.changed_keys.update(keys[:no_set])
 
-    def _set_shape(self, shape):
-        """Deletes all cells beyond new shape and sets dict_grid shape"""
+        return not is_aborted
 
-        # Delete each cell that is beyond new borders
+    def keys(self):
+        """Returns list of the keys of all cells"""
 
-        old_shape = self.shape
+        return self.key_value_store.keys()
 
-        if any(new_axis < old_axis
-               for new_axis, old_axis in zip(shape, old_shape)):
-            for key in self.dict_grid.keys():
-                if any(key_ele >= new_axis
-                       for key_ele, new_axis in zip(key, shape)):
-                    self.pop(key)
+    def iterkeys(self):
+        """Returns iterator over the keys of all cells"""
 
-        # Set dict_grid shape attribute
+        return self.key_value_store.iterkeys()
 
-        self.dict_grid.shape = shape
+    def itervalues(self):
+        """Returns iterator over the code of all cells"""
 
-        # UnRedo support
+        return self.key_value_store.itervalues()
 
-        undo_operation = (setattr, [self.dict_grid, "shape", old_shape])
-        redo_operation = (setattr, [self.dict_grid, "shape", shape])
+    def iteritems(self):
+        """Returns iterator over (key, code) of all cells"""
 
-        self.unredo.append(undo_operation, redo_operation)
+        return self.key_value_store.iteritems()
 
-        self.unredo.mark()
+    def items(self):
+        """Returns list of (key, code) of all cells"""
 
-        # End UnRedo support
+        return self.key_value_store.items()
 
-    shape = property(_get_shape, _set_shape)
+    def values(self):
+        """Returns list of the code of all cells"""
 
-    # Pickle support
+        return self.key_value_store.values()
 
     def __getstate__(self):
-        """Returns dict_grid for pickling
+        """Returns attributes for pickling without key index"""
 
-        Note that all persistent data is contained in the DictGrid class
+        state = self.__dict__.copy()
+        del state["key_index"]
+        state["changed_keys"] = None
+        state["snapshots"] = []
 
-        """
+        return state
 
-        return {"dict_grid": self.dict_grid}
+    def __setstate__(self, state):
+        """Restores attributes after unpickling and rebuilds key index"""
 
-    def __str__(self):
-        return self.dict_grid.__str__()
+        self.changed_keys = None
+        self.snapshots = []
+        self.__dict__.update(state)
+        self.key_index = self._get_key_index()
 
-    # Slice support
+    def get_keys(self, axis, start, stop=None):
+        """Returns list of keys of cells with start <= key[axis] < stop
 
-    def __getitem__(self, key):
-        """Adds slicing access to cell code retrieval
+        Parameters
+        ----------
+        axis: Integer in [0, 1, 2]
+        \tAxis of the range, i.e. 0 == row, 1 == col, 2 == table
+        start: Integer
+        \tFirst position of the range
+        stop: Integer, defaults to None
+        \tPosition after the range, None means no upper limit
 
-        The cells are returned as a generator of generators, of ... of unicode.
+        """
+
+        return self.key_index.get_keys(axis, start, stop)
+
+    def get_block_keys(self, top, left, bottom, right, tab):
+        """Returns list of keys of the cells in block sorted by row and col
 
         Parameters
         ----------
-        key: n-tuple of integer or slice
-        \tKeys of the cell code that is returned
-
-        Note
-        ----
-        Classical Excel type addressing (A$1, ...) may be added here
+        top, left, bottom, right: Integer
+        \tInclusive boundaries of the block
+        tab: Integer
+        \tTable of the block
 
         """
 
-        for key_ele in key:
-            if is_slice_like(key_ele):
-                # We have something slice-like here
+        return self.key_index.get_block(top, left, bottom, right, tab)
 
-                return self.cell_array_generator(key)
+    def get_next_key(self, key, axis, reverse=False):
+        """Returns key of next non-empty cell along axis or None
+
+        Parameters
+        ----------
+        key: 3-tuple of Integer
+        \tKey of the cell from which the search starts, it is excluded
+        axis: Integer in [0, 1]
+        \tThe search goes down the column for 0 and right in the row for 1
+        reverse: Bool, defaults to False
+        \tSearches up or left if True
+
+        """
+
+        return self.key_index.get_next(key, axis, reverse)
+
+    def get_max_position(self, axis, tab=None):
+        """Returns largest row, col or table that contains cells or None
+
+        Parameters
+        ----------
+        axis: Integer in [0, 1, 2]
+        \tAxis, i.e. 0 == row, 1 == col, 2 == table
+        tab: Integer, defaults to None
+        \tTable for rows and cols, None means all tables
+
+        """
+
+        return self.key_index.get_max(axis, tab)
+
+    def get_sorted_keys(self, startkey, reverse=False):
+        """Yields keys sorted by table, col and row starting with startkey
+
+        Keys before startkey are yielded at the end.
+
+        Parameters
+        ----------
+        startkey: 3-tuple of Integer
+        \tFirst key to be yielded if present
+        reverse: Bool, defaults to False
+        \tSort direction reversed if True
+
+        """
+
+        return self.key_index.get_sorted_keys(startkey, reverse)
+
+    def shift_keys(self, point, amount, axis):
+        """Moves the cells with key[axis] >= point by amount along axis
+
+        The cost is proportional to the number of moved cells. For negative
+        amounts, the cells from point + amount to point have to be removed
+        before.
+
+        Parameters
+        ----------
+        point: Integer
+        \tFirst position on axis that is moved
+        amount: Integer
+        \tNumber of rows/cols/tabs that cells are moved
+        axis: Integer in [0, 1, 2]
+        \tAxis along which cells are moved
+
+        """
+
+        key_value_store = self.key_value_store
+
+        keys = self.key_index.get_keys(axis, point)
+
+        if self.snapshots:
+            self._preserve(keys)
+
+        values = [key_value_store.pop(key) for key in keys]
+
+        new_keys = []
+
+        for key, value in izip(keys, values):
+            new_key = list(key)
+            new_key[axis] += amount
+            new_key = tuple(new_key)
+
+            if self.snapshots:
+                self._preserve([new_key])
+
+            key_value_store[new_key] = value
+            new_keys.append(new_key)
+
+        self.key_index.shift(axis, point, amount)
+
+        if self.changed_keys is not None:
+            self.changed_keys.update(keys)
+            self.changed_keys.update(new_keys)
+
+# End of class DictGrid
+
+
+class GridSnapshot(StringGeneratorMixin):
+    """Point-in-time view of a DictGrid, e.g. for saving in a thread
+
+    Cell code is copied on write: DictGrid passes the old code of a cell
+    to preserve before the cell changes. Other cells are read from the
+    grid, so that taking a snapshot copies only the keys. Attributes are
+    kept as saved lines, sizes and macros are copied.
+
+    The snapshot can be read from another thread if the layer 0 store can
+    be read from that thread. Call release when the snapshot is not needed
+    any more.
+
+    Parameters
+    ----------
+    dict_grid: DictGrid
+    \tGrid of which the snapshot is taken
+
+    """
+
+    def __init__(self, dict_grid):
+        self.dict_grid = dict_grid
+
+        self.shape = dict_grid.shape
+
+        self._keys = list(dict_grid.iterkeys())
+
+        # Maps keys of changed cells to their code in the snapshot
+        self._preserved = {}
+
+        # True if the grid has been cleared after taking the snapshot
+        self.is_cleared = False
+
+        self._attribute_lines = list(dict_grid.attributes_to_strings())
+
+        self.row_heights = dict(dict_grid.row_heights)
+        self.col_widths = dict(dict_grid.col_widths)
+
+        self.macros = dict_grid.macros
+
+        dict_grid.snapshots.append(self)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def get(self, key, default=None):
+        """Returns code of key at the time of the snapshot or default"""
+
+        # The grid is read first. If the cell changes in between, its old
+        # code has been preserved before.
+        code = self.dict_grid.get(key)
+
+        code = self._preserved.get(key, code)
+
+        return default if code is None else code
+
+    __getitem__ = get
+
+    def preserve(self, key, code):
+        """Keeps code of key unless code has been preserved for key before"""
+
+        self._preserved.setdefault(key, code)
+
+    def preserve_all(self):
+        """Keeps the code of all cells, called before clearing the grid"""
+
+        dict_grid = self.dict_grid
+
+        for key in self._keys:
+            self.preserve(key, dict_grid.get(key))
+
+        self.is_cleared = True
+
+    def get_changed_keys(self):
+        """Returns set of keys of cells that changed after the snapshot"""
+
+        return set(self._preserved)
+
+    def attributes_to_strings(self):
+        """Yields the attribute lines at the time of the snapshot"""
+
+        return iter(self._attribute_lines)
+
+    def release(self):
+        """Stops passing changed cells to the snapshot"""
+
+        try:
+            self.dict_grid.snapshots.remove(self)
+
+        except ValueError:
+            # Released before
+            pass
+
+# End of class GridSnapshot
+
+# -----------------------------------------------------------------------------
+
+
+class DataArray(object):
+    """DataArray provides enhanced grid read/write access.
+
+    Enhancements comprise:
+     * Slicing
+     * Multi-dimensional operations such as insertion and deletion along 1 axis
+     * Undo/redo operations
+
+    This class represents layer 2 of the model.
+
+    Parameters
+    ----------
+    shape: n-tuple of integer
+    \tShape of the grid
+    key_value_store: Object with dict interface, defaults to None
+    \tEmpty layer 0 store, see DictGrid
+
+    """
+
+    def __init__(self, shape, key_value_store=None):
+        self.dict_grid = DictGrid(shape, key_value_store)
+
+        # Undo and redo management
+        self.unredo = UnRedo()
+        self.dict_grid.cell_attributes.unredo = self.unredo
+
+        # Safe mode
+        self.safe_mode = False
+
+    # Row and column attributes mask
+    # Keys have the format (row, table)
+
+    @property
+    def row_heights(self):
+        """Returns row_heights dict"""
+
+        return self.dict_grid.row_heights
+
+    @property
+    def col_widths(self):
+        """Returns col_widths dict"""
+
+        return self.dict_grid.col_widths
+
+    # Cell attributes mask
+    @property
+    def cell_attributes(self):
+        """Returns cell_attributes list"""
+
+        return self.dict_grid.cell_attributes
+
+    def __iter__(self):
+        """Returns iterator over self.dict_grid"""
+
+        return iter(self.dict_grid)
+
+    def _get_macros(self):
+        """Returns macros string"""
+
+        return self.dict_grid.macros
+
+    def _set_macros(self, macros):
+        """Sets  macros string"""
+
+        self.dict_grid.macros = macros
+
+    macros = property(_get_macros, _set_macros)
+
+    def keys(self):
+        """Returns keys in self.dict_grid"""
+
+        return self.dict_grid.keys()
+
+    def pop(self, key):
+        """Pops dict_grid with undo and redo support"""
+
+        # UnRedo support
+
+        try:
+            undo_operation = (self.__setitem__, [key, self.dict_grid[key]])
+            redo_operation = (self.pop, [key])
+
+            self.unredo.append(undo_operation, redo_operation)
+
+            self.unredo.mark()
+
+        except KeyError:
+            # If key not present then unredo is not necessary
+            pass
+
+        # End UnRedo support
+
+        return self.dict_grid.pop(key)
+
+    # Shape mask
+
+    def _get_shape(self):
+        """Returns dict_grid shape"""
+
+        return self.dict_grid.shape
+
+    def _set_shape(self, shape, mark_unredo=True):
+        """Deletes all cells beyond new shape and sets dict_grid shape"""
+
+        # Delete each cell that is beyond new borders
+
+        dict_grid = self.dict_grid
+        old_shape = self.shape
+
+        diff = {}
+
+        for axis, (new_axis, old_axis) in enumerate(zip(shape, old_shape)):
+            max_position = dict_grid.get_max_position(axis)
+
+            if new_axis < old_axis and max_position is not None and \
+               max_position >= new_axis:
+                for key in dict_grid.get_keys(axis, new_axis):
+                    diff[key] = dict_grid.get(key), None
+
+        if diff:
+            self._apply_cell_diff(diff)
+            self._record_cell_diff(diff, mark_unredo=False)
+
+        # Set dict_grid shape attribute
+
+        self.dict_grid.shape = shape
+
+        # UnRedo support
+
+        undo_operation = (setattr, [self.dict_grid, "shape", old_shape])
+        redo_operation = (setattr, [self.dict_grid, "shape", shape])
+
+        self.unredo.append(undo_operation, redo_operation)
+
+        if mark_unredo:
+            self.unredo.mark()
+
+        # End UnRedo support
+
+    shape = property(_get_shape, _set_shape)
+
+    # Pickle support
+
+    def __getstate__(self):
+        """Returns dict_grid for pickling
+
+        Note that all persistent data is contained in the DictGrid class
+
+        """
+
+        return {"dict_grid": self.dict_grid}
+
+    def __str__(self):
+        return self.dict_grid.__str__()
+
+    # Slice support
+
+    def __getitem__(self, key):
+        """Adds slicing access to cell code retrieval
+
+        The cells are returned as a generator of generators, of ... of unicode.
+
+        Parameters
+        ----------
+        key: n-tuple of integer or slice
+        \tKeys of the cell code that is returned
+
+        Note
+        ----
+        Classical Excel type addressing (A$1, ...) may be added here
+
+        """
+
+        for key_ele in key:
+            if is_slice_like(key_ele):
+                # We have something slice-like here
+
+                return self.cell_array_generator(key)
 
             elif is_string_like(key_ele):
                 # We have something string-like here
@@ -673,19 +1507,110 @@ class DataArray(object):
                 break
 
     def _adjust_shape(self, amount, axis):
-        """Changes shape along axis by amount"""
+        """Changes shape along axis by amount without marking an undo step"""
 
         new_shape = list(self.shape)
         new_shape[axis] += amount
 
-        self.shape = tuple(new_shape)
+        self._set_shape(tuple(new_shape), mark_unredo=False)
 
-    def _set_cell_attributes(self, value):
-        """Setter for cell_atributes"""
+    def _set_cells(self, cells):
+        """Sets code of cells without undo support
 
-        while len(self.cell_attributes):
-            self.cell_attributes.pop()
-        self.cell_attributes.extend(value)
+        Parameters
+        ----------
+        cells: Dict
+        \tMaps keys of cells to their code
+
+        """
+
+        self.dict_grid.update(cells)
+
+    def _pop_cells(self, keys):
+        """Pops cells without undo support and returns dict of their code"""
+
+        dict_grid = self.dict_grid
+
+        return dict((key, dict_grid.pop(key)) for key in keys
+                    if key in dict_grid)
+
+    def _shift_cells(self, point, amount, axis):
+        """Moves cells with key[axis] >= point without undo support"""
+
+        self.dict_grid.shift_keys(point, amount, axis)
+
+    def _apply_cell_diff(self, diff, undo=False):
+        """Sets code of the cells in diff without undo support
+
+        Parameters
+        ----------
+        diff: Dict
+        \tMaps keys of cells to (old code, new code), None means no cell
+        undo: Bool, defaults to False
+        \tThe old code is set if True and the new code otherwise
+
+        """
+
+        dict_grid = self.dict_grid
+        index = 0 if undo else 1
+
+        for key, codes in diff.iteritems():
+            code = codes[index]
+
+            if code is None:
+                dict_grid.pop(key, None)
+            else:
+                dict_grid[key] = code
+
+    def _record_cell_diff(self, diff, mark_unredo):
+        """Appends diff as one undo operation"""
+
+        undo_operation = (self._apply_cell_diff, [diff, True])
+        redo_operation = (self._apply_cell_diff, [diff])
+
+        self.unredo.append(undo_operation, redo_operation)
+
+        if mark_unredo:
+            self.unredo.mark()
+
+    def replace_cells(self, cells, mark_unredo=True):
+        """Sets code of many cells as one undo operation
+
+        The old and the new code of the changed cells are stored as one
+        diff, which is applied in one pass on undo and redo.
+
+        Parameters
+        ----------
+        cells: Dict
+        \tMaps keys of cells to their new code, None or u"" deletes cells
+        mark_unredo: Bool, defaults to True
+        \tMarks the end of the undo step if True
+
+        """
+
+        dict_grid = self.dict_grid
+
+        diff = {}
+
+        for key, code in cells.iteritems():
+            if code == "":
+                code = None
+
+            old_code = dict_grid.get(key)
+
+            if old_code != code:
+                diff[key] = old_code, code
+
+        if diff:
+            self._apply_cell_diff(diff)
+            self._record_cell_diff(diff, mark_unredo)
+
+    def _set_cell_attributes(self, value):
+        """Setter for cell_atributes"""
+
+        while len(self.cell_attributes):
+            self.cell_attributes.pop()
+        self.cell_attributes.extend(value)
 
     def _adjust_cell_attributes(self, insertion_point, no_to_insert, axis):
         """Adjusts cell attributes on insertion/deletion"""
@@ -697,260 +1622,672 @@ class DataArray(object):
             for selection, _, _ in self.cell_attributes:
                 selection.insert(insertion_point, no_to_insert, axis)
 
-            self.cell_attributes._attr_cache.clear()
+            self.cell_attributes.invalidate_index()
+            self.cell_attributes.clear_cache()
+
+            # Adjust row heights and col widths
+            cell_sizes = self.col_widths if axis else self.row_heights
+
+            new_sizes = {}
+
+            for pos, tab in cell_sizes:
+                if pos > insertion_point:
+                    new_sizes[(pos + no_to_insert, tab)] = \
+                        cell_sizes[(pos, tab)]
+                    cell_sizes[(pos, tab)] = None
+                else:
+                    new_sizes[(pos, tab)] = cell_sizes[(pos, tab)]
+
+            cell_sizes.update(new_sizes)
+
+        elif axis == 2:
+            # Adjust tabs
+            new_tabs = []
+            for _, old_tab, _ in self.cell_attributes:
+                new_tabs.append(old_tab + no_to_insert
+                                if old_tab > insertion_point else old_tab)
+
+            for i, new_tab in new_tabs:
+                self.cell_attributes[i][1] = new_tab
+
+            self.cell_attributes.invalidate_index()
+            self.cell_attributes.clear_cache()
+
+        else:
+            raise ValueError("Axis must be in [0, 1, 2]")
+
+        # Make undoable
+
+        undo_operation = (self._adjust_cell_attributes,
+                          [insertion_point, -no_to_insert, axis])
+        redo_operation = (self._adjust_cell_attributes,
+                          [insertion_point, no_to_insert, axis])
+
+        self.unredo.append(undo_operation, redo_operation)
+
+    def insert(self, insertion_point, no_to_insert, axis):
+        """Inserts no_to_insert rows/cols/tabs/... before insertion_point
+
+        Only the cells behind insertion_point are moved. The insertion is
+        recorded as one undo step.
+
+        Parameters
+        ----------
+
+        insertion_point: Integer
+        \tPont on axis, before which insertion takes place
+        no_to_insert: Integer >= 0
+        \tNumber of rows/cols/tabs that shall be inserted
+        axis: Integer
+        \tSpecifies number of dimension, i.e. 0 == row, 1 == col, ...
+
+        """
+
+        if not 0 <= axis <= len(self.shape):
+            raise ValueError("Axis not in grid dimensions")
+
+        if insertion_point > self.shape[axis] or \
+           insertion_point <= -self.shape[axis]:
+            raise IndexError("Insertion point not in grid")
+
+        self._shift_cells(insertion_point, no_to_insert, axis)
+
+        # UnRedo support
+
+        undo_operation = (self._shift_cells,
+                          [insertion_point + no_to_insert, -no_to_insert, axis])
+        redo_operation = (self._shift_cells,
+                          [insertion_point, no_to_insert, axis])
+
+        self.unredo.append(undo_operation, redo_operation)
+
+        # End UnRedo support
+
+        self._adjust_shape(no_to_insert, axis)
+
+        self._adjust_cell_attributes(insertion_point, no_to_insert, axis)
+
+        self.unredo.mark()
+
+    def delete(self, deletion_point, no_to_delete, axis):
+        """Deletes no_to_delete rows/cols/... starting with deletion_point
+
+        Axis specifies number of dimension, i.e. 0 == row, 1 == col, ...
+
+        Only the deleted cells and the cells behind them are touched. The
+        deletion is recorded as one undo step.
+
+        """
+
+        if no_to_delete < 0:
+            raise ValueError("Cannot delete negative number of rows/cols/...")
+
+        if not 0 <= axis <= len(self.shape):
+            raise ValueError("Axis not in grid dimensions")
+
+        if deletion_point > self.shape[axis] or \
+           deletion_point <= -self.shape[axis]:
+            raise IndexError("Deletion point not in grid")
+
+        end_point = deletion_point + no_to_delete
+
+        deleted_cells = self._pop_cells(
+            self.dict_grid.get_keys(axis, deletion_point, end_point))
+
+        self._shift_cells(end_point, -no_to_delete, axis)
+
+        # UnRedo support
+
+        undo_operation = (self._set_cells, [deleted_cells])
+        redo_operation = (self._pop_cells, [deleted_cells.keys()])
+
+        self.unredo.append(undo_operation, redo_operation)
+
+        undo_operation = (self._shift_cells,
+                          [deletion_point, no_to_delete, axis])
+        redo_operation = (self._shift_cells,
+                          [end_point, -no_to_delete, axis])
+
+        self.unredo.append(undo_operation, redo_operation)
+
+        # End UnRedo support
+
+        self._adjust_cell_attributes(deletion_point, -no_to_delete, axis)
+
+        self._adjust_shape(-no_to_delete, axis)
+
+        self.unredo.mark()
+
+    def set_row_height(self, row, tab, height):
+        """Sets row height"""
+
+        try:
+            old_height = self.row_heights[(row, tab)]
+
+        except KeyError:
+            old_height = None
+
+        if height is None:
+            self.row_heights.pop((row, tab))
+
+        else:
+            self.row_heights[(row, tab)] = height
+
+        # Make undoable
+
+        undo_operation = (self.set_row_height, [row, tab, old_height])
+        redo_operation = (self.set_row_height, [row, tab, height])
+
+        self.unredo.append(undo_operation, redo_operation)
+
+    def set_col_width(self, col, tab, width):
+        """Sets column width"""
+
+        try:
+            old_width = self.col_widths[(col, tab)]
+
+        except KeyError:
+            old_width = None
+
+        if width is None:
+            self.col_widths.pop((col, tab))
+
+        else:
+            self.col_widths[(col, tab)] = width
+
+        # Make undoable
+
+        undo_operation = (self.set_col_width, [col, tab, old_width])
+        redo_operation = (self.set_col_width, [col, tab, width])
+
+        self.unredo.append(undo_operation, redo_operation)
+
+    # Element access via call
+
+    __call__ = __getitem__
+
+# End of class DataArray
+
+# -----------------------------------------------------------------------------
+
+
+class CodeArray(DataArray):
+    """CodeArray provides objects when accessing cells via __getitem__
+
+    Cell code can be accessed via function call
+
+    This class represents layer 3 of the model.
+
+    """
+
+    operators = ["+", "-", "*", "**", "/", "//",
+             "%", "<<", ">>", "&", "|", "^", "~",
+             "<", ">", "<=", ">=", "==", "!=", "<>",
+            ]
+
+    # Cache for frozen objects
+    frozen_cache = {}
+
+    # Cache for compiled cell expressions that is shared by all cells
+    code_object_cache = {}
+
+    # Types of cell results that are stored in typed arrays for slice keys
+    _int_types = set([int, long] + numpy.sctypes["int"])
+    array_dtypes = [
+        ("bool", set([bool, numpy.bool_])),
+        ("int", _int_types),
+        ("float", _int_types | set([float] + numpy.sctypes["float"])),
+    ]
+
+    def __init__(self, shape, key_value_store=None):
+        DataArray.__init__(self, shape, key_value_store)
+
+        # Cache for results from __getitem__ calls
+        self.result_cache = LRUCache(
+            max_entries=config["result_cache_max_entries"],
+            max_bytes=config["result_cache_max_bytes"])
+
+        # Cache for compiled code of each cell
+        self.cell_code_cache = {}
+
+        # Cache for code classification and values of literal cells
+        self.literal_cache = {}
+
+        # Cell read dependencies for incremental recalculation
+        self.dependency_graph = DependencyGraph()
+
+        # Keys of the cells that are currently evaluated
+        self._eval_stack = []
+
+        # Lock for evaluation and code changes from different threads
+        self.lock = threading.RLock()
+
+        # Records evaluation costs if not None, see set_profiling
+        self.profiler = None
+
+    def set_profiling(self, profiling=True):
+        """Starts or stops recording evaluation costs of cells
+
+        While profiling, self.profiler is a CellProfiler.
+
+        """
+
+        if not profiling:
+            self.profiler = None
+
+        elif self.profiler is None:
+            self.profiler = CellProfiler()
+
+    def __setitem__(self, key, value, mark_unredo=True):
+        """Sets cell code and invalidates results that depend on the cell"""
+
+        with self.lock:
+            self._set_code(key, value, mark_unredo)
+
+    def _set_code(self, key, value, mark_unredo):
+        """Sets cell code, called by __setitem__ with the lock acquired"""
+
+        if any(type(key_ele) is SliceType for key_ele in key):
+            DataArray.__setitem__(self, key, value, mark_unredo=mark_unredo)
+            self.result_cache.clear()
+            self.literal_cache.clear()
+            return
+
+        # Prevent unchanged cells from being recalculated on cursor movement
+
+        old_code = self(key)
+
+        # Literal results are served from the literal cache
+        literal = self.literal_cache.get(key)
+        is_cached = key in self.result_cache or \
+            literal is not None and literal[1] and literal[0] == old_code
+
+        unchanged = (is_cached and value == old_code) or \
+                    ((value is None or value == "") and
+                     key not in self.result_cache and
+                     key not in self.dependency_graph.dependents)
+
+        DataArray.__setitem__(self, key, value, mark_unredo=mark_unredo)
+
+        self.cell_code_cache.pop(key, None)
+        self._classify_code(key, value)
+
+        if not unchanged:
+            self._invalidate_results(key, old_code, value)
+
+    def __getitem__(self, key):
+        """Returns _eval_cell
+
+        Keys that contain slices return a numpy.array of cell results.
+
+        """
+
+        with self.lock:
+            if any(type(k) is SliceType for k in key):
+                return self._get_result_array(key)
+
+            # Record read access of the currently evaluated cell
+            if self._eval_stack:
+                self.dependency_graph.add(self._eval_stack[-1], key)
+
+            return self._get_result(key)
+
+    def get_cached_result(self, key, default=None):
+        """Returns result of cell key if it is available without evaluation
+
+        This method does not wait for evaluations in other threads.
+
+        Parameters
+        ----------
+        key: 3-tuple of Integer
+        \tKey of the cell
+        default: Object, defaults to None
+        \tReturned if the cell has to be evaluated
+
+        """
+
+        code = self.dict_grid.get(key)
+
+        if code is None:
+            return
+
+        if not self.safe_mode:
+            literal = self.literal_cache.get(key)
+            if literal is not None and literal[0] == code and literal[1]:
+                return literal[2]
+
+        if self.cell_attributes[key]["frozen"]:
+            return self.frozen_cache.get(repr(key), default)
+
+        # get marks the result as recently used without counting a hit
+        return self.result_cache.get(key, default)
+
+    def _get_result(self, key):
+        """Returns result of cell key without recording the read access"""
+
+        # Literal cell handling
+        if not self.safe_mode:
+            is_literal, value = self._get_literal(key)
+            if is_literal:
+                return value
+
+        # Frozen cell handling
+        frozen_res = self.cell_attributes[key]["frozen"]
+        if frozen_res:
+            if repr(key) in self.frozen_cache:
+                return self.frozen_cache[repr(key)]
+            else:
+                # Frozen cache is empty.
+                # Maybe we have a reload without the frozen cache
+                result = self._eval_cell(key, self(key))
+                self.frozen_cache[repr(key)] = result
+                return result
+
+        # Normal cell handling
+
+        try:
+            return self.result_cache[key]
+
+        except KeyError:
+            pass
+
+        if self(key) is not None:
+            result = self._eval_cell(key, self(key))
+            self.result_cache[key] = result
+
+            return result
+
+    def _get_result_array(self, key):
+        """Returns numpy.array of the results of the cells in key
+
+        The array has one dimension for each slice in key. Its dtype is
+        bool, int or float if all results are of the respective type and
+        object otherwise. Empty cells are NaN in numeric arrays so that
+        int results with gaps yield a float array.
+
+        Parameters
+        ----------
+        key: 3-tuple of Integer or slice
+        \tKey that contains at least one slice
 
-            # Adjust row heights and col widths
-            cell_sizes = self.col_widths if axis else self.row_heights
+        """
 
-            new_sizes = {}
+        ranges = []
+        shape = []
 
-            for pos, tab in cell_sizes:
-                if pos > insertion_point:
-                    new_sizes[(pos + no_to_insert, tab)] = \
-                        cell_sizes[(pos, tab)]
-                    cell_sizes[(pos, tab)] = None
-                else:
-                    new_sizes[(pos, tab)] = cell_sizes[(pos, tab)]
+        for key_ele, length in zip(key, self.shape):
+            if type(key_ele) is SliceType:
+                key_range = xrange(*key_ele.indices(length))
+                ranges.append(key_range)
+                shape.append(len(key_range))
+            else:
+                ranges.append((key_ele,))
 
-            cell_sizes.update(new_sizes)
+        keys = list(product(*ranges))
 
-        elif axis == 2:
-            # Adjust tabs
-            new_tabs = []
-            for _, old_tab, _ in self.cell_attributes:
-                new_tabs.append(old_tab + no_to_insert
-                                if old_tab > insertion_point else old_tab)
+        # Record read access of the currently evaluated cell
 
-            for i, new_tab in new_tabs:
-                self.cell_attributes[i][1] = new_tab
+        if self._eval_stack:
+            dependent = self._eval_stack[-1]
+            add_dependency = self.dependency_graph.add
+            for cell_key in keys:
+                add_dependency(dependent, cell_key)
 
-            self.cell_attributes._attr_cache.clear()
+        # Results are taken from the result cache where possible
 
-        else:
-            raise ValueError("Axis must be in [0, 1, 2]")
+        code_get = self.dict_grid.get
+        result_cache = self.result_cache
+        get_result = self._get_result
 
-        # Make undoable
+        results = []
+        append = results.append
 
-        undo_operation = (self._adjust_cell_attributes,
-                          [insertion_point, -no_to_insert, axis])
-        redo_operation = (self._adjust_cell_attributes,
-                          [insertion_point, no_to_insert, axis])
+        for cell_key in keys:
+            if code_get(cell_key) is None:
+                append(None)
+            else:
+                try:
+                    append(result_cache[cell_key])
+                except KeyError:
+                    append(get_result(cell_key))
 
-        self.unredo.append(undo_operation, redo_operation)
+        return self._get_typed_array(results, shape)
 
-    def insert(self, insertion_point, no_to_insert, axis):
-        """Inserts no_to_insert rows/cols/tabs/... before insertion_point
+    def _get_typed_array(self, values, shape):
+        """Returns numpy.array with the narrowest dtype that holds values
+
+        Each value becomes one array element, even if it is a sequence.
+        None values become NaN if all other values are numbers.
 
         Parameters
         ----------
-
-        insertion_point: Integer
-        \tPont on axis, before which insertion takes place
-        no_to_insert: Integer >= 0
-        \tNumber of rows/cols/tabs that shall be inserted
-        axis: Integer
-        \tSpecifies number of dimension, i.e. 0 == row, 1 == col, ...
+        values: List
+        \tArray values in C order
+        shape: List of Integer
+        \tShape of the array
 
         """
 
-        if not 0 <= axis <= len(self.shape):
-            raise ValueError("Axis not in grid dimensions")
+        value_types = set(imap(type, values))
+        array_dtypes = self.array_dtypes
 
-        if insertion_point > self.shape[axis] or \
-           insertion_point <= -self.shape[axis]:
-            raise IndexError("Insertion point not in grid")
+        if type(None) in value_types:
+            # numpy converts None to NaN in float arrays
+            value_types.remove(type(None))
+            array_dtypes = [(dtype, dtype_types)
+                            for dtype, dtype_types in array_dtypes
+                            if dtype == "float"]
 
-        new_keys = {}
+        if value_types:
+            for dtype, dtype_types in array_dtypes:
+                if value_types <= dtype_types:
+                    try:
+                        return numpy.array(values, dtype=dtype).reshape(shape)
 
-        for key in copy(self.dict_grid):
-            if key[axis] >= insertion_point:
-                new_key = list(key)
-                new_key[axis] += no_to_insert
+                    except (OverflowError, TypeError, ValueError):
+                        # Python long integers may not fit into int
+                        break
 
-                new_keys[tuple(new_key)] = self.pop(key)
+        array = numpy.empty(len(values), dtype="O")
+        array[:] = values
 
-        self._adjust_shape(no_to_insert, axis)
+        return array.reshape(shape)
 
-        for key in new_keys:
-            self[key] = new_keys[key]
+    def get_lazy(self):
+        """Returns CellArrayView of the grid that evaluates cells on access
 
-        self._adjust_cell_attributes(insertion_point, no_to_insert, axis)
+        S.lazy[0:1000, 2, 0] returns a view instead of an array.
 
-    def delete(self, deletion_point, no_to_delete, axis):
-        """Deletes no_to_delete rows/cols/... starting with deletion_point
+        """
 
-        Axis specifies number of dimension, i.e. 0 == row, 1 == col, ...
+        return CellArrayView(self)
 
-        """
+    lazy = property(get_lazy)
 
-        if no_to_delete < 0:
-            raise ValueError("Cannot delete negative number of rows/cols/...")
+    def pop(self, key):
+        """Pops dict_grid and invalidates results that depend on key"""
 
-        if not 0 <= axis <= len(self.shape):
-            raise ValueError("Axis not in grid dimensions")
+        with self.lock:
+            code = self(key)
 
-        if deletion_point > self.shape[axis] or \
-           deletion_point <= -self.shape[axis]:
-            raise IndexError("Deletion point not in grid")
+            result = DataArray.pop(self, key)
 
-        # Store all keys that are moved here because dict iteration is unsorted
-        new_key_values = {}
+            self.cell_code_cache.pop(key, None)
+            self.literal_cache.pop(key, None)
+            self._invalidate_results(key, code)
 
-        # Note that the loop goes over a list that copies all dict keys
-        for key in self.dict_grid.keys():
-            if deletion_point <= key[axis] < deletion_point + no_to_delete:
-                self.pop(key)
+            return result
 
-            elif key[axis] >= deletion_point + no_to_delete:
-                new_key = list(key)
-                new_key[axis] -= no_to_delete
+    def _clear_cell_caches(self):
+        """Clears all caches and dependencies that refer to cell keys"""
 
-                new_key_values[tuple(new_key)] = self.pop(key)
+        self.result_cache.clear()
+        self.cell_code_cache.clear()
+        self.literal_cache.clear()
+        self.frozen_cache.clear()
+        self.dependency_graph.clear()
 
-        self._adjust_cell_attributes(deletion_point, -no_to_delete, axis)
+    def _set_cells(self, cells):
+        """Sets code of cells without undo support and clears caches"""
 
-        self._adjust_shape(-no_to_delete, axis)
+        with self.lock:
+            DataArray._set_cells(self, cells)
+            self._clear_cell_caches()
 
-        # Now re-insert moved keys
+    def _pop_cells(self, keys):
+        """Pops cells without undo support and clears caches"""
 
-        for key in new_key_values:
-            self[key] = new_key_values[key]
+        with self.lock:
+            cells = DataArray._pop_cells(self, keys)
+            self._clear_cell_caches()
 
-    def set_row_height(self, row, tab, height):
-        """Sets row height"""
+            return cells
 
-        try:
-            old_height = self.row_heights[(row, tab)]
+    def _shift_cells(self, point, amount, axis):
+        """Moves cells without undo support and clears caches"""
 
-        except KeyError:
-            old_height = None
+        with self.lock:
+            DataArray._shift_cells(self, point, amount, axis)
+            self._clear_cell_caches()
 
-        if height is None:
-            self.row_heights.pop((row, tab))
+    def _apply_cell_diff(self, diff, undo=False):
+        """Sets code of the cells in diff and invalidates results once"""
 
-        else:
-            self.row_heights[(row, tab)] = height
+        with self.lock:
+            DataArray._apply_cell_diff(self, diff, undo)
 
-        # Make undoable
+            index = 0 if undo else 1
 
-        undo_operation = (self.set_row_height, [row, tab, old_height])
-        redo_operation = (self.set_row_height, [row, tab, height])
+            for key, codes in diff.iteritems():
+                self.cell_code_cache.pop(key, None)
+                self._classify_code(key, codes[index])
 
-        self.unredo.append(undo_operation, redo_operation)
+            self._invalidate_cell_diff(diff)
 
-    def set_col_width(self, col, tab, width):
-        """Sets column width"""
+    def _classify_code(self, key, code):
+        """Classifies code of cell key and returns literal_cache entry
 
-        try:
-            old_width = self.col_widths[(col, tab)]
+        Literal code is decoded once with ast.literal_eval.
+        The entry is a tuple (code, is_literal, value).
 
-        except KeyError:
-            old_width = None
+        Parameters
+        ----------
+        key: 3-tuple of Integer
+        \tKey of the cell
+        code: String or None
+        \tCode of the cell
 
-        if width is None:
-            self.col_widths.pop((col, tab))
+        """
 
-        else:
-            self.col_widths[(col, tab)] = width
+        if not is_string_like(code) or not code.strip():
+            self.literal_cache.pop(key, None)
+            return code, False, None
 
-        # Make undoable
+        try:
+            # literal_eval ignores leading whitespace as eval does
+            entry = code, True, ast.literal_eval(code.lstrip(" \t"))
 
-        undo_operation = (self.set_col_width, [col, tab, old_width])
-        redo_operation = (self.set_col_width, [col, tab, width])
+        except Exception:
+            entry = code, False, None
 
-        self.unredo.append(undo_operation, redo_operation)
+        self.literal_cache[key] = entry
 
-    # Element access via call
+        return entry
 
-    __call__ = __getitem__
+    def _get_literal(self, key):
+        """Returns tuple (is_literal, value) for cell key
 
-# End of class DataArray
+        Code that has been changed without __setitem__, e.g. when loading
+        a file, is classified on first access.
 
-# -----------------------------------------------------------------------------
+        """
 
+        code = self.dict_grid.get(key)
 
-class CodeArray(DataArray):
-    """CodeArray provides objects when accessing cells via __getitem__
+        try:
+            cached_code, is_literal, value = self.literal_cache[key]
+            if cached_code is code or cached_code == code:
+                return is_literal, value
 
-    Cell code can be accessed via function call
+        except KeyError:
+            pass
 
-    This class represents layer 3 of the model.
+        __, is_literal, value = self._classify_code(key, code)
 
-    """
+        return is_literal, value
 
-    operators = ["+", "-", "*", "**", "/", "//",
-             "%", "<<", ">>", "&", "|", "^", "~",
-             "<", ">", "<=", ">=", "==", "!=", "<>",
-            ]
+    def recalculate(self, keys=None, processes=None):
+        """Recalculates cells in a pool of worker processes
 
-    # Cache for results from __getitem__ calls
-    result_cache = {}
+        Cells that do not reference each other are evaluated in parallel.
+        Cells with results that cannot be pickled are evaluated serially.
+        If there is a wx application then all cells are evaluated serially.
 
-    # Cache for frozen objects
-    frozen_cache = {}
+        Parameters
+        ----------
+        keys: Iterable of 3-tuples of Integer, defaults to None
+        \tKeys of cells that are recalculated together with their dependents.
+        \tIf None then all cells are recalculated.
+        processes: Integer, defaults to None
+        \tNumber of worker processes, None means number of CPUs
 
-    def __setitem__(self, key, value, mark_unredo=True):
-        """Sets cell code and resets result cache"""
+        """
 
-        # Prevent unchanged cells from being recalculated on cursor movement
+        with self.lock:
+            parallel.recalculate(self, keys=keys, processes=processes)
 
-        repr_key = repr(key)
+    def _invalidate_results(self, key, *codes):
+        """Removes results of key and its dependents from result cache
 
-        unchanged = (repr_key in self.result_cache and
-                     value == self(key)) or \
-                    ((value is None or value == "") and
-                     repr_key not in self.result_cache)
+        The whole result cache is cleared if one of the codes is a global
+        assignment because reads of global variables cannot be traced.
 
-        DataArray.__setitem__(self, key, value, mark_unredo=mark_unredo)
+        Parameters
+        ----------
+        key: 3-tuple of Integer
+        \tKey of the cell that has been changed
+        codes: Strings
+        \tOld and new code of the changed cell
 
-        if not unchanged:
-            # Reset result cache
-            self.result_cache = {}
+        """
 
-    def __getitem__(self, key):
-        """Returns _eval_cell"""
+        if any(self._is_global_assignment(code) for code in codes):
+            self.result_cache.clear()
 
-        # Frozen cell handling
-        if all(type(k) is not SliceType for k in key):
-            frozen_res = self.cell_attributes[key]["frozen"]
-            if frozen_res:
-                if repr(key) in self.frozen_cache:
-                    return self.frozen_cache[repr(key)]
-                else:
-                    # Frozen cache is empty.
-                    # Maybe we have a reload without the frozen cache
-                    result = self._eval_cell(key, self(key))
-                    self.frozen_cache[repr(key)] = result
-                    return result
+        else:
+            for dependent in self.dependency_graph.get_dependents(key):
+                self.result_cache.pop(dependent, None)
 
-        # Normal cell handling
+            self.result_cache.pop(key, None)
 
-        if repr(key) in self.result_cache:
-            return self.result_cache[repr(key)]
+        # The changed cell records its reads again when it is evaluated
+        self.dependency_graph.remove_precedents(key)
 
-        elif self(key) is not None:
-            result = self._eval_cell(key, self(key))
-            self.result_cache[repr(key)] = result
+    def _invalidate_cell_diff(self, diff):
+        """Removes results of the cells in diff and of their dependents
 
-            return result
+        Parameters
+        ----------
+        diff: Dict
+        \tMaps keys of changed cells to (old code, new code)
 
-    def _make_nested_list(self, gen):
-        """Makes nested list from generator for creating numpy.array"""
+        """
 
-        res = []
+        if any(self._is_global_assignment(code)
+               for codes in diff.itervalues() for code in codes):
+            self.result_cache.clear()
 
-        for ele in gen:
-            if ele is None:
-                res.append(None)
+        else:
+            result_cache = self.result_cache
 
-            elif not is_string_like(ele) and is_generator_like(ele):
-                # Nested generator
-                res.append(self._make_nested_list(ele))
+            for key in self.dependency_graph.get_all_dependents(diff):
+                result_cache.pop(key, None)
 
-            else:
-                res.append(ele)
+            for key in diff:
+                result_cache.pop(key, None)
 
-        return res
+        for key in diff:
+            self.dependency_graph.remove_precedents(key)
 
     def _has_assignment(self, code):
         """Returns True iif  code is a global assignment
@@ -969,6 +2306,11 @@ class CodeArray(DataArray):
                (not max(op in code[0] for op in self.operators)) and \
                code[0].count("(") == code[0].count(")")
 
+    def _is_global_assignment(self, code):
+        """Returns True iif code is a string that assigns a global variable"""
+
+        return is_string_like(code) and self._has_assignment(code.split("="))
+
     def _get_updated_environment(self, env_dict=None):
         """Returns globals environment with 'magic' variable
 
@@ -987,32 +2329,53 @@ class CodeArray(DataArray):
 
         return env
 
-    def _eval_cell(self, key, code):
-        """Evaluates one cell"""
+    def _get_global_env(self):
+        """Returns global namespace that is shared by all cell evaluations
 
-        # Set up environment for evaluation
+        The namespace is the module namespace, in which macros are executed
+        and global assignments are stored. Therefore, cells see changes of
+        globals by macro functions without copying the namespace.
 
-        env_dict = {'X': key[0], 'Y': key[1], 'Z': key[2], 'bz2': bz2,
-                    'base64': base64, 'charts': charts,
-                    'R': key[0], 'C': key[1], 'T': key[2], 'S': self}
-        env = self._get_updated_environment(env_dict=env_dict)
+        """
 
-        _old_code = self(key)
+        env = globals()
+        env['S'] = self
 
-        # Return cell value if in safe mode
+        return env
 
-        if self.safe_mode:
-            return code
+    def _has_nested_scope(self, code_object):
+        """Returns True iif code_object contains lambdas or generators
 
-        # If cell is not present return None
+        Names in nested scopes are looked up in the global namespace only.
 
-        if code is None:
-            return
+        """
+
+        return type(code_object) is CodeType and \
+            any(type(const) is CodeType for const in code_object.co_consts)
+
+    def _get_code_object(self, key, code):
+        """Returns global variable name and compiled expression of cell code
+
+        The global variable name is None if code is no global assignment.
+        Compiled expressions are cached per cell and shared between cells
+        with identical expressions.
+
+        Parameters
+        ----------
+        key: 3-tuple of Integer
+        \tKey of the cell
+        code: String
+        \tCode of the cell
+
+        """
 
-        elif is_generator_like(code):
-            # We have a generator object
+        try:
+            cell_code, glob_var, code_object = self.cell_code_cache[key]
+            if cell_code == code:
+                return glob_var, code_object
 
-            return numpy.array(self._make_nested_list(code), dtype="O")
+        except KeyError:
+            pass
 
         # If only 1 term in front of the "=" --> global
 
@@ -1021,15 +2384,82 @@ class CodeArray(DataArray):
         if self._has_assignment(split_exp):
             glob_var = split_exp[0].strip()
             expression = "=".join(split_exp[1:])
-
-            # Delete result cache because assignment changes results
-            self.result_cache.clear()
         else:
             glob_var = None
             expression = code
 
+        # eval ignores leading whitespace, compile does not
+        expression = expression.lstrip(" \t")
+
+        try:
+            code_object = self.code_object_cache[expression]
+
+        except KeyError:
+            try:
+                code_object = compile(expression, "<string>", "eval")
+
+            except Exception:
+                # The expression string is kept so that eval raises the
+                # error during evaluation
+                code_object = expression
+
+            if len(self.code_object_cache) > 100000:
+                # self.code_object_cache may grow quickly
+                self.code_object_cache.clear()
+
+            self.code_object_cache[expression] = code_object
+
+        self.cell_code_cache[key] = code, glob_var, code_object
+
+        return glob_var, code_object
+
+    def _eval_cell(self, key, code):
+        """Evaluates one cell"""
+
+        _old_code = self(key)
+
+        # Return cell value if in safe mode
+
+        if self.safe_mode:
+            return code
+
+        # If cell is not present return None
+
+        if code is None:
+            return
+
+        glob_var, code_object = self._get_code_object(key, code)
+
+        if glob_var is not None:
+            # Delete result cache because assignment changes results.
+            # This is part of the evaluation and keeps the generation, so
+            # that several assignments do not invalidate each other forever.
+            generation = self.result_cache.generation
+            self.result_cache.clear()
+            self.result_cache.generation = generation
+
+        # Set up environment for evaluation
+        # Cell specific names are put in a small local namespace on top of
+        # the shared global namespace.
+
+        env = self._get_global_env()
+        local_env = {'X': key[0], 'Y': key[1], 'Z': key[2],
+                     'R': key[0], 'C': key[1], 'T': key[2]}
+
+        if self._has_nested_scope(code_object):
+            env = env.copy()
+            env.update(local_env)
+            local_env = {}
+
+        # Reads of other cells are recorded again during evaluation
+        self.dependency_graph.remove_precedents(key)
+        self._eval_stack.append(key)
+
+        if self.profiler is not None:
+            start_time = default_timer()
+
         try:
-            result = eval(expression, env, {})
+            result = eval(code_object, env, local_env)
 
         except AttributeError, err:
             # Attribute Error includes RunTimeError
@@ -1038,8 +2468,17 @@ class CodeArray(DataArray):
         except Exception, err:
             result = Exception(err)
 
-        # Change back cell value for evaluation from other cells
-        self.dict_grid[key] = _old_code
+        finally:
+            self._eval_stack.pop()
+
+        if self.profiler is not None:
+            self.profiler.record(key, default_timer() - start_time, result)
+
+        # Change back cell value for evaluation from other cells. Unchanged
+        # code is not written so that evaluation does not mark the cell as
+        # changed or write to the layer 0 store.
+        if self.dict_grid.get(key) != _old_code:
+            self.dict_grid[key] = _old_code
 
         if glob_var is not None:
             globals().update({glob_var: result})
@@ -1053,7 +2492,8 @@ class CodeArray(DataArray):
         modules = [charts, bz2, base64, re, ast, sys, wx, numpy, datetime]
 
         for module in modules:
-            reload(module)
+            if module is not None:
+                reload(module)
 
     def clear_globals(self):
         """Clears all newly assigned globals"""
@@ -1064,8 +2504,14 @@ class CodeArray(DataArray):
                      '__package__', 're', 'config', '__doc__', 'SliceType',
                      'CellAttributes', 'product', 'ast', '__builtins__',
                      '__file__', 'charts', 'sys', 'is_slice_like', '__name__',
-                     'copy', 'imap', 'wx', 'ifilter', 'Selection', 'DictGrid',
-                     'numpy', 'CodeArray', 'DataArray', 'datetime']
+                     'copy', 'imap', 'izip', 'wx', 'ifilter', 'Selection',
+                     'DictGrid', 'numpy', 'CodeArray', 'DataArray', 'datetime',
+                     'CodeType', 'DependencyGraph', 'parallel',
+                     'CellArrayView', 'LRUCache', 'threading',
+                     'CellProfiler', 'default_timer', 'get_rgb',
+                     'FONT_NORMAL', 'SelectionIndex', 'AttributeLayers',
+                     'KeyIndex', 'CompactKeyValueStore', 'KEY_VALUE_STORES',
+                     'SQLiteKeyValueStore', 'GridSnapshot']
 
         for key in globals().keys():
             if key not in base_keys:
@@ -1081,6 +2527,12 @@ class CodeArray(DataArray):
         if self.safe_mode:
             return "Safe mode activated. Code not executed."
 
+        with self.lock:
+            return self._execute_macros()
+
+    def _execute_macros(self):
+        """Executes all macros, called by execute_macros with the lock"""
+
         # Windows exec does not like Windows newline
         self.macros = self.macros.replace('\r\n', '\n')
 
@@ -1210,7 +2662,7 @@ class CodeArray(DataArray):
 
         reverse = "UP" in flags
 
-        for key in self._sorted_keys(self.keys(), startkey, reverse=reverse):
+        for key in self.dict_grid.get_sorted_keys(startkey, reverse=reverse):
             code = self(key)
             res_str = unicode(self[key])
 
@@ -1218,4 +2670,114 @@ class CodeArray(DataArray):
                self._string_match(res_str, find_string, flags) is not None:
                 return key
 
-# End of class CodeArray
\ No newline at end of file
+# End of class CodeArray
+
+# -----------------------------------------------------------------------------
+
+
+class CellArrayView(object):
+    """Lazy view of cell results
+
+    Cells are evaluated when elements of the view are accessed.
+    Indexing a view with slices returns a view, indexing it with integers
+    only returns a cell result. numpy.array(view) evaluates all cells.
+
+    Parameters
+    ----------
+    code_array: CodeArray
+    \tCode array that provides cell results
+    dims: List, defaults to the whole grid
+    \tFor each grid axis either an integer index or a
+    \t3-tuple (start, step, length) of the axis cells in the view
+
+    """
+
+    def __init__(self, code_array, dims=None):
+        self.code_array = code_array
+
+        if dims is None:
+            dims = [(0, 1, length) for length in code_array.shape]
+
+        self.dims = dims
+
+    def get_shape(self):
+        """Returns shape of the view"""
+
+        return tuple(dim[2] for dim in self.dims if type(dim) is tuple)
+
+    shape = property(get_shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self[i]
+
+    def __getitem__(self, key):
+        """Returns cell result or sub-view"""
+
+        if type(key) is not tuple:
+            key = (key,)
+
+        if len(key) != len(self.shape):
+            raise IndexError("View has {0} dimensions".format(len(self.shape)))
+
+        key_iter = iter(key)
+        dims = []
+
+        for dim in self.dims:
+            if type(dim) is not tuple:
+                dims.append(dim)
+                continue
+
+            start, step, length = dim
+            key_ele = next(key_iter)
+
+            if type(key_ele) is SliceType:
+                key_range = xrange(*key_ele.indices(length))
+                dims.append((start + key_range[0] * step if key_range else 0,
+                             step * (key_ele.step or 1), len(key_range)))
+
+            else:
+                if key_ele < 0:
+                    key_ele += length
+                if not 0 <= key_ele < length:
+                    raise IndexError("View index out of range")
+
+                dims.append(start + key_ele * step)
+
+        if any(type(dim) is tuple for dim in dims):
+            return CellArrayView(self.code_array, dims)
+
+        return self.code_array[tuple(dims)]
+
+    def get_key(self):
+        """Returns key with slices for the cells of the view"""
+
+        key = []
+
+        for dim in self.dims:
+            if type(dim) is tuple:
+                start, step, length = dim
+                if length:
+                    stop = start + step * (length - 1) + (1 if step > 0
+                                                           else -1)
+                    key.append(slice(start, stop if stop >= 0 else None,
+                                     step))
+                else:
+                    key.append(slice(0, 0))
+            else:
+                key.append(dim)
+
+        return tuple(key)
+
+    def __array__(self, dtype=None):
+        array = self.code_array[self.get_key()]
+
+        if dtype is None:
+            return array
+
+        return array.astype(dtype)
+
+# End of class CellArrayView
\ No newline at end of file
@@ -0,0 +1,392 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+
+Parallel
+========
+
+Parallel recalculates cells of a CodeArray in a pool of worker processes.
+
+Cells are partitioned into groups that do not reference each other.
+References are taken from S[...] subscripts in the cell code. Each group
+is evaluated in a worker process that has been forked from the main
+process. Since a worker owns a full copy of the CodeArray, a reference
+that has not been found only costs an additional evaluation.
+
+Cells that assign global variables are evaluated before the pool is
+started so that all workers see the assigned globals.
+
+The pool is only used in headless mode, e.g. for batch evaluation. Forking
+the GUI process would copy the wx state and locks that are held by other
+threads such as the cell evaluator into the workers. In the GUI, cells
+are evaluated serially.
+
+"""
+
+import ast
+import cPickle
+import heapq
+import multiprocessing
+import sys
+from itertools import product
+
+from src.sysvars import is_headless
+
+# Names that cell code may use for the coordinates of the cell
+KEY_NAMES = {'X': 0, 'Y': 1, 'Z': 2, 'R': 0, 'C': 1, 'T': 2}
+
+# CodeArray that is recalculated. Worker processes inherit it on fork.
+_code_array = None
+
+
+def _get_index(node, key):
+    """Returns integer index of ast node or None if it cannot be resolved
+
+    Resolved are integer constants, X, Y, Z, R, C, T and sums and
+    differences of these.
+
+    """
+
+    if isinstance(node, ast.Num) and type(node.n) in (int, long):
+        return node.n
+
+    elif isinstance(node, ast.Name) and node.id in KEY_NAMES:
+        return key[KEY_NAMES[node.id]]
+
+    elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        operand = _get_index(node.operand, key)
+        if operand is not None:
+            return -operand
+
+    elif isinstance(node, ast.BinOp) and \
+         isinstance(node.op, (ast.Add, ast.Sub)):
+        left = _get_index(node.left, key)
+        right = _get_index(node.right, key)
+        if left is not None and right is not None:
+            if isinstance(node.op, ast.Add):
+                return left + right
+            else:
+                return left - right
+
+
+def _get_slice(node, key):
+    """Returns slice or integer for ast slice node or None if unresolved"""
+
+    if isinstance(node, ast.Index):
+        return _get_index(node.value, key)
+
+    elif isinstance(node, ast.Slice):
+        bounds = []
+        for bound in node.lower, node.upper, node.step:
+            if bound is None:
+                bounds.append(None)
+            else:
+                bounds.append(_get_index(bound, key))
+                if bounds[-1] is None:
+                    return
+
+        return slice(*bounds)
+
+
+def get_references(code, key):
+    """Returns list of cell references in code or None if unresolved
+
+    Each reference is a 3-tuple of integers and slices.
+    None is returned if S is used in any other way than being subscripted
+    with resolvable indices.
+
+    Parameters
+    ----------
+    code: String
+    \tCell code without global assignment
+    key: 3-tuple of Integer
+    \tKey of the cell that contains code
+
+    """
+
+    try:
+        tree = ast.parse(code.lstrip(" \t"), mode="eval")
+
+    except Exception:
+        # Code with syntax errors does not reference other cells
+        return []
+
+    references = []
+    no_subscripts = 0
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Subscript) and \
+           isinstance(node.value, ast.Name) and node.value.id == "S":
+            no_subscripts += 1
+
+            if isinstance(node.slice, ast.Index) and \
+               isinstance(node.slice.value, ast.Tuple):
+                dims = [ast.Index(value=elt)
+                        for elt in node.slice.value.elts]
+            elif isinstance(node.slice, ast.ExtSlice):
+                dims = node.slice.dims
+            else:
+                return
+
+            if len(dims) != 3:
+                return
+
+            reference = tuple(_get_slice(dim, key) for dim in dims)
+            if None in reference:
+                return
+
+            references.append(reference)
+
+    no_names = sum(1 for node in ast.walk(tree)
+                   if isinstance(node, ast.Name) and node.id == "S")
+
+    if no_names != no_subscripts:
+        # S is passed around or its attributes are accessed
+        return
+
+    return references
+
+
+def _get_referenced_keys(reference, keys, shape):
+    """Returns keys from keys that are covered by reference
+
+    Parameters
+    ----------
+    reference: 3-tuple of Integer or slice
+    \tCell reference from get_references
+    keys: Set of 3-tuples of Integer
+    \tCandidate keys
+    shape: 3-tuple of Integer
+    \tGrid shape
+
+    """
+
+    if all(type(ele) is not slice for ele in reference):
+        if reference in keys:
+            return [reference]
+        return []
+
+    ranges = []
+    for ele, length in zip(reference, shape):
+        if type(ele) is slice:
+            ranges.append(xrange(*ele.indices(length)))
+        else:
+            ranges.append((ele,))
+
+    size = 1
+    for rng in ranges:
+        size *= len(rng)
+
+    if size <= len(keys):
+        return [ref_key for ref_key in product(*ranges) if ref_key in keys]
+
+    else:
+        ranges = [set(rng) for rng in ranges]
+        return [key for key in keys
+                if all(ele in rng for ele, rng in zip(key, ranges))]
+
+
+def get_groups(code_array, keys):
+    """Returns barrier keys and groups of independent keys
+
+    Barriers are cells that assign global variables. Groups are lists of
+    keys that do not reference cells of other groups.
+
+    Parameters
+    ----------
+    code_array: CodeArray
+    \tCode array that contains the cells
+    keys: Iterable of 3-tuples of Integer
+    \tKeys of the cells that are partitioned
+
+    """
+
+    barriers = []
+    keys = set(keys)
+
+    for key in list(keys):
+        if code_array._is_global_assignment(code_array(key)):
+            barriers.append(key)
+            keys.remove(key)
+
+    # Union find over references between keys
+
+    parents = dict((key, key) for key in keys)
+
+    def find(key):
+        """Returns root of the group of key"""
+
+        root = key
+        while parents[root] != root:
+            root = parents[root]
+
+        while parents[key] != root:
+            parents[key], key = root, parents[key]
+
+        return root
+
+    for key in keys:
+        references = get_references(code_array(key), key)
+
+        if references is None:
+            # Unresolved references are evaluated in the worker
+            continue
+
+        for reference in references:
+            for ref_key in _get_referenced_keys(reference, keys,
+                                                code_array.shape):
+                parents[find(ref_key)] = find(key)
+
+    groups = {}
+    for key in keys:
+        groups.setdefault(find(key), []).append(key)
+
+    return sorted(barriers), [sorted(group) for group in groups.values()]
+
+
+def _get_batches(groups, no_batches):
+    """Returns no_batches lists of keys with groups of similar total size"""
+
+    batches = [(0, i, []) for i in xrange(min(no_batches, len(groups)))]
+
+    for group in sorted(groups, key=len, reverse=True):
+        size, i, batch = heapq.heappop(batches)
+        batch.extend(group)
+        heapq.heappush(batches, (size + len(group), i, batch))
+
+    return [batch for __, __, batch in batches]
+
+
+def _evaluate_batch(keys):
+    """Evaluates keys in a worker process
+
+    Returns a tuple of pickled results, precedents and failed keys.
+    Keys fail if their results cannot be pickled.
+
+    """
+
+    results = {}
+    precedents = {}
+    failed = []
+
+    for key in keys:
+        result = _code_array[key]
+
+        try:
+            results[key] = cPickle.dumps(result, cPickle.HIGHEST_PROTOCOL)
+
+        except Exception:
+            failed.append(key)
+            continue
+
+        precedents[key] = _code_array.dependency_graph.precedents.get(key,
+                                                                      set())
+
+    return results, precedents, failed
+
+
+def recalculate(code_array, keys=None, processes=None):
+    """Recalculates cells of code_array in parallel
+
+    Results are merged into the result cache of code_array.
+
+    Parameters
+    ----------
+    code_array: CodeArray
+    \tCode array that is recalculated
+    keys: Iterable of 3-tuples of Integer, defaults to None
+    \tKeys of cells that are recalculated together with their dependents.
+    \tIf None then all cells are recalculated.
+    processes: Integer, defaults to None
+    \tNumber of worker processes, None means number of CPUs.
+    \tIgnored if there is a wx application.
+
+    """
+
+    global _code_array
+
+    if code_array.safe_mode:
+        return
+
+    if keys is None:
+        keys = set(code_array.keys())
+        code_array.result_cache.clear()
+        code_array.dependency_graph.clear()
+
+    else:
+        keys = set(keys)
+        for key in list(keys):
+            keys.update(code_array.dependency_graph.get_dependents(key))
+
+        for key in keys:
+            code_array.result_cache.pop(key, None)
+
+    # Literal and frozen cells are served from their caches
+
+    keys = [key for key in keys if code_array(key) is not None and
+            not code_array._get_literal(key)[0] and
+            not code_array.cell_attributes[key]["frozen"]]
+
+    barriers, groups = get_groups(code_array, keys)
+
+    for key in barriers:
+        code_array[key]
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    # Without fork, workers would not share the state of code_array.
+    # The GUI process must not be forked.
+
+    if processes < 2 or len(groups) < 2 or sys.platform == "win32" or \
+       not is_headless():
+        for key in sorted(key for group in groups for key in group):
+            code_array[key]
+        return
+
+    _code_array = code_array
+    pool = multiprocessing.Pool(min(processes, len(groups)))
+
+    try:
+        batches = _get_batches(groups, processes * 4)
+
+        for results, precedents, failed in \
+                pool.imap_unordered(_evaluate_batch, batches):
+            for key, result in results.iteritems():
+                code_array.result_cache[key] = cPickle.loads(result)
+
+                code_array.dependency_graph.remove_precedents(key)
+                for precedent in precedents[key]:
+                    code_array.dependency_graph.add(key, precedent)
+
+            for key in failed:
+                code_array[key]
+
+        pool.close()
+
+    except:
+        pool.terminate()
+        raise
+
+    finally:
+        pool.join()
+        _code_array = None
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+
+Profiler
+========
+
+Profiler contains the CellProfiler class that records evaluation costs of
+cells.
+
+"""
+
+import csv
+import threading
+
+from src.lib.cache import get_size
+
+
+class CellProfiler(object):
+    """Records call count, wall time and result size of cell evaluations
+
+    Times include the evaluation of cells that are read by the cell
+    unless their results are cached.
+
+    Evaluator threads record while the GUI thread reads. Therefore, all
+    access to stats is guarded by a lock.
+
+    Attributes
+    ----------
+    stats: Dict
+    \tMaps cell key to list [count, cumulative time, max time, result size]
+    max_cumulative: Float
+    \tHighest cumulative time of all cells
+
+    """
+
+    fields = ["row", "column", "table", "count", "cumulative", "max",
+              "size"]
+
+    def __init__(self):
+        self.stats = {}
+        self.max_cumulative = 0.0
+
+        self._lock = threading.Lock()
+
+    def record(self, key, duration, result):
+        """Records one evaluation of cell key
+
+        Parameters
+        ----------
+        key: 3-tuple of Integer
+        \tKey of the evaluated cell
+        duration: Float
+        \tWall time of the evaluation in seconds
+        result: Object
+        \tResult of the evaluation
+
+        """
+
+        size = get_size(result)
+
+        with self._lock:
+            try:
+                stat = self.stats[key]
+
+            except KeyError:
+                stat = self.stats[key] = [0, 0.0, 0.0, 0]
+
+            stat[0] += 1
+            stat[1] += duration
+            stat[2] = max(stat[2], duration)
+            stat[3] = size
+
+            # Cumulative times only grow so that the maximum stays exact
+            self.max_cumulative = max(self.max_cumulative, stat[1])
+
+    def clear(self):
+        """Removes all records"""
+
+        with self._lock:
+            self.stats.clear()
+            self.max_cumulative = 0.0
+
+    def _get_items(self):
+        """Returns list of (key, stat) pairs with copied stats"""
+
+        with self._lock:
+            return [(key, list(stat)) for key, stat in self.stats.iteritems()]
+
+    def get_top_cells(self, n=10):
+        """Returns list of the n cells with the highest cumulative time
+
+        Each list element is a tuple (key, count, cumulative, max, size).
+
+        """
+
+        cells = [(key,) + tuple(stat) for key, stat in self._get_items()]
+
+        return sorted(cells, key=lambda cell: cell[2], reverse=True)[:n]
+
+    def get_top_tables(self, n=10):
+        """Returns list of the n tables with the highest cumulative time
+
+        Each list element is a tuple (table, count, cumulative, max, size).
+
+        """
+
+        tables = {}
+
+        for key, (count, cumulative, max_time, size) in \
+                self._get_items():
+            try:
+                table = tables[key[2]]
+
+            except KeyError:
+                tables[key[2]] = [key[2], count, cumulative, max_time, size]
+                continue
+
+            table[1] += count
+            table[2] += cumulative
+            table[3] = max(table[3], max_time)
+            table[4] += size
+
+        tables = sorted(tables.values(), key=lambda table: table[2],
+                        reverse=True)
+
+        return [tuple(table) for table in tables[:n]]
+
+    def get_report(self, n=10):
+        """Returns report string of the n slowest cells and tables"""
+
+        lines = ["Slowest cells",
+                 "{0:>20} {1:>8} {2:>12} {3:>12} {4:>12}".format(
+                     "cell", "count", "cumulative", "max", "size")]
+
+        for key, count, cumulative, max_time, size in self.get_top_cells(n):
+            lines.append("{0:>20} {1:>8} {2:>12.6f} {3:>12.6f} {4:>12}".format(
+                         repr(key), count, cumulative, max_time, size))
+
+        lines += ["", "Slowest tables",
+                  "{0:>20} {1:>8} {2:>12} {3:>12} {4:>12}".format(
+                      "table", "count", "cumulative", "max", "size")]
+
+        for table, count, cumulative, max_time, size in \
+                self.get_top_tables(n):
+            lines.append("{0:>20} {1:>8} {2:>12.6f} {3:>12.6f} {4:>12}".format(
+                         table, count, cumulative, max_time, size))
+
+        return "\n".join(lines)
+
+    def to_csv(self, outfile, n=None):
+        """Writes the n slowest cells as CSV to outfile
+
+        Parameters
+        ----------
+        outfile: File
+        \tOpen file to which the CSV data is written
+        n: Integer, defaults to None
+        \tNumber of cells, None means all cells
+
+        """
+
+        writer = csv.writer(outfile)
+        writer.writerow(self.fields)
+
+        for key, count, cumulative, max_time, size in self.get_top_cells(n):
+            writer.writerow(list(key) + [count, repr(cumulative),
+                                         repr(max_time), size])
+
+    def get_cost(self, key):
+        """Returns cumulative time of key relative to the slowest cell
+
+        The cost is a float between 0.0 and 1.0.
+
+        """
+
+        with self._lock:
+            try:
+                cumulative = self.stats[key][1]
+
+            except KeyError:
+                return 0.0
+
+            if self.max_cumulative <= 0:
+                return 0.0
+
+            return cumulative / self.max_cumulative
+
+# End of class CellProfiler
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+
+Selection index
+===============
+
+Selection index contains the SelectionIndex class that finds the entries of
+CellAttributes that may cover a cell without testing every selection.
+
+"""
+
+from itertools import izip
+
+
+class SelectionIndex(object):
+    """Spatial index over the selections of CellAttributes entries
+
+    Entries are identified by their position in CellAttributes. For each
+    table, single cells, rows and columns of selections are indexed
+    exactly. Blocks are indexed in bands of band_size rows. Blocks that
+    span more than max_bands row bands are indexed in bands of columns
+    instead, and blocks that are large in both directions are kept in a
+    list that is checked for each lookup.
+
+    Candidates from block bands may not cover the looked up cell, so that
+    they have to be checked with Selection.__contains__.
+
+    Parameters
+    ----------
+    entries: Iterable of 3-tuples (selection, table, attr_dict)
+    \tEntries that are indexed, e.g. a CellAttributes object
+
+    """
+
+    band_size = 64
+    max_bands = 16
+
+    def __init__(self, entries=()):
+        # Maps table to dict of the index structures of the table
+        self.tables = {}
+
+        for i, (selection, table, __) in enumerate(entries):
+            self.add(i, selection, table)
+
+    def _get_table_index(self, table):
+        """Returns dict of index structures for table, creates it if needed"""
+
+        try:
+            return self.tables[table]
+
+        except KeyError:
+            table_index = self.tables[table] = {
+                "cells": {},
+                "rows": {},
+                "cols": {},
+                "row_bands": {},
+                "col_bands": {},
+                "large": [],
+            }
+
+            return table_index
+
+    def _get_block_locations(self, table_index, top, left, bottom, right):
+        """Yields lists in table_index in which the block is indexed"""
+
+        band_size = self.band_size
+
+        first_row_band = top // band_size
+        last_row_band = bottom // band_size
+
+        if last_row_band - first_row_band < self.max_bands:
+            row_bands = table_index["row_bands"]
+            for band in xrange(first_row_band, last_row_band + 1):
+                yield row_bands, band
+            return
+
+        first_col_band = left // band_size
+        last_col_band = right // band_size
+
+        if last_col_band - first_col_band < self.max_bands:
+            col_bands = table_index["col_bands"]
+            for band in xrange(first_col_band, last_col_band + 1):
+                yield col_bands, band
+            return
+
+        yield table_index, "large"
+
+    def _get_locations(self, selection, table):
+        """Yields (dict, key) for all lists in which selection is indexed"""
+
+        table_index = self._get_table_index(table)
+
+        for (top, left), (bottom, right) in izip(selection.block_tl,
+                                                 selection.block_br):
+            for location in self._get_block_locations(table_index, top, left,
+                                                      bottom, right):
+                yield location
+
+        for row in selection.rows:
+            yield table_index["rows"], row
+
+        for col in selection.cols:
+            yield table_index["cols"], col
+
+        for cell in selection.cells:
+            yield table_index["cells"], tuple(cell)
+
+    def add(self, index, selection, table):
+        """Adds entry with position index
+
+        Entries must be added in ascending order of index.
+
+        Parameters
+        ----------
+        index: Integer
+        \tPosition of the entry in CellAttributes
+        selection: Selection
+        \tSelection of the entry
+        table: Integer
+        \tTable of the entry
+
+        """
+
+        for location, key in self._get_locations(selection, table):
+            try:
+                indices = location[key]
+
+            except KeyError:
+                location[key] = [index]
+                continue
+
+            # A selection may be indexed in the same list more than once
+            if not indices or indices[-1] != index:
+                indices.append(index)
+
+    def remove(self, index, selection, table):
+        """Removes entry with position index
+
+        Parameters are the same as for add. Removing entries that are not
+        the last entry in CellAttributes shifts the positions of later
+        entries, so that the index has to be rebuilt.
+
+        """
+
+        for location, key in self._get_locations(selection, table):
+            indices = location.get(key, [])
+
+            if index in indices:
+                indices.remove(index)
+
+            if not indices and key != "large":
+                location.pop(key, None)
+
+    def get_candidates(self, row, col, table):
+        """Returns sorted list of positions of entries that may cover a cell
+
+        Parameters
+        ----------
+        row: Integer
+        \tRow of the cell
+        col: Integer
+        \tColumn of the cell
+        table: Integer
+        \tTable of the cell
+
+        """
+
+        try:
+            table_index = self.tables[table]
+
+        except KeyError:
+            return []
+
+        candidates = set(table_index["large"])
+
+        band_size = self.band_size
+
+        for location, key in [("cells", (row, col)), ("rows", row),
+                              ("cols", col), ("row_bands", row // band_size),
+                              ("col_bands", col // band_size)]:
+            try:
+                candidates.update(table_index[location][key])
+
+            except KeyError:
+                pass
+
+        return sorted(candidates)
+
+# End of class SelectionIndex
@@ -0,0 +1,645 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+
+SQLite store
+============
+
+SQLite store contains the SQLiteKeyValueStore class, a disk backed
+alternative to KeyValueStore for grids that do not fit into memory, and
+SQLiteKeyIndex, which answers the range queries of DictGrid from the
+database indices instead of an in-memory KeyIndex.
+
+"""
+
+import cPickle as pickle
+import os
+import sqlite3
+import tempfile
+import threading
+
+from src.lib.cache import LRUCache
+
+# Marks deleted cells in the write-back cache and missing cells in the
+# read cache
+DELETED = object()
+
+# Number of rows that are fetched at once when iterating
+FETCH_SIZE = 1000
+
+# Column names of the key axes
+AXIS_COLUMNS = "row", "col", "tab"
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS cells (tab INTEGER NOT NULL, "
+    "row INTEGER NOT NULL, col INTEGER NOT NULL, code, "
+    "PRIMARY KEY (tab, row, col)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS cells_col ON cells (tab, col, row)",
+]
+
+
+def _get_db_key(key):
+    """Returns (row, col, tab) of Integer or None if key is no cell key"""
+
+    try:
+        row, col, tab = key
+
+    except (TypeError, ValueError):
+        return
+
+    try:
+        db_key = int(row), int(col), int(tab)
+
+    except (TypeError, ValueError):
+        # Key elements that cannot be converted, e.g. slices
+        return
+
+    if db_key == (row, col, tab):
+        return db_key
+
+
+def _to_db_value(value):
+    """Returns value as it is stored in the database
+
+    Unicode code strings are stored as text. Other values are pickled so
+    that their type is preserved.
+
+    """
+
+    if value is None or type(value) is unicode:
+        return value
+
+    return buffer(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+def _from_db_value(db_value):
+    """Returns value for a value from the database"""
+
+    if type(db_value) is buffer:
+        return pickle.loads(str(db_value))
+
+    return db_value
+
+
+class SQLiteKeyValueStore(object):
+    """Key-Value store in an SQLite database file
+
+    Cells with (row, col, tab) integer keys are stored in a database file.
+    Changes are kept in a write-back cache and written in one transaction
+    when the cache is full or when flush is called. Recently used cells
+    are kept in a bounded read cache. Keys that are no integer triples are
+    kept in memory.
+
+    The mapping interface is the same as for KeyValueStore, i.e. the
+    default value for missing keys is None. Additionally, keys can be
+    queried by table, row and column ranges.
+
+    All access is serialized by a lock, so that the store can be used from
+    background evaluation threads.
+
+    Parameters
+    ----------
+    filepath: String, defaults to None
+    \tPath of the database file, cells that are present in the file are
+    \tpart of the store. None creates a temporary file that is removed
+    \twhen the store is closed.
+    cache_size: Integer, defaults to 100000
+    \tMaximum number of cells in the read cache
+    batch_size: Integer, defaults to 10000
+    \tMaximum number of changed cells before they are written to the file
+
+    """
+
+    def __init__(self, filepath=None, cache_size=100000, batch_size=10000):
+        self.is_temporary = filepath is None
+
+        if self.is_temporary:
+            filehandle, filepath = tempfile.mkstemp(prefix="pyspread_",
+                                                    suffix=".sqlite")
+            os.close(filehandle)
+
+        self.filepath = filepath
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+
+        # The connection is shared with background evaluation threads
+        self._lock = threading.RLock()
+
+        self._connection = sqlite3.connect(filepath, isolation_level=None,
+                                           check_same_thread=False)
+
+        if self.is_temporary:
+            # Content of temporary files is lost on crashes anyway
+            self._connection.execute("PRAGMA synchronous = OFF")
+
+        for statement in SCHEMA:
+            self._connection.execute(statement)
+
+        # Maps keys to changed code or DELETED until the next flush
+        self._changes = {}
+
+        # Maps keys to code or DELETED for recently used cells
+        self._cache = LRUCache(max_entries=cache_size,
+                               get_size=lambda value: 0)
+
+        # Maps keys that are no integer triples to code
+        self._other_cells = {}
+
+    def __len__(self):
+        with self._lock:
+            self.flush()
+            count, = self._connection.execute(
+                "SELECT COUNT(*) FROM cells").fetchone()
+
+            return count + len(self._other_cells)
+
+    def __repr__(self):
+        return repr(dict(self.iteritems()))
+
+    def _lookup(self, key):
+        """Returns code of key or DELETED if key is not present"""
+
+        db_key = _get_db_key(key)
+
+        with self._lock:
+            if db_key is None:
+                return self._other_cells.get(key, DELETED)
+
+            try:
+                return self._changes[db_key]
+
+            except KeyError:
+                pass
+
+            try:
+                return self._cache[db_key]
+
+            except KeyError:
+                pass
+
+            row, col, tab = db_key
+            result = self._connection.execute(
+                "SELECT code FROM cells WHERE tab = ? AND row = ? AND col = ?",
+                (tab, row, col)).fetchone()
+
+            value = DELETED if result is None else _from_db_value(result[0])
+            self._cache[db_key] = value
+
+        return value
+
+    def __getitem__(self, key):
+        value = self._lookup(key)
+
+        if value is not DELETED:
+            return value
+
+    def get(self, key, default=None):
+        """Returns code of key or default if key is not present"""
+
+        value = self._lookup(key)
+
+        return default if value is DELETED else value
+
+    def __setitem__(self, key, value):
+        db_key = _get_db_key(key)
+
+        with self._lock:
+            if db_key is None:
+                self._other_cells[key] = value
+                return
+
+            self._changes[db_key] = value
+            self._cache[db_key] = value
+
+            if len(self._changes) >= self.batch_size:
+                self.flush()
+
+    def __delitem__(self, key):
+        self.pop(key)
+
+    def __contains__(self, key):
+        return self._lookup(key) is not DELETED
+
+    has_key = __contains__
+
+    def pop(self, key, *default):
+        """Removes key and returns its code, see dict.pop"""
+
+        db_key = _get_db_key(key)
+
+        with self._lock:
+            if db_key is None:
+                return self._other_cells.pop(key, *default)
+
+            value = self._lookup(db_key)
+
+            if value is DELETED:
+                if default:
+                    return default[0]
+                raise KeyError(key)
+
+            self._changes[db_key] = DELETED
+            self._cache[db_key] = DELETED
+
+            if len(self._changes) >= self.batch_size:
+                self.flush()
+
+        return value
+
+    def clear(self):
+        """Removes all cells"""
+
+        with self._lock:
+            self._changes.clear()
+            self._cache.clear()
+            self._other_cells.clear()
+
+            self._connection.execute("DELETE FROM cells")
+
+    def flush(self):
+        """Writes all changed cells to the file in one transaction"""
+
+        with self._lock:
+            if not self._changes:
+                return
+
+            deleted = []
+            changed = []
+
+            for (row, col, tab), value in self._changes.iteritems():
+                if value is DELETED:
+                    deleted.append((tab, row, col))
+                else:
+                    changed.append((tab, row, col, _to_db_value(value)))
+
+            connection = self._connection
+
+            connection.execute("BEGIN")
+
+            try:
+                connection.executemany(
+                    "DELETE FROM cells WHERE tab = ? AND row = ? AND col = ?",
+                    deleted)
+                connection.executemany(
+                    "INSERT OR REPLACE INTO cells (tab, row, col, code) "
+                    "VALUES (?, ?, ?, ?)", changed)
+
+            except sqlite3.Error:
+                connection.execute("ROLLBACK")
+                raise
+
+            connection.execute("COMMIT")
+
+            self._changes.clear()
+
+    def close(self):
+        """Writes changes and closes the file
+
+        Temporary files are removed. The store must not be used afterwards.
+
+        """
+
+        with self._lock:
+            if self._connection is None:
+                return
+
+            if not self.is_temporary:
+                self.flush()
+
+            self._connection.close()
+            self._connection = None
+
+            if self.is_temporary:
+                try:
+                    os.remove(self.filepath)
+                except OSError:
+                    pass
+
+    def __del__(self):
+        try:
+            self.close()
+
+        except Exception:
+            # The interpreter may be shutting down
+            pass
+
+    def _select(self, columns, where="", parameters=(), order="tab, row, col"):
+        """Yields result rows of a query on all cells after flushing
+
+        Rows are fetched in chunks, so that the lock is not held while the
+        caller processes the results.
+
+        """
+
+        with self._lock:
+            self.flush()
+            cursor = self._connection.execute(
+                "SELECT {} FROM cells {} ORDER BY {}".format(columns, where,
+                                                             order),
+                parameters)
+
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(FETCH_SIZE)
+
+            if not rows:
+                break
+
+            for row in rows:
+                yield row
+
+    def iterkeys(self):
+        """Returns iterator of the keys of all cells"""
+
+        for key in self._select("row, col, tab"):
+            yield key
+
+        with self._lock:
+            other_keys = self._other_cells.keys()
+
+        for key in other_keys:
+            yield key
+
+    __iter__ = iterkeys
+
+    def itervalues(self):
+        """Returns iterator of the code of all cells"""
+
+        for db_value, in self._select("code"):
+            yield _from_db_value(db_value)
+
+        with self._lock:
+            other_values = self._other_cells.values()
+
+        for value in other_values:
+            yield value
+
+    def iteritems(self):
+        """Returns iterator of (key, code) tuples of all cells"""
+
+        for row, col, tab, db_value in self._select("row, col, tab, code"):
+            yield (row, col, tab), _from_db_value(db_value)
+
+        with self._lock:
+            other_items = self._other_cells.items()
+
+        for item in other_items:
+            yield item
+
+    def keys(self):
+        """Returns list of the keys of all cells"""
+
+        return list(self.iterkeys())
+
+    def values(self):
+        """Returns list of the code of all cells"""
+
+        return list(self.itervalues())
+
+    def items(self):
+        """Returns list of (key, code) tuples of all cells"""
+
+        return list(self.iteritems())
+
+    def update(self, *args, **kwargs):
+        """Sets cells, see dict.update"""
+
+        for key, value in dict(*args, **kwargs).iteritems():
+            self[key] = value
+
+    def get_keys(self, axis, start, stop=None):
+        """Returns list of keys with start <= key[axis] < stop
+
+        Keys are sorted by table, row and col. Keys that are no integer
+        triples are left out.
+
+        Parameters
+        ----------
+        axis: Integer in [0, 1, 2]
+        \tAxis of the range, i.e. 0 == row, 1 == col, 2 == table
+        start: Integer
+        \tFirst position of the range
+        stop: Integer, defaults to None
+        \tPosition after the range, None means no upper limit
+
+        """
+
+        column = AXIS_COLUMNS[axis]
+
+        if stop is None:
+            where = "WHERE {} >= ?".format(column)
+            parameters = start,
+        else:
+            where = "WHERE {0} >= ? AND {0} < ?".format(column)
+            parameters = start, stop
+
+        return list(self._select("row, col, tab", where, parameters))
+
+    def get_block(self, top, left, bottom, right, tab):
+        """Returns list of keys in block sorted by row and col
+
+        Parameters
+        ----------
+        top, left, bottom, right: Integer
+        \tInclusive boundaries of the block
+        tab: Integer
+        \tTable of the block
+
+        """
+
+        where = "WHERE tab = ? AND row BETWEEN ? AND ? AND col BETWEEN ? AND ?"
+
+        return list(self._select("row, col, tab", where,
+                                 (tab, top, bottom, left, right)))
+
+    def get_max(self, axis, tab=None):
+        """Returns largest position with cells on axis or None
+
+        Parameters
+        ----------
+        axis: Integer in [0, 1, 2]
+        \tAxis, i.e. 0 == row, 1 == col, 2 == table
+        tab: Integer, defaults to None
+        \tTable for rows and cols, None means all tables
+
+        """
+
+        query = "SELECT MAX({}) FROM cells".format(AXIS_COLUMNS[axis])
+        parameters = ()
+
+        if tab is not None and axis < 2:
+            query += " WHERE tab = ?"
+            parameters = tab,
+
+        with self._lock:
+            self.flush()
+            maximum, = self._connection.execute(query, parameters).fetchone()
+
+        return maximum
+
+    def get_next(self, key, axis, reverse=False):
+        """Returns key of next cell along axis or None
+
+        Parameters
+        ----------
+        key: 3-tuple of Integer
+        	Key of the cell from which the search starts, it is excluded
+        axis: Integer in [0, 1]
+        	The search goes down the column for 0 and right in the row for 1
+        reverse: Bool, defaults to False
+        	Searches up or left if True
+
+        """
+
+        row, col, tab = key
+
+        if axis == 0:
+            column, other_column, pos, other = "row", "col", row, col
+        else:
+            column, other_column, pos, other = "col", "row", col, row
+
+        function, operator = ("MAX", "<") if reverse else ("MIN", ">")
+
+        query = "SELECT {0}({1}) FROM cells WHERE tab = ? AND {2} = ? " \
+                "AND {1} {3} ?".format(function, column, other_column,
+                                       operator)
+
+        with self._lock:
+            self.flush()
+            next_pos, = self._connection.execute(
+                query, (tab, other, pos)).fetchone()
+
+        if next_pos is not None:
+            return (next_pos, col, tab) if axis == 0 else (row, next_pos, tab)
+
+    def get_sorted_keys(self, startkey, reverse=False):
+        """Yields keys sorted by table, col and row starting with startkey
+
+        Keys before startkey are yielded at the end, i.e. the iteration
+        wraps around. This is the search order of find.
+
+        Parameters
+        ----------
+        startkey: 3-tuple of Integer
+        	First key to be yielded if present
+        reverse: Bool, defaults to False
+        	Sort direction reversed if True
+
+        """
+
+        start_row, start_col, start_tab = startkey
+
+        if reverse:
+            after = "tab < ? OR tab = ? AND (col < ? OR col = ? AND row <= ?)"
+            order = "tab DESC, col DESC, row DESC"
+        else:
+            after = "tab > ? OR tab = ? AND (col > ? OR col = ? AND row >= ?)"
+            order = "tab, col, row"
+
+        parameters = start_tab, start_tab, start_col, start_col, start_row
+
+        for where in ["WHERE " + after, "WHERE NOT (" + after + ")"]:
+            for key in self._select("row, col, tab", where, parameters,
+                                    order):
+                yield key
+
+    def get_key_index(self):
+        """Returns SQLiteKeyIndex that queries the keys of the store"""
+
+        return SQLiteKeyIndex(self)
+
+    def __getstate__(self):
+        """Returns cells for pickling, the copy uses a temporary file"""
+
+        return {"cells": dict(self.iteritems()),
+                "cache_size": self.cache_size,
+                "batch_size": self.batch_size}
+
+    def __setstate__(self, state):
+        """Restores cells in a temporary file after unpickling"""
+
+        self.__init__(cache_size=state["cache_size"],
+                      batch_size=state["batch_size"])
+        self.update(state["cells"])
+        self.flush()
+
+# End of class SQLiteKeyValueStore
+
+
+class SQLiteKeyIndex(object):
+    """Key index of DictGrid for keys in an SQLiteKeyValueStore
+
+    Range queries are answered by the database, so that the keys are not
+    kept in memory. add, remove, clear and shift do nothing because the
+    store itself holds the keys.
+
+    Parameters
+    ----------
+    store: SQLiteKeyValueStore
+    	Store of the cells
+
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def add(self, key):
+        """Does nothing, the key is added to the store"""
+
+    def update(self, keys):
+        """Does nothing, the keys are added to the store"""
+
+    def remove(self, key):
+        """Does nothing, the key is removed from the store"""
+
+    def clear(self):
+        """Does nothing, the store is cleared"""
+
+    def shift(self, axis, point, amount):
+        """Does nothing, the moved keys are set in the store"""
+
+    def get_keys(self, axis, start, stop=None):
+        """Returns list of keys with start <= key[axis] < stop"""
+
+        return self.store.get_keys(axis, start, stop)
+
+    def get_block(self, top, left, bottom, right, tab):
+        """Returns list of keys in block sorted by row and col"""
+
+        return self.store.get_block(top, left, bottom, right, tab)
+
+    def get_next(self, key, axis, reverse=False):
+        """Returns key of next non-empty cell along axis or None"""
+
+        return self.store.get_next(key, axis, reverse)
+
+    def get_max(self, axis, tab=None):
+        """Returns largest position with non-empty cells on axis or None"""
+
+        return self.store.get_max(axis, tab)
+
+    def get_sorted_keys(self, startkey, reverse=False):
+        """Yields keys sorted by table, col and row starting with startkey"""
+
+        return self.store.get_sorted_keys(startkey, reverse)
+
+# End of class SQLiteKeyIndex
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmarks for model.py
+
+Run with python bench_model.py
+
+"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+import multiprocessing
+import os
+import resource
+import sys
+from timeit import default_timer
+
+TESTPATH = "/".join(os.path.realpath(__file__).split("/")[:-1]) + "/"
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + "/../../..")
+sys.path.insert(0, TESTPATH + "/../..")
+
+from src.model.model import CodeArray, KEY_VALUE_STORES
+
+
+def _best_time(func, repeat=5):
+    """Returns the fastest of repeat runs of func in seconds"""
+
+    timings = []
+
+    for _ in xrange(repeat):
+        start = default_timer()
+        func()
+        timings.append(default_timer() - start)
+
+    return min(timings)
+
+
+def bench_eval_overhead(no_globals_list=(0, 100, 1000, 10000),
+                        no_cells=1000):
+    """Per cell evaluation time against the number of globals
+
+    The copy column shows the time for copying globals, which was
+    needed for each cell evaluation before the shared namespace.
+
+    """
+
+    print "Cell evaluation time in microseconds per cell"
+    print "{0:>10} {1:>10} {2:>10}".format("globals", "eval", "copy")
+
+    for no_globals in no_globals_list:
+        code_array = CodeArray((no_cells, 1, 1))
+        code_array.clear_globals()
+
+        code_array.macros = "\n".join("global_{0} = {0}".format(i)
+                                      for i in xrange(no_globals))
+        code_array.execute_macros()
+
+        for row in xrange(no_cells):
+            code_array[row, 0, 0] = "X + 1"
+
+        def evaluate_cells():
+            """Evaluates all cells without result cache"""
+
+            code_array.result_cache.clear()
+            for row in xrange(no_cells):
+                code_array[row, 0, 0]
+
+        def copy_globals():
+            """Copies globals once for each cell"""
+
+            for row in xrange(no_cells):
+                code_array._get_updated_environment()
+
+        eval_time = _best_time(evaluate_cells) / no_cells * 1e6
+        copy_time = _best_time(copy_globals) / no_cells * 1e6
+
+        print "{0:>10} {1:>10.2f} {2:>10.2f}".format(no_globals, eval_time,
+                                                   copy_time)
+
+        code_array.clear_globals()
+
+
+def _get_store_memory((store_name, no_cells, no_distinct)):
+    """Returns peak memory growth in MB and fill time of a layer 0 store
+
+    Cells are filled like a column block with repeated formulas. Every
+    cell gets a newly created code string as when parsing a file.
+
+    """
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = default_timer()
+
+    store = KEY_VALUE_STORES[store_name]()
+
+    for i in xrange(no_cells):
+        key = i // 100, i % 100, 0
+        store[key] = u"S[X-1, Y, Z] + {}".format(i % no_distinct)
+
+    fill_time = default_timer() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in kB on Linux
+    return (peak - baseline) / 1024.0, fill_time
+
+
+def bench_key_value_store_memory(no_cells_list=(100000, 1000000),
+                                 no_distinct_list=(100, 1000000)):
+    """Memory and fill time of the layer 0 stores
+
+    Each measurement runs in its own process so that freed memory of
+    earlier runs does not hide the peak memory.
+
+    """
+
+    print "Layer 0 store memory in MB and fill time in seconds"
+    print "{0:>10} {1:>10} {2:>10} {3:>10} {4:>10}".format(
+        "store", "cells", "distinct", "memory", "time")
+
+    for no_cells in no_cells_list:
+        for no_distinct in no_distinct_list:
+            for store_name in sorted(KEY_VALUE_STORES):
+                pool = multiprocessing.Pool(1, maxtasksperchild=1)
+                memory, fill_time = pool.apply(
+                    _get_store_memory,
+                    [(store_name, no_cells, min(no_cells, no_distinct))])
+                pool.close()
+                pool.join()
+
+                print "{0:>10} {1:>10} {2:>10} {3:>10.1f} {4:>10.2f}".format(
+                    store_name, no_cells, min(no_cells, no_distinct),
+                    memory, fill_time)
+
+
+if __name__ == "__main__":
+    bench_eval_overhead()
+    bench_key_value_store_memory()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit test for attribute_layers.py"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+import os
+import sys
+
+TESTPATH = "/".join(os.path.realpath(__file__).split("/")[:-1]) + "/"
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + "/../../..")
+sys.path.insert(0, TESTPATH + "/../..")
+
+from src.lib.selection import Selection
+from src.model.attribute_layers import RunLayer, AttributeLayers, MAX_INDEX
+
+
+class TestRunLayer(object):
+    """Unit tests for RunLayer"""
+
+    def setup_method(self, method):
+        """Creates empty RunLayer"""
+
+        self.layer = RunLayer()
+
+    def test_set_block(self):
+        """Unit test for set_block"""
+
+        self.layer.set_block(2, 2, 4, 5, "a")
+
+        assert self.layer.col_starts == [0, 2, 6]
+        assert self.layer.row_runs[1][0] == [0, 2, 5]
+
+        # Overwriting and extending merges the runs again
+        self.layer.set_block(0, 0, MAX_INDEX, MAX_INDEX, "b")
+
+        assert self.layer.col_starts == [0]
+        assert self.layer.row_runs == [[[0], ["b"]]]
+
+    def test_get_runs(self):
+        """Unit test for get_runs"""
+
+        self.layer.set_block(2, 2, 4, 5, "a")
+        self.layer.set_block(0, 4, MAX_INDEX, 4, 1)
+
+        runs = sorted(self.layer.get_runs(3, 3, 10, 4))
+
+        assert runs == [(3, 3, 4, 3, "a"), (3, 4, 10, 4, 1)]
+        assert list(self.layer.get_runs(10, 0, 20, 3)) == []
+
+# End of class TestRunLayer
+
+
+class TestAttributeLayers(object):
+    """Unit tests for AttributeLayers"""
+
+    def setup_method(self, method):
+        """Creates AttributeLayers with one entry for each selection type"""
+
+        self.entries = [
+            (Selection([(1, 1)], [(3, 2)], [], [], []), 0, {"bgcolor": 1}),
+            (Selection([], [], [2], [], []), 0, {"textcolor": 2}),
+            (Selection([], [], [], [2], []), 0, {"bgcolor": 3}),
+            (Selection([], [], [], [], [(3, 2)]), 0, {"bgcolor": 4}),
+            (Selection([(0, 0)], [(1, 1)], [], [], []), 1, {"bgcolor": 5}),
+        ]
+
+        self.layers = AttributeLayers(self.entries)
+
+    def _get_attrs(self, row, col, table):
+        """Returns dict of the set attributes of a cell from the entries"""
+
+        attrs = {}
+
+        for selection, entry_table, attr_dict in self.entries:
+            if entry_table == table and (row, col) in selection:
+                attrs.update(attr_dict)
+
+        return attrs
+
+    def test_get_block(self):
+        """Unit test for get_block"""
+
+        for table in xrange(3):
+            block = self.layers.get_block(0, 0, 5, 5, table)
+
+            for row in xrange(6):
+                for col in xrange(6):
+                    assert block.get((row, col), {}) == \
+                        self._get_attrs(row, col, table)
+
+    def test_apply(self):
+        """Unit test for apply"""
+
+        entry = (Selection([], [], [], [], [(2, 2)]), 0, {"bgcolor": 6})
+
+        self.entries.append(entry)
+        self.layers.apply(entry)
+
+        assert self.layers.get_block(2, 2, 2, 2, 0) == \
+            {(2, 2): {"bgcolor": 6, "textcolor": 2}}
+
+# End of class TestAttributeLayers
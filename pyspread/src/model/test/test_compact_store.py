@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit test for compact_store.py"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+import os
+import pickle
+import sys
+
+import pytest
+
+TESTPATH = "/".join(os.path.realpath(__file__).split("/")[:-1]) + "/"
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + "/../../..")
+sys.path.insert(0, TESTPATH + "/../..")
+
+from src.model.compact_store import pack_key, unpack_key, \
+    CompactKeyValueStore
+
+
+def test_pack_key():
+    """Unit test for pack_key and unpack_key"""
+
+    for key in [(0, 0, 0), (1, 2, 3), (2 ** 26 - 1, 2 ** 20 - 1, 2 ** 17 - 1)]:
+        assert unpack_key(pack_key(key)) == key
+
+    for key in [(-1, 0, 0), (0, 2 ** 20, 0), (0.5, 0, 0), (slice(None), 0, 0),
+                (1, 2), "abc"]:
+        assert pack_key(key) is None
+
+
+class TestCompactKeyValueStore(object):
+    """Unit tests for CompactKeyValueStore"""
+
+    def setup_method(self, method):
+        """Creates store with three cells of two distinct formulas"""
+
+        self.store = CompactKeyValueStore()
+
+        self.store[0, 0, 0] = u"1 + 1"
+        self.store[1, 0, 0] = u"1 + 1"
+        self.store[0, 1, 2] = u"2 + 2"
+
+    def test_getitem(self):
+        """Unit test for __getitem__ and get"""
+
+        assert self.store[1, 0, 0] == u"1 + 1"
+        assert self.store[5, 5, 5] is None
+        assert self.store.get((5, 5, 5), 3) == 3
+        assert (0, 1, 2) in self.store
+        assert (0, 2, 1) not in self.store
+
+    def test_strings(self):
+        """Equal code strings are shared and removed when unused"""
+
+        assert self.store[0, 0, 0] is self.store[1, 0, 0]
+        assert self.store.get_string_count() == 2
+
+        self.store[0, 0, 0] = u"2 + 2"
+        assert self.store.get_string_count() == 2
+
+        self.store.pop((1, 0, 0))
+        del self.store[0, 1, 2]
+        assert self.store.get_string_count() == 1
+
+        self.store.clear()
+        assert self.store.get_string_count() == 0
+        assert len(self.store) == 0
+
+    def test_other_keys(self):
+        """Keys that cannot be packed"""
+
+        self.store[-1, 0, 0] = u"1 + 1"
+
+        assert self.store[-1, 0, 0] == u"1 + 1"
+        assert sorted(self.store) == [(-1, 0, 0), (0, 0, 0), (0, 1, 2),
+                                      (1, 0, 0)]
+
+        with pytest.raises(TypeError):
+            self.store.pop((slice(None), 0, 0))
+
+    def test_pop(self):
+        """Unit test for pop"""
+
+        assert self.store.pop((0, 1, 2)) == u"2 + 2"
+        assert self.store.pop((0, 1, 2), None) is None
+
+        with pytest.raises(KeyError):
+            self.store.pop((0, 1, 2))
+
+    def test_pickle(self):
+        """Unit test for pickling"""
+
+        store = pickle.loads(pickle.dumps(self.store, 2))
+
+        assert sorted(store.items()) == sorted(self.store.items())
+        assert store[0, 0, 0] is store[1, 0, 0]
+
+# End of class TestCompactKeyValueStore
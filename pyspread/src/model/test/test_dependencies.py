@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit test for dependencies.py"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Foobar.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+import os
+import sys
+
+TESTPATH = "/".join(os.path.realpath(__file__).split("/")[:-1]) + "/"
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + "/../../..")
+sys.path.insert(0, TESTPATH + "/../..")
+
+from src.model.dependencies import DependencyGraph
+
+
+class TestDependencyGraph(object):
+    """Unit test for DependencyGraph"""
+
+    def setup_method(self, method):
+        """Setup for a small chain of dependencies"""
+
+        self.graph = DependencyGraph()
+
+        # (2, 0, 0) reads (1, 0, 0), which reads (0, 0, 0)
+        self.graph.add((1, 0, 0), (0, 0, 0))
+        self.graph.add((2, 0, 0), (1, 0, 0))
+
+    def test_add(self):
+        """Test for recording edges"""
+
+        assert self.graph.precedents[(1, 0, 0)] == set([(0, 0, 0)])
+        assert self.graph.dependents[(0, 0, 0)] == set([(1, 0, 0)])
+        assert (2, 0, 0) in self.graph
+        assert (3, 0, 0) not in self.graph
+
+    def test_remove_precedents(self):
+        """Test for removing edges before re-evaluation"""
+
+        self.graph.remove_precedents((1, 0, 0))
+
+        assert (1, 0, 0) not in self.graph.precedents
+        assert (0, 0, 0) not in self.graph.dependents
+        assert self.graph.dependents[(1, 0, 0)] == set([(2, 0, 0)])
+
+    def test_get_dependents(self):
+        """Test for transitive dependents"""
+
+        assert self.graph.get_dependents((0, 0, 0)) == \
+            set([(1, 0, 0), (2, 0, 0)])
+        assert self.graph.get_dependents((2, 0, 0)) == set()
+
+        # Cycles terminate
+        self.graph.add((0, 0, 0), (2, 0, 0))
+        assert self.graph.get_dependents((0, 0, 0)) == \
+            set([(0, 0, 0), (1, 0, 0), (2, 0, 0)])
+
+    def test_clear(self):
+        """Test for removing all edges"""
+
+        self.graph.clear()
+
+        assert self.graph.precedents == {}
+        assert self.graph.dependents == {}
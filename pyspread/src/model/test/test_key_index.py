@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit test for key_index.py"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+import os
+import sys
+
+TESTPATH = "/".join(os.path.realpath(__file__).split("/")[:-1]) + "/"
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + "/../../..")
+sys.path.insert(0, TESTPATH + "/../..")
+
+from src.model.key_index import KeyIndex
+
+
+class TestKeyIndex(object):
+    """Unit tests for KeyIndex"""
+
+    def setup_method(self, method):
+        """Creates KeyIndex with keys in three tables"""
+
+        self.keys = [(0, 0, 0), (3, 1, 0), (3, 7, 0), (10, 1, 0),
+                     (2, 2, 1), (20, 5, 1), (4, 4, 2)]
+
+        self.key_index = KeyIndex(self.keys)
+
+    def test_get_keys(self):
+        """Unit test for get_keys"""
+
+        assert sorted(self.key_index.get_keys(0, 3, 11)) == \
+            [(3, 1, 0), (3, 7, 0), (4, 4, 2), (10, 1, 0)]
+        assert sorted(self.key_index.get_keys(1, 5)) == [(3, 7, 0), (20, 5, 1)]
+        assert sorted(self.key_index.get_keys(2, 1, 2)) == \
+            [(2, 2, 1), (20, 5, 1)]
+        assert self.key_index.get_keys(0, 21) == []
+
+    def test_remove(self):
+        """Unit test for remove"""
+
+        self.key_index.remove((3, 1, 0))
+        self.key_index.remove((4, 4, 2))
+
+        assert sorted(self.key_index.get_keys(0, 3, 4)) == [(3, 7, 0)]
+        assert 2 not in self.key_index.tables
+
+    def test_shift(self):
+        """Unit test for shift"""
+
+        self.key_index.shift(0, 3, 2)
+
+        assert sorted(self.key_index.get_keys(0, 0)) == \
+            [(0, 0, 0), (2, 2, 1), (5, 1, 0), (5, 7, 0), (6, 4, 2),
+             (12, 1, 0), (22, 5, 1)]
+        assert sorted(self.key_index.get_keys(1, 1, 2)) == \
+            [(5, 1, 0), (12, 1, 0)]
+
+        self.key_index.shift(1, 7, -1)
+
+        assert self.key_index.get_keys(1, 6) == [(5, 6, 0)]
+
+        self.key_index.shift(2, 1, 3)
+
+        assert sorted(self.key_index.tables) == [0, 4, 5]
+
+    def test_get_block(self):
+        """Unit test for get_block"""
+
+        assert self.key_index.get_block(1, 0, 10, 5, 0) == \
+            [(3, 1, 0), (10, 1, 0)]
+        assert self.key_index.get_block(0, 0, 100, 100, 1) == \
+            [(2, 2, 1), (20, 5, 1)]
+        assert self.key_index.get_block(0, 0, 100, 100, 5) == []
+
+    def test_get_next(self):
+        """Unit test for get_next"""
+
+        assert self.key_index.get_next((3, 1, 0), 0) == (10, 1, 0)
+        assert self.key_index.get_next((3, 1, 0), 0, reverse=True) is None
+        assert self.key_index.get_next((3, 0, 0), 1) == (3, 1, 0)
+        assert self.key_index.get_next((3, 7, 0), 1, reverse=True) == \
+            (3, 1, 0)
+        assert self.key_index.get_next((0, 0, 5), 0) is None
+
+    def test_get_max(self):
+        """Unit test for get_max"""
+
+        assert self.key_index.get_max(0) == 20
+        assert self.key_index.get_max(1, 0) == 7
+        assert self.key_index.get_max(2) == 2
+        assert self.key_index.get_max(0, 5) is None
+
+    def test_get_sorted_keys(self):
+        """Unit test for get_sorted_keys"""
+
+        keys = list(self.key_index.get_sorted_keys((3, 1, 0)))
+
+        assert keys == [(3, 1, 0), (10, 1, 0), (3, 7, 0), (2, 2, 1),
+                        (20, 5, 1), (4, 4, 2), (0, 0, 0)]
+
+        keys = list(self.key_index.get_sorted_keys((3, 5, 1), reverse=True))
+
+        assert keys == [(2, 2, 1), (3, 7, 0), (10, 1, 0), (3, 1, 0),
+                        (0, 0, 0), (4, 4, 2), (20, 5, 1)]
+
+    def test_unsorted_add(self):
+        """Keys that are added in any order are sorted before queries"""
+
+        key_index = KeyIndex(reversed(self.keys))
+
+        assert key_index.get_keys(0, 0, 4) == [(0, 0, 0), (3, 1, 0),
+                                               (3, 7, 0), (2, 2, 1)]
+
+        key_index.add((5, 1, 0))
+        key_index.add((1, 1, 0))
+
+        assert key_index.tables[0].unsorted
+
+        assert list(key_index.get_sorted_keys((0, 0, 0)))[:5] == \
+            [(0, 0, 0), (1, 1, 0), (3, 1, 0), (5, 1, 0), (10, 1, 0)]
+        assert not key_index.tables[0].unsorted
+
+        key_index.add((2, 1, 0))
+        key_index.remove((3, 1, 0))
+
+        assert key_index.get_block(0, 0, 10, 1, 0) == \
+            [(0, 0, 0), (1, 1, 0), (2, 1, 0), (5, 1, 0), (10, 1, 0)]
@@ -33,10 +33,15 @@ sys.path.insert(0, TESTPATH)
 sys.path.insert(0, TESTPATH + "/../../..")
 sys.path.insert(0, TESTPATH + "/../..")
 
+from src.config import config
 from src.model.model import KeyValueStore, CellAttributes, DictGrid
+from src.model.model import KEY_VALUE_STORES
+from src.model.model import GridSnapshot
 from src.model.model import DataArray, CodeArray
+from src.model.sqlite_store import SQLiteKeyValueStore, SQLiteKeyIndex
 
 from src.lib.selection import Selection
+from src.model.unredo import UnRedo
 
 
 class TestKeyValueStore(object):
@@ -83,6 +88,131 @@ class TestCellAttributes(object):
         assert self.cell_attr[32, 53, 0]["testattr"] == 2
         assert self.cell_attr[2, 2, 0]["testattr"] == 3
 
+    def test_index_update(self):
+        """Test that lookups follow appends, pops and list changes"""
+
+        selection_1 = Selection([(0, 0)], [(999, 0)], [], [], [])
+        selection_2 = Selection([], [], [], [0], [])
+
+        self.cell_attr.append((selection_1, 0, {"testattr": 1}))
+        assert self.cell_attr[500, 0, 0]["testattr"] == 1
+
+        self.cell_attr.append((selection_2, 0, {"testattr": 2}))
+        assert self.cell_attr[501, 0, 0]["testattr"] == 2
+
+        self.cell_attr.pop()
+        assert self.cell_attr[502, 0, 0]["testattr"] == 1
+
+        del self.cell_attr[:]
+        assert "testattr" not in self.cell_attr[503, 0, 0]
+
+    def test_cache(self):
+        """Test that appends only remove covered cells from the cache"""
+
+        self.cell_attr.unredo = UnRedo()
+
+        selection_1 = Selection([(0, 0)], [(5, 5)], [], [], [])
+        selection_2 = Selection([], [], [], [], [(10, 10)])
+
+        self.cell_attr.undoable_append((selection_1, 0, {"testattr": 1}))
+
+        for key in [(1, 1, 0), (10, 10, 0), (10, 10, 1)]:
+            self.cell_attr[key]
+
+        self.cell_attr.undoable_append((selection_2, 0, {"testattr": 2}))
+
+        assert (1, 1, 0) in self.cell_attr._attr_cache
+        assert (10, 10, 1) in self.cell_attr._attr_cache
+        assert (10, 10, 0) not in self.cell_attr._attr_cache
+        assert self.cell_attr[10, 10, 0]["testattr"] == 2
+
+        self.cell_attr.unredo.undo()
+
+        assert "testattr" not in self.cell_attr[10, 10, 0]
+        assert self.cell_attr[1, 1, 0]["testattr"] == 1
+
+    def test_compact(self):
+        """Test compact"""
+
+        self.cell_attr.unredo = UnRedo()
+
+        selection_1 = Selection([(0, 0)], [(9, 0)], [], [], [])
+        selection_2 = Selection([(0, 1)], [(9, 1)], [], [], [])
+        selection_3 = Selection([(2, 0)], [(3, 1)], [], [], [])
+        selection_4 = Selection([(0, 0)], [(9, 1)], [], [], [])
+
+        for selection, attr in [(selection_1, {"bgcolor": 1}),
+                                (selection_2, {"bgcolor": 1}),
+                                (selection_3, {"textcolor": 2}),
+                                (selection_4, {"bgcolor": 3}),
+                                (selection_2, {"textcolor": 2})]:
+            self.cell_attr.undoable_append((selection, 0, attr))
+
+        keys = [(row, col, 0) for row in xrange(11) for col in xrange(3)]
+        attrs = [self.cell_attr[key] for key in keys]
+
+        assert self.cell_attr.compact() == 3
+        assert len(self.cell_attr) == 2
+
+        self.cell_attr._attr_cache.clear()
+        assert [self.cell_attr[key] for key in keys] == attrs
+
+        # Undo restores all entries so that the last append can be undone
+        self.cell_attr.unredo.undo()
+        assert len(self.cell_attr) == 4
+
+    def test_get_merged_entries(self):
+        """Test that entries are only merged across unrelated entries"""
+
+        selections = [Selection([], [], [], [], [(i, 0)]) for i in xrange(4)]
+
+        entries = [(selections[0], 0, {"bgcolor": 1}),
+                   (selections[1], 1, {"bgcolor": 2}),
+                   (selections[2], 0, {"textcolor": 2}),
+                   (selections[3], 0, {"bgcolor": 1})]
+
+        merged = self.cell_attr._get_merged_entries(entries)
+        assert [entry[1:] for entry in merged] == \
+            [(0, {"bgcolor": 1}), (1, {"bgcolor": 2}), (0, {"textcolor": 2})]
+
+        entries[2] = (selections[2], 0, {"bgcolor": 2, "textcolor": 2})
+
+        assert len(self.cell_attr._get_merged_entries(entries)) == 4
+
+    def test_get_block(self):
+        """Test get_block and prefetch"""
+
+        selection_1 = Selection([(1, 1)], [(3, 2)], [], [4], [])
+        selection_2 = Selection([], [], [2], [], [(0, 0)])
+
+        self.cell_attr.append((selection_1, 0, {"bgcolor": 1}))
+        self.cell_attr.append((selection_2, 0, {"textcolor": 2}))
+
+        block = self.cell_attr.get_block(-1, 0, 4, 5, 0)
+
+        assert len(block) == 30
+        for key, attr_dict in block.iteritems():
+            assert attr_dict == self.cell_attr._get_attr_dict(key)
+
+        # Appended entries are applied to the layers
+        self.cell_attr.append((selection_2, 0, {"bgcolor": 3}))
+        assert self.cell_attr.get_block(2, 1, 2, 1, 0)[2, 1, 0]["bgcolor"] == 3
+
+        self.cell_attr.prefetch(0, 0, 4, 5, 0)
+        assert self.cell_attr.is_cached((4, 5, 0))
+        assert not self.cell_attr.is_cached((5, 5, 0))
+
+        # Blocks that do not fit into the cache are cut
+        self.cell_attr._attr_cache.clear()
+        self.cell_attr._attr_cache.max_entries = 20
+
+        self.cell_attr.prefetch(0, 0, 9, 5, 0, row=4)
+        assert self.cell_attr._attr_cache.get_stats()["evictions"] == 0
+        assert self.cell_attr.is_cached((4, 0, 0))
+        assert self.cell_attr.is_cached((6, 5, 0))
+        assert not self.cell_attr.is_cached((3, 0, 0))
+        assert not self.cell_attr.is_cached((7, 0, 0))
+
 
 class TestParserMixin(object):
     """Unit tests for ParserMixin"""
@@ -245,6 +375,162 @@ class TestDictGrid(object):
         self.dict_grid[(2, 4, 5)] = "Test"
         assert self.dict_grid[(2, 4, 5)] == "Test"
 
+    def test_shift_keys(self):
+        """Unit test for shift_keys"""
+
+        for key in [(1, 1, 0), (5, 1, 0), (6, 2, 1), (9, 9, 2)]:
+            self.dict_grid[key] = str(key)
+
+        self.dict_grid.pop((1, 1, 0))
+        self.dict_grid.shift_keys(5, 3, 0)
+
+        assert sorted(self.dict_grid) == [(8, 1, 0), (9, 2, 1), (12, 9, 2)]
+        assert sorted(self.dict_grid.get_keys(0, 0)) == sorted(self.dict_grid)
+        assert self.dict_grid[8, 1, 0] == "(5, 1, 0)"
+
+        self.dict_grid.shift_keys(1, -1, 2)
+
+        assert sorted(self.dict_grid.get_keys(2, 1)) == [(12, 9, 1)]
+
+    def test_changed_keys(self):
+        """Changed cells are tracked if changed_keys is a set"""
+
+        self.dict_grid[1, 1, 0] = "untracked"
+
+        assert self.dict_grid.changed_keys is None
+
+        self.dict_grid.changed_keys = set()
+
+        self.dict_grid[2, 1, 0] = "1"
+        del self.dict_grid[1, 1, 0]
+        self.dict_grid.pop((3, 3, 3), None)
+        self.dict_grid.shift_keys(2, 1, 0)
+
+        assert self.dict_grid.changed_keys == \
+            set([(1, 1, 0), (2, 1, 0), (3, 1, 0)])
+
+        self.dict_grid.clear()
+
+        assert self.dict_grid.changed_keys is None
+
+    @pytest.mark.parametrize("store", ["dict", "compact", "sqlite"])
+    def test_set_cells(self, store):
+        """Unit test for set_cells"""
+
+        dict_grid = DictGrid((100, 100, 100), KEY_VALUE_STORES[store]())
+
+        keys = [(row, 1, 0) for row in xrange(10)] + [(3, 3, 1)]
+        codes = [unicode(row) for row in xrange(11)]
+
+        assert dict_grid.set_cells(keys, codes, chunk_size=3)
+
+        assert sorted(dict_grid.iteritems()) == sorted(zip(keys, codes))
+        assert dict_grid.get_keys(0, 9) == [(9, 1, 0)]
+        assert dict_grid.get_next_key((3, 1, 0), 0) == (4, 1, 0)
+
+        # Aborted loads keep the key index of the set cells
+        dict_grid = DictGrid((100, 100, 100), KEY_VALUE_STORES[store]())
+        dict_grid.changed_keys = set()
+        no_cells = []
+
+        def abort(no_set):
+            no_cells.append(no_set)
+            return no_set >= 6
+
+        assert not dict_grid.set_cells(keys, codes, abort, chunk_size=3)
+
+        assert no_cells == [3, 6]
+        assert len(dict_grid) == 6
+        assert sorted(dict_grid.get_keys(0, 0)) == keys[:6]
+        assert dict_grid.changed_keys == set(keys[:6])
+
+
+class TestGridSnapshot(object):
+    """Unit tests for GridSnapshot"""
+
+    def setup_method(self, method):
+        """Creates DictGrid with content and its snapshot"""
+
+        self.dict_grid = DictGrid((100, 100, 100))
+
+        for key in [(1, 1, 0), (5, 1, 0), (6, 2, 1)]:
+            self.dict_grid[key] = str(key)
+
+        self.dict_grid.cell_attributes.append(
+            (Selection([], [], [], [], [(1, 1)]), 0, {"bgcolor": 0}))
+        self.dict_grid.row_heights[1, 0] = 30.0
+        self.dict_grid.macros = u"a = 1\n"
+
+        self.snapshot = self.dict_grid.get_snapshot()
+
+        self.saved = dict((key, self.dict_grid[key]) for key in self.dict_grid)
+        self.saved_lines = list(self.dict_grid.attributes_to_strings())
+
+    def _get_content(self):
+        """Returns dict of the cells of the snapshot"""
+
+        return dict((key, self.snapshot[key]) for key in self.snapshot)
+
+    def test_copy_on_write(self):
+        """Changes of the grid do not change the snapshot"""
+
+        dict_grid = self.dict_grid
+
+        dict_grid[1, 1, 0] = "changed"
+        dict_grid[2, 2, 0] = "new"
+        del dict_grid[5, 1, 0]
+        dict_grid.pop((6, 2, 1))
+        dict_grid.shift_keys(0, 1, 0)
+
+        dict_grid.cell_attributes.append(
+            (Selection([], [], [], [], [(2, 2)]), 0, {"bgcolor": 1}))
+        dict_grid.row_heights[1, 0] = 40.0
+        dict_grid.macros = u"a = 2\n"
+
+        assert self._get_content() == self.saved
+        assert len(self.snapshot) == 3
+        assert self.snapshot[2, 2, 0] is None
+        assert list(self.snapshot.attributes_to_strings()) == self.saved_lines
+        assert self.snapshot.row_heights == {(1, 0): 30.0}
+        assert self.snapshot.macros == u"a = 1\n"
+
+        assert self.snapshot.get_changed_keys() == \
+            set([(1, 1, 0), (2, 1, 0), (2, 2, 0), (3, 2, 0), (5, 1, 0),
+                 (6, 2, 1)])
+
+    def test_clear(self):
+        """Clearing the grid keeps the snapshot content"""
+
+        self.dict_grid.clear()
+
+        assert self.snapshot.is_cleared
+        assert self._get_content() == self.saved
+
+    def test_release(self):
+        """Released snapshots are not passed changes"""
+
+        other_snapshot = GridSnapshot(self.dict_grid)
+
+        self.snapshot.release()
+        self.snapshot.release()
+
+        assert self.dict_grid.snapshots == [other_snapshot]
+
+        self.dict_grid[1, 1, 0] = "changed"
+
+        assert self.snapshot.get_changed_keys() == set()
+        assert other_snapshot[1, 1, 0] == str((1, 1, 0))
+
+    def test_clear_globals(self):
+        """Snapshots can be taken after clearing the globals"""
+
+        CodeArray((10, 10, 1)).clear_globals()
+
+        snapshot = self.dict_grid.get_snapshot()
+        snapshot.release()
+
+        assert len(snapshot) == 3
+
 
 class TestDataArray(object):
     """Unit tests for DataArray"""
@@ -293,6 +579,50 @@ class TestDataArray(object):
 
         assert self.data_array.shape == (10000, 100, 100)
 
+    def test_shape_undo(self):
+        """Cells that are trimmed by _set_shape are one undo operation"""
+
+        for row in xrange(10):
+            self.data_array[row, 0, 0] = str(row)
+
+        self.data_array.unredo.reset()
+
+        self.data_array.shape = (5, 100, 100)
+
+        assert sorted(self.data_array.keys()) == [(row, 0, 0)
+                                                  for row in xrange(5)]
+        assert len(self.data_array.unredo.undolist) == 3
+
+        self.data_array.unredo.undo()
+
+        assert len(self.data_array.keys()) == 10
+        assert self.data_array.shape == (100, 100, 100)
+
+    def test_replace_cells(self):
+        """Unit test for replace_cells"""
+
+        self.data_array[0, 0, 0] = u"1"
+        self.data_array[1, 0, 0] = u"2"
+        self.data_array.unredo.reset()
+
+        cells = {(0, 0, 0): u"3", (1, 0, 0): None, (2, 0, 0): u"4",
+                 (3, 0, 0): u""}
+        self.data_array.replace_cells(cells)
+
+        assert sorted(self.data_array.dict_grid.items()) == \
+            [((0, 0, 0), u"3"), ((2, 0, 0), u"4")]
+        assert self.data_array.unredo.undolist[1] == "MARK"
+
+        self.data_array.unredo.undo()
+
+        assert sorted(self.data_array.dict_grid.items()) == \
+            [((0, 0, 0), u"1"), ((1, 0, 0), u"2")]
+
+        self.data_array.unredo.redo()
+
+        assert sorted(self.data_array.dict_grid.items()) == \
+            [((0, 0, 0), u"3"), ((2, 0, 0), u"4")]
+
     def test_getstate(self):
         """Unit test for __getstate__ (pickle support)"""
 
@@ -371,6 +701,56 @@ class TestDataArray(object):
         print self.data_array.shape
         assert self.data_array.shape == (99, 100, 100)
 
+    def test_insert_delete_undo(self):
+        """Insertion and deletion are undone in one step"""
+
+        self.data_array[2, 3, 4] = "42"
+        self.data_array[5, 3, 4] = "43"
+
+        self.data_array.insert(3, 10, 0)
+        self.data_array.delete(0, 3, 0)
+
+        assert sorted(self.data_array.keys()) == [(12, 3, 4)]
+        assert self.data_array.shape == (107, 100, 100)
+
+        self.data_array.unredo.undo()
+
+        assert sorted(self.data_array.keys()) == [(2, 3, 4), (15, 3, 4)]
+        assert self.data_array.shape == (110, 100, 100)
+
+        self.data_array.unredo.undo()
+
+        assert sorted(self.data_array.keys()) == [(2, 3, 4), (5, 3, 4)]
+        assert self.data_array.shape == (100, 100, 100)
+
+    def test_spilled_insert_undo(self):
+        """Spilled insertions are undone on the grid and not on a copy"""
+
+        max_unredo = config["max_unredo"]
+        config["max_unredo"] = "6"
+        config["unredo_spill"] = "True"
+
+        try:
+            self.data_array[0, 0, 0] = "0"
+            self.data_array.insert(0, 5, 0)
+
+            for i in xrange(6):
+                self.data_array[i, 0, 0] = str(i + 1)
+
+        finally:
+            config["max_unredo"] = repr(max_unredo)
+            config["unredo_spill"] = "False"
+
+        assert self.data_array.unredo.spilled
+
+        # Undo the edits and the insertion
+        for i in xrange(7):
+            self.data_array.unredo.undo()
+
+        assert self.data_array.shape == (100, 100, 100)
+        assert self.data_array[0, 0, 0] == "0"
+        assert len(self.data_array.keys()) == 1
+
     def test_set_row_height(self):
         """Unit test for set_row_height"""
 
@@ -448,10 +828,262 @@ class TestCodeArray(object):
         ##filled_grid[0, 0, 0] = "S[5:10, 1, 0]"
         ##assert filled_grid[0, 0, 0].tolist() == range(7, 12)
 
-    def test_make_nested_list(self):
-        """Unit test for _make_nested_list"""
+    def test_dependency_invalidation(self):
+        """Unit test for incremental recalculation"""
 
-        pass
+        self.code_array[0, 0, 0] = "1"
+        self.code_array[1, 0, 0] = "S[0, 0, 0] + 1"
+        self.code_array[2, 0, 0] = "S[1, 0, 0] * 2"
+        self.code_array[3, 0, 0] = "3 + 0"
+
+        assert self.code_array[2, 0, 0] == 4
+        assert self.code_array[3, 0, 0] == 3
+
+        self.code_array[0, 0, 0] = "5"
+
+        # Only the dependents of the changed cell are invalidated
+        assert (1, 0, 0) not in self.code_array.result_cache
+        assert (2, 0, 0) not in self.code_array.result_cache
+        assert (3, 0, 0) in self.code_array.result_cache
+
+        assert self.code_array[2, 0, 0] == 12
+
+        # Setting unchanged literals keeps the dependents
+        self.code_array[0, 0, 0] = "5"
+        assert (1, 0, 0) in self.code_array.result_cache
+
+        # Global assignments cannot be traced
+        self.code_array[4, 0, 0] = "a = 1"
+
+        assert self.code_array.result_cache == {}
+
+    def test_replace_cells(self):
+        """Results of replaced cells and their dependents are invalidated"""
+
+        self.code_array[0, 0, 0] = u"1"
+        self.code_array[1, 0, 0] = u"S[0, 0, 0] + 1"
+        self.code_array[2, 0, 0] = u"3 + 0"
+
+        assert self.code_array[1, 0, 0] == 2
+        assert self.code_array[2, 0, 0] == 3
+
+        self.code_array.replace_cells({(0, 0, 0): u"5", (3, 0, 0): u"7"})
+
+        assert (1, 0, 0) not in self.code_array.result_cache
+        assert (2, 0, 0) in self.code_array.result_cache
+        assert self.code_array[1, 0, 0] == 6
+
+        self.code_array.unredo.undo()
+
+        assert self.code_array[1, 0, 0] == 2
+        assert self.code_array[3, 0, 0] is None
+
+    def test_sqlite_store(self):
+        """CodeArray with cells in an SQLite database file"""
+
+        store = SQLiteKeyValueStore(batch_size=2)
+        code_array = CodeArray((100, 10, 3), store)
+
+        code_array[0, 0, 0] = u"1"
+        code_array[1, 0, 0] = u"S[0, 0, 0] + 1"
+        code_array[2, 0, 0] = u"S[1, 0, 0] * 2"
+
+        assert code_array[2, 0, 0] == 4
+
+        code_array.insert(1, 2, 0)
+
+        assert store.get_keys(0, 1) == [(3, 0, 0), (4, 0, 0)]
+        assert code_array.dict_grid.get_max_position(0) == 4
+        assert code_array.dict_grid.get_next_key((0, 0, 0), 0) == (3, 0, 0)
+
+        # Range queries are answered by the store
+        assert isinstance(code_array.dict_grid.key_index, SQLiteKeyIndex)
+
+        code_array.unredo.undo()
+
+        assert sorted(store.keys()) == [(0, 0, 0), (1, 0, 0), (2, 0, 0)]
+
+        store.close()
+
+    def test_get_code_object(self):
+        """Unit test for _get_code_object"""
+
+        glob_var, code_object = \
+            self.code_array._get_code_object((0, 0, 0), " 2 + 3")
+        assert glob_var is None
+        assert eval(code_object) == 5
+
+        # Identical expressions share one code object
+        __, code_object2 = \
+            self.code_array._get_code_object((1, 0, 0), "2 + 3")
+        assert code_object2 is code_object
+
+        # Changed code is compiled again
+        glob_var, code_object = \
+            self.code_array._get_code_object((0, 0, 0), "b = 2 * 3")
+        assert glob_var == "b"
+        assert eval(code_object) == 6
+
+        # Syntax errors are raised on evaluation
+        self.code_array[0, 0, 0] = "1 +"
+        assert isinstance(self.code_array[0, 0, 0], Exception)
+
+    def test_literal_cells(self):
+        """Unit test for literal cell handling"""
+
+        self.code_array[0, 0, 0] = "u'Test'"
+        self.code_array[1, 0, 0] = " -2.5"
+        self.code_array[2, 0, 0] = "X + 1"
+
+        assert self.code_array.literal_cache[0, 0, 0] == \
+            ("u'Test'", True, u"Test")
+        assert self.code_array.literal_cache[2, 0, 0][1] is False
+
+        assert self.code_array[0, 0, 0] == u"Test"
+        assert self.code_array[1, 0, 0] == -2.5
+        assert self.code_array[2, 0, 0] == 3
+
+        # Literals are not evaluated and do not fill the result cache
+        assert (0, 0, 0) not in self.code_array.result_cache
+
+        # Code that bypasses __setitem__ is classified on access
+        self.code_array.dict_grid[0, 0, 0] = "[1, 2]"
+        assert self.code_array[0, 0, 0] == [1, 2]
+
+        # Safe mode returns code
+        self.code_array.safe_mode = True
+        assert self.code_array[1, 0, 0] == " -2.5"
+        self.code_array.safe_mode = False
+
+    def test_get_cached_result(self):
+        """Unit test for get_cached_result"""
+
+        pending = object()
+
+        self.code_array[0, 0, 0] = "2 * 3"
+
+        assert self.code_array.get_cached_result((1, 0, 0), pending) is None
+        assert self.code_array.get_cached_result((0, 0, 0), pending) \
+            is pending
+
+        self.code_array[0, 0, 0]
+        assert self.code_array.get_cached_result((0, 0, 0), pending) == 6
+
+        # Literals do not need evaluation
+        self.code_array[2, 0, 0] = "7"
+        assert self.code_array.get_cached_result((2, 0, 0), pending) == 7
+
+        # Displayed results are evicted last
+        result_cache = self.code_array.result_cache
+        self.code_array[1, 0, 0] = "2 * 4"
+        self.code_array[1, 0, 0]
+        self.code_array.get_cached_result((0, 0, 0), pending)
+
+        assert max(result_cache._ticks, key=result_cache._ticks.get) == \
+            (0, 0, 0)
+
+    def test_eval_unchanged(self):
+        """Evaluation does not mark cells as changed"""
+
+        self.code_array[0, 0, 0] = "1"
+        self.code_array[1, 0, 0] = "S[0, 0, 0] + 1"
+
+        self.code_array.dict_grid.changed_keys = set()
+
+        assert self.code_array[1, 0, 0] == 2
+        assert self.code_array.dict_grid.changed_keys == set()
+
+    def test_eval_namespace(self):
+        """Unit test for the namespace of cell evaluation"""
+
+        self.code_array[1, 2, 1] = "(X, Y, Z, R, C, T)"
+        assert self.code_array[1, 2, 1] == (1, 2, 1, 1, 2, 1)
+
+        # Lambdas and generators see cell specific names
+        self.code_array[4, 0, 0] = "(lambda: X)()"
+        assert self.code_array[4, 0, 0] == 4
+
+        self.code_array[5, 0, 0] = "list(X + i for i in xrange(2))"
+        assert self.code_array[5, 0, 0] == [5, 6]
+
+        # Global assignments are visible in the shared namespace
+        self.code_array[6, 0, 0] = "namespace_test = 3"
+        self.code_array[7, 0, 0] = "namespace_test * X"
+        assert self.code_array[6, 0, 0] == 3
+        assert self.code_array[7, 0, 0] == 21
+
+        # Evaluating assignments does not start a new result generation
+        self.code_array.result_cache.pop((6, 0, 0))
+        generation = self.code_array.result_cache.generation
+        assert self.code_array[6, 0, 0] == 3
+        assert self.code_array.result_cache.generation == generation
+
+        # Globals that macro functions change are visible in cells
+        self.code_array.macros = "\n".join([
+            "counter = 0",
+            "def bump():",
+            "    global counter",
+            "    counter += 1",
+            "    return counter"])
+        self.code_array.execute_macros()
+
+        self.code_array[8, 0, 0] = "bump()"
+        self.code_array[9, 0, 0] = "counter"
+        assert self.code_array[8, 0, 0] == 1
+        assert self.code_array[9, 0, 0] == 1
+
+        self.code_array.clear_globals()
+
+    def test_get_result_array(self):
+        """Unit test for slice access"""
+
+        for row in xrange(10):
+            self.code_array[row, 0, 0] = "X"
+            self.code_array[row, 1, 0] = "X * 0.5"
+            self.code_array[row, 2, 0] = "X > 4"
+        self.code_array[0, 3, 0] = "'Text'"
+
+        int_array = self.code_array[:10, 0, 0]
+        assert int_array.dtype == numpy.int_
+        assert int_array.sum() == 45
+
+        assert self.code_array[:10, 1, 0].dtype == numpy.float_
+        assert self.code_array[:10, 2, 0].dtype == numpy.bool_
+
+        # Mixed types and empty cells
+        assert self.code_array[:10, :2, 0].dtype == numpy.float_
+
+        gap_array = self.code_array[:12, 0, 0]
+        assert gap_array.dtype == numpy.float_
+        assert numpy.isnan(gap_array[10:]).all()
+        assert numpy.nansum(gap_array) == 45
+        assert self.code_array[:12, 2, 0].dtype == numpy.object_
+
+        assert self.code_array[:2, 3, 0].tolist() == ["Text", None]
+        assert self.code_array[:3, :4, 0].shape == (3, 4)
+
+        # Cells that read slices depend on the cells of the slice
+        self.code_array[0, 4, 0] = "S[:10, 0, 0].sum()"
+        assert self.code_array[0, 4, 0] == 45
+        self.code_array[9, 0, 0] = "0"
+        assert self.code_array[0, 4, 0] == 36
+
+    def test_lazy(self):
+        """Unit test for lazy views"""
+
+        for row in xrange(10):
+            self.code_array[row, 0, 0] = "X * 2"
+
+        view = self.code_array.lazy[2:8, 0, 0]
+
+        assert view.shape == (6,)
+        assert (2, 0, 0) not in self.code_array.result_cache
+
+        assert view[1] == 6
+        assert view[-1] == 14
+        assert view[::2].shape == (3,)
+        assert list(view[::2]) == [4, 8, 12]
+        assert numpy.array(view).sum() == 54
 
     def test_has_assignment(self):
         """Unit test for _has_assignment"""
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit test for parallel.py"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+import os
+import sys
+
+TESTPATH = "/".join(os.path.realpath(__file__).split("/")[:-1]) + "/"
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + "/../../..")
+sys.path.insert(0, TESTPATH + "/../..")
+
+from src.model.model import CodeArray
+from src.model import parallel
+from src.model.parallel import get_references, get_groups
+
+
+def test_get_references():
+    """Unit test for get_references"""
+
+    key = (5, 1, 0)
+
+    assert get_references("S[X-1, Y, Z] + S[0, 0, 0]", key) == \
+        [(4, 1, 0), (0, 0, 0)]
+    assert get_references("sum(S[:, 1, 0])", key) == \
+        [(slice(None, None, None), 1, 0)]
+
+    # Unresolvable references
+    assert get_references("len(S)", key) is None
+    assert get_references("S[a, 1, 0]", key) is None
+
+    # Syntax errors
+    assert get_references("1 +", key) == []
+
+
+class TestParallel(object):
+    """Unit tests for parallel recalculation"""
+
+    def setup_method(self, method):
+        """Creates CodeArray with independent columns"""
+
+        self.code_array = CodeArray((100, 3, 1))
+
+        for col in xrange(3):
+            self.code_array[0, col, 0] = "Y * 10"
+            for row in xrange(1, 100):
+                self.code_array[row, col, 0] = "S[X-1, Y, Z] + 1"
+
+        self.code_array[0, 2, 0] = "c = 7"
+
+    def test_get_groups(self):
+        """Unit test for get_groups"""
+
+        barriers, groups = get_groups(self.code_array, self.code_array.keys())
+
+        assert barriers == [(0, 2, 0)]
+        assert sorted(len(group) for group in groups) == [99, 100, 100]
+
+    def test_recalculate(self):
+        """Unit test for recalculate"""
+
+        self.code_array.recalculate(processes=2)
+
+        result_cache = self.code_array.result_cache
+
+        assert result_cache[(99, 0, 0)] == 99
+        assert result_cache[(99, 1, 0)] == 109
+        assert result_cache[(99, 2, 0)] == 106
+
+        # Dependencies are merged
+        self.code_array[0, 1, 0] = "0"
+        assert (99, 1, 0) not in result_cache
+        assert self.code_array[99, 1, 0] == 99
+
+        self.code_array.clear_globals()
+
+    def test_recalculate_gui(self, monkeypatch):
+        """The GUI process is not forked"""
+
+        def pool(*args, **kwargs):
+            assert False
+
+        monkeypatch.setattr(parallel, "is_headless", lambda: False)
+        monkeypatch.setattr(parallel.multiprocessing, "Pool", pool)
+
+        self.code_array.recalculate(processes=2)
+
+        assert self.code_array.result_cache[(99, 1, 0)] == 109
+
+        self.code_array.clear_globals()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit test for profiler.py"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+import cStringIO
+import os
+import sys
+import threading
+
+TESTPATH = "/".join(os.path.realpath(__file__).split("/")[:-1]) + "/"
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + "/../../..")
+sys.path.insert(0, TESTPATH + "/../..")
+
+from src.model.profiler import CellProfiler
+
+
+class TestCellProfiler(object):
+    """Unit tests for CellProfiler"""
+
+    def setup_method(self, method):
+        """Creates CellProfiler with records for three cells"""
+
+        self.profiler = CellProfiler()
+
+        self.profiler.record((0, 0, 0), 1.0, 1)
+        self.profiler.record((0, 0, 0), 3.0, 1)
+        self.profiler.record((1, 0, 0), 2.0, "Test")
+        self.profiler.record((0, 0, 1), 0.5, None)
+
+    def test_record(self):
+        """Unit test for record"""
+
+        count, cumulative, max_time, size = self.profiler.stats[0, 0, 0]
+
+        assert count == 2
+        assert cumulative == 4.0
+        assert max_time == 3.0
+        assert size > 0
+
+    def test_get_top_cells(self):
+        """Unit test for get_top_cells"""
+
+        top_cells = self.profiler.get_top_cells(2)
+
+        assert [cell[0] for cell in top_cells] == [(0, 0, 0), (1, 0, 0)]
+
+    def test_get_top_tables(self):
+        """Unit test for get_top_tables"""
+
+        top_tables = self.profiler.get_top_tables()
+
+        assert [table[:3] for table in top_tables] == [(0, 3, 6.0),
+                                                       (1, 1, 0.5)]
+
+    def test_get_report(self):
+        """Unit test for get_report"""
+
+        report = self.profiler.get_report(n=1)
+
+        assert "(0, 0, 0)" in report
+        assert "(1, 0, 0)" not in report
+
+    def test_to_csv(self):
+        """Unit test for to_csv"""
+
+        outfile = cStringIO.StringIO()
+        self.profiler.to_csv(outfile)
+
+        lines = outfile.getvalue().splitlines()
+
+        assert lines[0] == "row,column,table,count,cumulative,max,size"
+        assert lines[1].startswith("0,0,0,2,4.0,3.0,")
+        assert len(lines) == 4
+
+    def test_get_cost(self):
+        """Unit test for get_cost"""
+
+        assert self.profiler.get_cost((0, 0, 0)) == 1.0
+        assert self.profiler.get_cost((1, 0, 0)) == 0.5
+        assert self.profiler.get_cost((5, 0, 0)) == 0.0
+
+    def test_max_cumulative(self):
+        """Unit test for keeping max_cumulative up to date"""
+
+        assert self.profiler.max_cumulative == 4.0
+
+        self.profiler.record((1, 0, 0), 3.0, None)
+        assert self.profiler.max_cumulative == 5.0
+        assert self.profiler.get_cost((0, 0, 0)) == 0.8
+
+        self.profiler.clear()
+        assert self.profiler.max_cumulative == 0.0
+        assert self.profiler.get_cost((0, 0, 0)) == 0.0
+
+    def test_concurrent_record(self):
+        """Unit test for reading while another thread records"""
+
+        def record():
+            for row in xrange(20000):
+                self.profiler.record((row, 1, 0), 0.001, None)
+
+        thread = threading.Thread(target=record)
+        thread.start()
+
+        while thread.is_alive():
+            self.profiler.get_top_tables()
+            self.profiler.get_cost((0, 0, 0))
+
+        thread.join()
+
+        assert len(self.profiler.get_top_cells(n=None)) == 20003
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit test for selection_index.py"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+import os
+import sys
+
+TESTPATH = "/".join(os.path.realpath(__file__).split("/")[:-1]) + "/"
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + "/../../..")
+sys.path.insert(0, TESTPATH + "/../..")
+
+from src.lib.selection import Selection
+from src.model.selection_index import SelectionIndex
+
+
+class TestSelectionIndex(object):
+    """Unit tests for SelectionIndex"""
+
+    def setup_method(self, method):
+        """Creates SelectionIndex with one entry for each selection type"""
+
+        self.entries = [
+            # Small block
+            (Selection([(10, 10)], [(20, 12)], [], [], []), 0, {}),
+            # Column block
+            (Selection([(0, 3)], [(999999, 3)], [], [], []), 0, {}),
+            # Whole table block
+            (Selection([(0, 0)], [(999999, 9999)], [], [], []), 0, {}),
+            # Rows, columns and cells
+            (Selection([], [], [5], [7], [(100, 100)]), 0, {}),
+            # Other table
+            (Selection([(10, 10)], [(20, 12)], [], [], []), 1, {}),
+        ]
+
+        self.index = SelectionIndex(self.entries)
+
+    def _get_covering(self, row, col, table):
+        """Returns positions of entries that cover the cell"""
+
+        return [i for i, (selection, entry_table, __) in enumerate(self.entries)
+                if entry_table == table and (row, col) in selection]
+
+    def test_get_candidates(self):
+        """Unit test for get_candidates"""
+
+        for key in [(15, 11, 0), (15, 11, 1), (500000, 3, 0), (5, 50, 0),
+                    (50, 7, 0), (100, 100, 0), (2000, 2000, 0), (0, 0, 2)]:
+            candidates = self.index.get_candidates(*key)
+
+            assert candidates == sorted(candidates)
+            assert set(self._get_covering(*key)) <= set(candidates)
+
+        assert self.index.get_candidates(15, 11, 1) == [4]
+        assert self.index.get_candidates(0, 0, 2) == []
+
+    def test_remove(self):
+        """Unit test for remove"""
+
+        selection, table, __ = self.entries.pop()
+        self.index.remove(4, selection, table)
+
+        assert self.index.get_candidates(15, 11, 1) == []
+
+        selection, table, __ = self.entries.pop()
+        self.index.remove(3, selection, table)
+
+        assert 3 not in self.index.get_candidates(5, 50, 0)
+        assert 3 not in self.index.get_candidates(100, 100, 0)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit test for sqlite_store.py"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+import os
+import pickle
+import sys
+
+import pytest
+
+TESTPATH = "/".join(os.path.realpath(__file__).split("/")[:-1]) + "/"
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + "/../../..")
+sys.path.insert(0, TESTPATH + "/../..")
+
+from src.model.key_index import KeyIndex
+from src.model.sqlite_store import SQLiteKeyValueStore
+
+
+class TestSQLiteKeyValueStore(object):
+    """Unit tests for SQLiteKeyValueStore"""
+
+    def setup_method(self, method):
+        """Creates store with three cells and a small write-back cache"""
+
+        self.store = SQLiteKeyValueStore(cache_size=2, batch_size=2)
+
+        self.store[0, 0, 0] = u"1 + 1"
+        self.store[1, 0, 0] = u"1 + 1"
+        self.store[0, 1, 2] = u"2 + 2"
+
+    def teardown_method(self, method):
+        """Removes the temporary database file"""
+
+        self.store.close()
+
+    def test_getitem(self):
+        """Unit test for __getitem__ and get"""
+
+        assert self.store[1, 0, 0] == u"1 + 1"
+        assert self.store[5, 5, 5] is None
+        assert self.store.get((5, 5, 5), 3) == 3
+        assert (0, 1, 2) in self.store
+        assert (0, 2, 1) not in self.store
+        assert len(self.store) == 3
+
+    def test_values(self):
+        """Values that are no unicode strings keep their type"""
+
+        self.store[2, 0, 0] = "abc"
+        self.store[3, 0, 0] = [1, 2]
+        self.store.flush()
+        self.store._cache.clear()
+
+        assert type(self.store[2, 0, 0]) is str
+        assert self.store[3, 0, 0] == [1, 2]
+        assert type(self.store[0, 0, 0]) is unicode
+
+    def test_pop(self):
+        """Unit test for pop and __delitem__"""
+
+        assert self.store.pop((0, 1, 2)) == u"2 + 2"
+        assert self.store.pop((0, 1, 2), None) is None
+
+        with pytest.raises(KeyError):
+            self.store.pop((0, 1, 2))
+
+        del self.store[0, 0, 0]
+        self.store.flush()
+        self.store._cache.clear()
+
+        assert self.store.items() == [((1, 0, 0), u"1 + 1")]
+
+    def test_other_keys(self):
+        """Keys that are no integer triples are kept in memory"""
+
+        self.store[0.5, 0, 0] = u"3"
+
+        assert self.store[0.5, 0, 0] == u"3"
+        assert len(self.store) == 4
+
+        with pytest.raises(TypeError):
+            self.store.pop((slice(None), 0, 0))
+
+    def test_clear(self):
+        """Unit test for clear"""
+
+        self.store.clear()
+
+        assert len(self.store) == 0
+        assert self.store[0, 0, 0] is None
+
+    def test_file(self, tmpdir):
+        """Cells are kept in the database file after closing"""
+
+        filepath = str(tmpdir.join("cells.sqlite"))
+
+        store = SQLiteKeyValueStore(filepath)
+        store.update(self.store.items())
+        store.close()
+
+        store = SQLiteKeyValueStore(filepath)
+
+        assert sorted(store.items()) == sorted(self.store.items())
+
+        store.close()
+
+    param_get_keys = [
+        {"axis": 0, "start": 1, "stop": None, "res": [(1, 0, 0)]},
+        {"axis": 1, "start": 0, "stop": 1, "res": [(0, 0, 0), (1, 0, 0)]},
+        {"axis": 2, "start": 1, "stop": 3, "res": [(0, 1, 2)]},
+    ]
+
+    @pytest.mark.parametrize("axis, start, stop, res",
+                             [(p["axis"], p["start"], p["stop"], p["res"])
+                              for p in param_get_keys])
+    def test_get_keys(self, axis, start, stop, res):
+        """Unit test for get_keys"""
+
+        assert self.store.get_keys(axis, start, stop) == res
+
+    def test_get_block(self):
+        """Unit test for get_block"""
+
+        assert self.store.get_block(0, 0, 5, 5, 0) == [(0, 0, 0), (1, 0, 0)]
+        assert self.store.get_block(1, 0, 5, 5, 0) == [(1, 0, 0)]
+        assert self.store.get_block(0, 0, 5, 5, 1) == []
+
+    def test_get_max(self):
+        """Unit test for get_max"""
+
+        assert self.store.get_max(0) == 1
+        assert self.store.get_max(1, 0) == 0
+        assert self.store.get_max(2) == 2
+        assert self.store.get_max(0, 1) is None
+
+    def test_get_next(self):
+        """Unit test for get_next"""
+
+        assert self.store.get_next((0, 0, 0), 0) == (1, 0, 0)
+        assert self.store.get_next((1, 0, 0), 0, reverse=True) == (0, 0, 0)
+        assert self.store.get_next((0, 0, 2), 1) == (0, 1, 2)
+        assert self.store.get_next((1, 0, 0), 0) is None
+
+    def test_get_sorted_keys(self):
+        """get_sorted_keys has the order of KeyIndex"""
+
+        keys = [(0, 0, 0), (3, 1, 0), (3, 7, 0), (10, 1, 0), (2, 2, 1),
+                (20, 5, 1), (4, 4, 2)]
+
+        self.store.clear()
+        for key in keys:
+            self.store[key] = u"1"
+
+        key_index = KeyIndex(keys)
+
+        for startkey in [(3, 1, 0), (3, 5, 1), (0, 0, 0), (30, 30, 3)]:
+            for reverse in [False, True]:
+                assert list(self.store.get_sorted_keys(startkey, reverse)) == \
+                    list(key_index.get_sorted_keys(startkey, reverse))
+
+    def test_pickle(self):
+        """Unit test for pickling"""
+
+        store = pickle.loads(pickle.dumps(self.store, 2))
+
+        assert sorted(store.items()) == sorted(self.store.items())
+        assert store.filepath != self.store.filepath
+
+        store.close()
+
+# End of class TestSQLiteKeyValueStore
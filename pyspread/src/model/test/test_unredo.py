@@ -29,6 +29,7 @@ sys.path.insert(0, TESTPATH)
 sys.path.insert(0, TESTPATH + "/../../..")
 sys.path.insert(0, TESTPATH + "/../..")
 
+from src.config import config
 from src.model.unredo import UnRedo
 
 
@@ -98,4 +99,88 @@ class TestUnRedo(object):
 
         self.unredo.append(self.step[:2], self.step[2:])
         assert len(self.unredo.undolist) == 1
-        assert self.unredo.undolist[0] == self.step
\ No newline at end of file
+        assert self.unredo.undolist[0] == self.step
+
+    def test_append_to_last(self):
+        """Tests appending operations to the last undo step"""
+
+        assert self.unredo.append_to_last(self.step[:2],
+                                          self.step[2:]) is False
+        assert self.unredo.undolist == []
+
+        self.unredo.append(self.step[:2], self.step[2:])
+        self.unredo.mark()
+        self.unredo.append_to_last(self.step[:2], self.step[2:])
+
+        assert self.unredo.undolist == [self.step, self.step, "MARK"]
+
+        self.unredo.undo()
+        assert self.list == ["Test", "Test"]
+
+    def test_evict(self):
+        """Oldest steps are discarded when the undolist is too long"""
+
+        max_unredo = config["max_unredo"]
+        config["max_unredo"] = "5"
+
+        try:
+            for i in xrange(4):
+                self.unredo.append(self.step[:2], self.step[2:])
+                self.unredo.mark()
+
+        finally:
+            config["max_unredo"] = repr(max_unredo)
+
+        assert self.unredo.undolist == [self.step, "MARK"] * 2
+
+        self.unredo.undo()
+        self.unredo.undo()
+        self.unredo.undo()
+        assert self.list == ["Test", "Test"]
+
+    def test_evict_bytes(self):
+        """Oldest steps are discarded when the memory limit is exceeded"""
+
+        max_unredo_bytes = config["max_unredo_bytes"]
+        config["max_unredo_bytes"] = "2000"
+
+        step = (self.list.append, ["a" * 800], self.list.pop, [])
+
+        try:
+            for i in xrange(3):
+                self.unredo.append(step[:2], step[2:])
+                self.unredo.mark()
+
+        finally:
+            config["max_unredo_bytes"] = repr(max_unredo_bytes)
+
+        assert self.unredo.undolist == [step, "MARK"] * 2
+        assert 1800 < self.unredo.nbytes <= 2000
+
+    def test_spill(self):
+        """Evicted steps are loaded from the spill file on undo"""
+
+        max_unredo = config["max_unredo"]
+        config["max_unredo"] = "2"
+        config["unredo_spill"] = "True"
+
+        try:
+            for i in xrange(3):
+                self.unredo.append((self.list.append, [i]), (self.list.pop, []))
+                self.unredo.mark()
+
+        finally:
+            config["max_unredo"] = repr(max_unredo)
+            config["unredo_spill"] = "False"
+
+        assert len(self.unredo.undolist) == 2
+        assert len(self.unredo.spilled) == 2
+
+        for i in xrange(3):
+            self.unredo.undo()
+
+        assert self.list == [2, 1, 0]
+        assert self.unredo.spilled == []
+
+        self.unredo.redo()
+        assert self.list == [2, 1]
@@ -28,7 +28,32 @@ UnRedo contains the UnRedo class that manages undo and redo operations.
 
 """
 
+import cPickle as pickle
+from itertools import chain
+import tempfile
+
 from src.config import config
+from src.lib.cache import get_size
+from src.lib.selection import Selection
+
+# Types of operation parameters that are written to the spill file. Other
+# objects, e.g. the grid or its attribute list, are referenced instead.
+SPILL_TYPES = set([type(None), bool, int, long, float, complex, str, unicode,
+                   tuple, list, dict, set, frozenset, Selection])
+
+
+def get_operation_size(operation):
+    """Returns estimated memory consumption of an undolist entry in bytes
+
+    The function objects are shared and therefore not counted.
+
+    """
+
+    if operation == "MARK":
+        return 0
+
+    return 64 + sum(get_size(param)
+                    for param in chain(operation[1], operation[3]))
 
 
 class UnRedo(object):
@@ -45,6 +70,14 @@ class UnRedo(object):
     One undo step in the application can comprise of multiple operations.
     Undo steps are separated by the string "MARK".
 
+    If the undolist has more than max_unredo entries or if the estimated
+    memory of both lists exceeds max_unredo_bytes then the oldest undo
+    steps are discarded. If unredo_spill is set in the config then these
+    steps are stored in a temporary file and loaded when they are undone.
+    Only data parameters are written to the file. Other parameters, e.g.
+    the grid that an operation changes, are kept as references so that
+    undo changes these objects and not copies of them.
+
     The attributes should only be written to by the class methods.
 
     Attributes
@@ -55,6 +88,8 @@ class UnRedo(object):
     \t
     active: Boolean
     \tTrue while an undo or a redo step is executed.
+    nbytes: Integer
+    \tEstimated memory of the operations in undolist and redolist in bytes
 
     """
 
@@ -68,6 +103,17 @@ class UnRedo(object):
         self.undolist = []
         self.redolist = []
         self.active = False
+        self.nbytes = 0
+
+        # Temporary file with the parameters of the oldest undo steps
+        self.spill_file = None
+
+        # Spilled undo steps, oldest first, as ([(undofunc, redofunc), ...],
+        # [referenced parameter, ...], file offset) tuples
+        self.spilled = []
+
+        # False while the current step alone exceeds the limits
+        self.is_evictable = True
 
     def mark(self):
         """Inserts a mark in undolist and empties redolist"""
@@ -75,6 +121,9 @@ class UnRedo(object):
         if self.undolist != [] and self.undolist[-1] != "MARK":
             self.undolist.append("MARK")
 
+            self.is_evictable = True
+            self._check_limits()
+
     def undo(self):
         """Undos operations until next mark and stores them in the redolist"""
 
@@ -83,6 +132,9 @@ class UnRedo(object):
         while self.undolist != [] and self.undolist[-1] == "MARK":
             self.undolist.pop()
 
+        if self.undolist == [] and self.spilled:
+            self._load_spilled()
+
         if self.redolist != [] and self.redolist[-1] != "MARK":
             self.redolist.append("MARK")
 
@@ -118,6 +170,9 @@ class UnRedo(object):
     def reset(self):
         """Empties both undolist and redolist"""
 
+        if self.spill_file is not None:
+            self.spill_file.close()
+
         self.__init__()
 
     def append(self, undo_operation, operation):
@@ -131,19 +186,149 @@ class UnRedo(object):
         if self.active:
             return False
 
-        # If the lists grow too large they are emptied
+        step = undo_operation + operation
+
+        self.undolist.append(step)
+        self.nbytes += get_operation_size(step)
+
+        if self.is_evictable:
+            self._check_limits()
+
+    def _check_limits(self):
+        """Evicts oldest steps if the lists exceed the config limits"""
+
         if len(self.undolist) > config["max_unredo"] or \
-           len(self.redolist) > config["max_unredo"]:
-            self.reset()
-
-        # Check attribute types
-        for unredo_operation in [undo_operation, operation]:
-            iter(unredo_operation)
-            assert len(unredo_operation) == 2
-            assert hasattr(unredo_operation[0], "__call__")
-            iter(unredo_operation[1])
-
-        if not self.active:
-            self.undolist.append(undo_operation + operation)
+           self.nbytes > config["max_unredo_bytes"]:
+            self._evict()
+
+    def _pop_oldest_step(self, unredo_list):
+        """Removes the oldest complete step from the list and returns it
+
+        The last step of the list is never removed. None is returned if the
+        list contains only one step.
+
+        """
+
+        try:
+            end = unredo_list.index("MARK", 0, len(unredo_list) - 1)
+
+        except ValueError:
+            return
+
+        step = unredo_list[:end]
+        del unredo_list[:end + 1]
+
+        self.nbytes -= sum(get_operation_size(operation)
+                           for operation in step)
+
+        return step
+
+    def _evict(self):
+        """Discards or spills oldest steps until the limits are met"""
+
+        max_entries = config["max_unredo"]
+        max_bytes = config["max_unredo_bytes"]
+        spill = config["unredo_spill"]
+
+        while len(self.undolist) > max_entries or self.nbytes > max_bytes:
+            step = self._pop_oldest_step(self.undolist)
+
+            if step is None:
+                break
+
+            if spill:
+                self._spill(step)
+
+        # The first redo steps are farthest from the current state
+        while self.nbytes > max_bytes:
+            if self._pop_oldest_step(self.redolist) is None:
+                break
+
+        self.nbytes = max(0, self.nbytes)
+
+        # The current step alone exceeds the limits, so that nothing can be
+        # evicted until it is complete
+        self.is_evictable = len(self.undolist) <= max_entries and \
+            self.nbytes <= max_bytes
+
+    def _spill(self, step):
+        """Writes step to the spill file, the step is lost on errors"""
+
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile(prefix="pyspread_undo_")
+
+        functions = [(operation[0], operation[2]) for operation in step]
+        params = [(operation[1], operation[3]) for operation in step]
+
+        # Parameters that are no data are stored by their index in objects
+        objects = []
+
+        def persistent_id(obj):
+            """Returns index of obj in objects if obj is no data"""
+
+            if type(obj) in SPILL_TYPES:
+                return
+
+            objects.append(obj)
+            return len(objects) - 1
+
+        self.spill_file.seek(0, 2)
+        offset = self.spill_file.tell()
+
+        pickler = pickle.Pickler(self.spill_file, pickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = persistent_id
+
+        try:
+            pickler.dump(params)
+
+        except (pickle.PicklingError, TypeError):
+            # Parameters cannot be stored, e.g. open files. Older steps
+            # cannot be undone without this step.
+            self.spill_file.truncate(0)
+            self.spilled = []
+            return
+
+        self.spilled.append((functions, objects, offset))
+
+    def _load_spilled(self):
+        """Moves the newest spilled step from the spill file to undolist"""
+
+        functions, objects, offset = self.spilled.pop()
+
+        self.spill_file.seek(offset)
+
+        unpickler = pickle.Unpickler(self.spill_file)
+        unpickler.persistent_load = objects.__getitem__
+
+        params = unpickler.load()
+        self.spill_file.truncate(offset)
+
+        for (undo_function, redo_function), (undo_params, redo_params) in \
+                zip(functions, params):
+            step = undo_function, undo_params, redo_function, redo_params
+            self.undolist.append(step)
+            self.nbytes += get_operation_size(step)
+
+    def append_to_last(self, undo_operation, operation):
+        """Stores an operation as part of the last undo step
+
+        This is used for operations that do not change the content visibly
+        and should not become an undo step of their own. Nothing is stored
+        if there is no undo step.
+
+        Parameters are the same as for append.
+
+        """
+
+        if self.active or not self.undolist:
+            return False
+
+        if self.undolist[-1] == "MARK":
+            self.undolist.pop()
+            self.append(undo_operation, operation)
+            self.mark()
+
+        else:
+            self.append(undo_operation, operation)
 
 # End of class UnRedo
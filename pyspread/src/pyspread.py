@@ -70,8 +70,6 @@ from wx import InitAllImageHandlers
 
 from src.gui._events import post_command_event, GridActionEventMixin
 
-DEBUG = False
-
 
 class Commandlineparser(object):
     """
@@ -103,6 +101,11 @@ class Commandlineparser(object):
             help=_("Dimensions of empty grid (works only without filename) "
                    "rows, cols, tables [default: %default]"))
 
+        self.parser.add_option("--profile", action="store_true",
+            dest="profile", default=False,
+            help=_("Profile cell evaluations and print a report of the "
+                   "slowest cells and tables on exit"))
+
     def parse(self):
         """
         Returns a a tuple (options, filename)
@@ -140,6 +143,7 @@ class MainApplication(App, GridActionEventMixin):
     dimensions = (1, 1, 1)  # Will be overridden anyways
     options = {}
     filename = None
+    profiler = None
 
     def OnInit(self):
         """Init class that is automatically run on __init__"""
@@ -155,6 +159,11 @@ class MainApplication(App, GridActionEventMixin):
 
         self.main_window = MainWindow(None, title="pyspread")
 
+        # Start profiling of cell evaluations
+        if self.options.profile:
+            self.main_window.grid.actions.toggle_profiling()
+            self.profiler = self.main_window.grid.code_array.profiler
+
         ## Set dimensions
 
         ## Initialize file loading via event
@@ -216,10 +225,9 @@ def main():
 
     app.MainLoop()
 
+    if app.profiler is not None:
+        print app.profiler.get_report()
+
 
 if __name__ == "__main__":
-    if DEBUG:
-        import cProfile
-        cProfile.run('main()')
-    else:
-        main()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -30,7 +30,12 @@ System environment access
 
 import os
 
-import wx
+try:
+    import wx
+
+except ImportError:
+    # Headless mode, e.g. for batch evaluation
+    wx = None
 
 # Paths
 
@@ -49,6 +54,12 @@ def get_help_path():
 # System settings
 
 
+def is_headless():
+    """Returns True if there is no wx application, e.g. in batch mode"""
+
+    return wx is None or wx.GetApp() is None
+
+
 def get_dpi():
     """Returns screen dpi resolution"""
 
@@ -56,6 +67,14 @@ def get_dpi():
     return map(pxmm_2_dpi, zip(wx.GetDisplaySize(), wx.GetDisplaySizeMM()))
 
 
+def get_rgb(color):
+    """Returns integer as from wx.Colour.GetRGB for color tuple (r, g, b)"""
+
+    red, green, blue = color[:3]
+
+    return red | green << 8 | blue << 16
+
+
 def get_color(name):
     """Returns string representation of named system color"""
 
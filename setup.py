@@ -32,7 +32,7 @@ setup(name='pyspread',
       requires=['numpy (>=1.1)', 'wx (>=2.8.10)', 'pyme (>=0.8)',
                 'matplotlib (>=1.1.1)'],
       packages=['pyspread'],
-      scripts=['pyspread/pyspread'],
+      scripts=['pyspread/pyspread', 'pyspread/pyspread-batch'],
       package_data={'pyspread':
         ['*.py',
          'src/*.py',